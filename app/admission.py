@@ -0,0 +1,184 @@
+# apps/backend/app/admission.py
+import json
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from .tracing import span
+from .metrics import ADMISSION_REJECTED, ADMISSION_WAIT, register_gauge
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """No slot for this request: its route's queue is full or it waited past the deadline."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+# -------------------- Per-route limiter -------------------- #
+class RouteLimiter:
+    """
+    At most `concurrency` requests of a route run at once; up to `max_queue`
+    more wait in FIFO order, each for at most `queue_timeout` seconds.
+    Anything beyond that is rejected straight away: a quick 503 the client
+    can retry beats a request that sits in line and then times out anyway,
+    and it keeps the admitted ones fast. A released slot passes directly to
+    the next waiter. Event-loop only (one limiter per worker process).
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, queue_timeout: float, max_retry_after: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retry_after = max_retry_after
+        self.running = 0
+        self._waiters: deque = deque()
+        self._service_time: Optional[float] = None  # EWMA of seconds a request holds its slot
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: the queue ahead drained at the observed service rate."""
+        per_request = self._service_time if self._service_time is not None else self.queue_timeout
+        wait = (self.queued + 1) * per_request / max(self.concurrency, 1)
+        return max(1, min(self.max_retry_after, math.ceil(wait)))
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.rejected += 1
+        ADMISSION_REJECTED.labels(self.name, reason).inc()
+        return Overloaded(reason, self.retry_after())
+
+    async def acquire(self):
+        if self.running < self.concurrency and not self._waiters:
+            self.running += 1
+            self.admitted += 1
+            return
+        if self.queued >= self.max_queue:
+            raise self._reject("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        started = time.monotonic()
+        try:
+            with span("admission_queue", route=self.name, ahead=self.queued - 1):
+                await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not (future.done() and not future.cancelled()):
+                self._forget(future)
+                raise self._reject("queue_timeout")
+            # release() handed us the slot in the same iteration the deadline fired: take it
+        except asyncio.CancelledError:
+            # Client went away while queued; if the slot was handed over meanwhile, pass it on
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._forget(future)
+            raise
+        self.admitted += 1
+        ADMISSION_WAIT.labels(self.name).observe(time.monotonic() - started)
+
+    def _forget(self, future: asyncio.Future):
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+
+    def release(self, held: Optional[float] = None):
+        if held is not None:
+            self._service_time = held if self._service_time is None else 0.8 * self._service_time + 0.2 * held
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)  # the slot moves to this waiter; `running` is unchanged
+                return
+        self.running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "running": self.running,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_service_seconds": round(self._service_time, 3) if self._service_time is not None else None,
+        }
+
+
+# -------------------- ASGI middleware -------------------- #
+class AdmissionControl:
+    """
+    Gate (method, path) pairs behind their RouteLimiter before the request
+    body is read, so a shed upload costs nothing but the 503. Other
+    requests pass straight through. A shed request never reaches the
+    router, so its path is left in scope["admission_route"] for the
+    metrics and traces recorded further out.
+    """
+
+    def __init__(self, app, limiters: Dict[Tuple[str, str], RouteLimiter]):
+        self.app = app
+        self.limiters = limiters
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limiters.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            logger.warning(f"🚦 {limiter.name} shed ({e.reason}): {limiter.running} running, {limiter.queued} queued")
+            scope["admission_route"] = scope["path"]  # limiter keys are literal route paths
+            await _send_overloaded(send, limiter.name, e)
+            return
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - started)
+
+
+async def _send_overloaded(send, route: str, error: Overloaded):
+    body = json.dumps({
+        "detail": f"Server busy ({route}: {error.reason.replace('_', ' ')}); retry after {error.retry_after}s"
+    }).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(error.retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# -------------------- Limiters -------------------- #
+def build_limiters(routes: Dict[Tuple[str, str], Tuple[str, int, int, float]],
+                   max_retry_after: int) -> Dict[Tuple[str, str], RouteLimiter]:
+    """{(method, path): (name, concurrency, queue size, queue timeout s)}; routes with concurrency 0 are left out."""
+    limiters = {
+        key: RouteLimiter(name, concurrency, queue, timeout, max_retry_after)
+        for key, (name, concurrency, queue, timeout) in routes.items()
+        if concurrency > 0
+    }
+    by_name = {limiter.name: limiter for limiter in limiters.values()}
+    register_gauge("admission_in_flight", "Requests holding an admission slot, per route.",
+                   lambda: {(n,): l.running for n, l in by_name.items()}, ("route",))
+    register_gauge("admission_queued", "Requests waiting for an admission slot, per route.",
+                   lambda: {(n,): l.queued for n, l in by_name.items()}, ("route",))
+    return limiters
@@ -0,0 +1,243 @@
+# apps/backend/app/bulk_ingest.py
+import asyncio
+import hashlib
+import logging
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .config import settings
+from .chunking import chunk_document
+from .chunk_manifest import (
+    stable_chunk_id, vector_id, claim_document, load_chunk_ids, replace_chunk_manifest,
+)
+from .extraction import iter_pages, extract_bytes, SUPPORTED_EXTENSIONS
+from .utils.vector_db import upsert_embeddings, delete_embeddings
+from .utils.fallback_llm import get_embeddings_with_fallback
+from .metrics import count_cache
+
+logger = logging.getLogger(__name__)
+
+DELETE_BATCH = 1000
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(settings.UPLOAD_CHUNK_BYTES):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_chunks(path: Path) -> List[str]:
+    """Extract and chunk one file (blocking; extraction itself runs in the process pool)."""
+    text = "\n".join(page for page in iter_pages(path) if page)
+    return chunk_document(text)
+
+
+def prepare_bytes(name: str, data: bytes) -> Dict[str, Any]:
+    """Extract and chunk an in-memory document (blocking)."""
+    doc = {"name": name, "size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+    try:
+        doc["chunks"] = chunk_document("\n".join(p for p in extract_bytes(data, name) if p))
+    except Exception as e:
+        doc.update(chunks=[], error=str(e))
+    return doc
+
+
+def prepare_file(name: str, path: Path, sha256: str) -> Dict[str, Any]:
+    """Extract and chunk a document on disk (blocking), page by page."""
+    doc = {"name": name, "size": path.stat().st_size, "sha256": sha256}
+    try:
+        doc["chunks"] = extract_chunks(path)
+    except Exception as e:
+        doc.update(chunks=[], error=str(e))
+    return doc
+
+
+# -------------------- Archives -------------------- #
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _read_limited(stream: BinaryIO, max_bytes: int) -> Optional[bytes]:
+    data = stream.read(max_bytes + 1)
+    return None if len(data) > max_bytes else data
+
+
+def iter_archive_members(fileobj: BinaryIO, archive_name: str,
+                         max_bytes: int) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    Yield (name, data, error) for each regular member of a zip or tar
+    archive, one member in memory at a time and nothing written to disk.
+    Tar archives are read as a stream ("r|*"), so any compression works
+    without seeking. Unsupported or oversized members come back with
+    data=None and an error. Names are "<archive>/<member path>".
+    """
+    if archive_name.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                name = f"{archive_name}/{info.filename}"
+                if not info.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield name, None, "Unsupported file type"
+                elif info.file_size > max_bytes:
+                    yield name, None, "File too large"
+                else:
+                    with zf.open(info) as member:
+                        data = _read_limited(member, max_bytes)
+                    yield name, data, None if data is not None else "File too large"
+        return
+
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+        for member in tf:
+            if not member.isfile():
+                continue
+            name = f"{archive_name}/{member.name}"
+            if not member.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield name, None, "Unsupported file type"
+            elif member.size > max_bytes:
+                yield name, None, "File too large"
+            else:
+                yield name, _read_limited(tf.extractfile(member), max_bytes), None
+
+
+async def index_documents(docs: List[Dict[str, Any]], provider: str = "bulk_ingest",
+                          executor=None, namespace: str = "", replace: bool = True) -> List[Dict[str, Any]]:
+    """
+    Index a batch of documents, each {"name", "sha256", "chunks"}, in one pass:
+    only chunks not already in each document's manifest are embedded,
+    embedding calls are batched across all documents (INGEST_EMBED_BATCH)
+    and upserts coalesced (BULK_UPSERT_BATCH), then each document's manifest
+    is replaced and its removed chunks deleted. Documents whose content hash
+    matches what is indexed are skipped. Returns one result per document.
+
+    A document is identified by `namespace` + name. With `replace` False, a
+    name that already has other content indexed is skipped rather than
+    overwritten with a new version.
+    """
+    loop = asyncio.get_running_loop()
+    results: List[Dict[str, Any]] = []
+    pending: List[Dict[str, Any]] = []  # new chunks across all documents
+    plans = []
+
+    for doc in docs:
+        result = {"name": doc["name"], "sha256": doc["sha256"], "status": "indexed", "doc_id": None,
+                  "chunks": 0, "chunks_embedded": 0, "chunks_reused": 0, "chunks_deleted": 0, "error": None}
+        results.append(result)
+        if not doc["chunks"]:
+            result.update(status="failed", error="No text could be extracted")
+            continue
+        current = await claim_document(namespace + doc["name"])
+        if current.sha256 == doc["sha256"]:
+            result.update(status="unchanged", doc_id=current.doc_id, chunks=current.chunk_count)
+            continue
+        if current.sha256 and not replace:
+            result.update(status="skipped", doc_id=current.doc_id,
+                          error="A different version is already indexed; set replace to update it")
+            continue
+
+        doc_id = current.doc_id
+        previous = await load_chunk_ids(doc_id)
+        chunks: Dict[str, int] = {}
+        for position, text in enumerate(doc["chunks"]):
+            chunk_id = stable_chunk_id(text)
+            if chunk_id in chunks:
+                continue
+            chunks[chunk_id] = position
+            if chunk_id in previous:
+                result["chunks_reused"] += 1
+            else:
+                pending.append({"doc_id": doc_id, "chunk_id": chunk_id, "text": text, "source": doc["name"]})
+                result["chunks_embedded"] += 1
+        result.update(doc_id=doc_id, chunks=len(chunks))
+        count_cache("chunk_reuse", result["chunks_reused"], result["chunks_embedded"])
+        plans.append((result, previous, chunks))
+
+    # Embed across documents in fixed-size batches, upsert in larger coalesced batches
+    upserted: List[Dict[str, Any]] = []
+    try:
+        for i in range(0, len(pending), settings.INGEST_EMBED_BATCH):
+            batch = pending[i : i + settings.INGEST_EMBED_BATCH]
+            embeddings = await loop.run_in_executor(executor, get_embeddings_with_fallback, [c["text"] for c in batch])
+            for item, emb in zip(batch, embeddings):
+                item["embedding"] = emb
+        for i in range(0, len(pending), settings.BULK_UPSERT_BATCH):
+            batch = pending[i : i + settings.BULK_UPSERT_BATCH]
+            await loop.run_in_executor(executor, upsert_embeddings, batch, provider)
+            upserted.extend(batch)
+    except Exception as e:
+        logger.error(f"❌ Bulk embedding/upsert failed: {e}")
+        for result, _, _ in plans:
+            result.update(status="failed", error=str(e))
+        await delete_vectors(loop, executor, [vector_id(c["doc_id"], c["chunk_id"]) for c in upserted])
+        return results
+
+    for result, previous, chunks in plans:
+        try:
+            await replace_chunk_manifest(
+                namespace + result["name"], result["doc_id"], result["sha256"],
+                sorted((position, chunk_id) for chunk_id, position in chunks.items()),
+            )
+            removed = [vector_id(result["doc_id"], c) for c in previous if c not in chunks]
+            await delete_vectors(loop, executor, removed)
+            result["chunks_deleted"] = len(removed)
+        except Exception as e:
+            result.update(status="failed", error=str(e))
+    return results
+
+
+async def delete_vectors(loop, executor, ids: List[str]):
+    """Delete vector IDs in batches; failures are logged, not raised (they only leave orphans)."""
+    for i in range(0, len(ids), DELETE_BATCH):
+        try:
+            await loop.run_in_executor(executor, delete_embeddings, ids[i : i + DELETE_BATCH])
+        except Exception as e:
+            logger.warning(f"⚠️ Could not delete {len(ids[i : i + DELETE_BATCH])} vectors: {e}")
+
+
+# -------------------- Throughput -------------------- #
+class Throughput:
+    """Running totals for a bulk ingestion source, reported as files and chunks per second."""
+
+    def __init__(self):
+        self.files = 0
+        self.chunks = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.last_batch: Optional[Dict[str, Any]] = None
+
+    def record(self, results: List[Dict[str, Any]], seconds: float):
+        files = sum(1 for r in results if r["status"] != "failed")
+        chunks = sum(r["chunks_embedded"] for r in results)
+        self.files += files
+        self.chunks += chunks
+        self.failed += sum(1 for r in results if r["status"] == "failed")
+        self.busy_seconds += seconds
+        self.last_batch = {
+            "files": files,
+            "chunks_embedded": chunks,
+            "seconds": round(seconds, 3),
+            "files_per_second": round(files / seconds, 2) if seconds else None,
+            "chunks_per_second": round(chunks / seconds, 2) if seconds else None,
+        }
+        logger.info(
+            f"📦 Bulk batch: {files} files, {chunks} chunks in {seconds:.1f}s "
+            f"({self.last_batch['files_per_second']} files/s, {self.last_batch['chunks_per_second']} chunks/s)"
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        secs = self.busy_seconds
+        return {
+            "files": self.files,
+            "chunks_embedded": self.chunks,
+            "failed": self.failed,
+            "busy_seconds": round(secs, 3),
+            "files_per_second": round(self.files / secs, 2) if secs else None,
+            "chunks_per_second": round(self.chunks / secs, 2) if secs else None,
+            "last_batch": self.last_batch,
+        }
+
@@ -0,0 +1,105 @@
+# apps/backend/app/chunk_manifest.py
+import uuid
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+
+from .db import async_session
+from .models import IngestedDocument, DocumentChunk, UploadManifest, utc_now
+
+logger = logging.getLogger(__name__)
+
+
+def stable_chunk_id(text: str) -> str:
+    """Chunk ID derived from normalized content, so unchanged chunks keep their vector across versions."""
+    normalized = " ".join(text.split())
+    return f"c_{hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:32]}"
+
+
+def vector_id(doc_id: str, chunk_id: str) -> str:
+    return f"{doc_id}__{chunk_id}"
+
+
+async def claim_document(name: str) -> IngestedDocument:
+    """
+    The logical document `name`, registered under a fresh doc_id if it is
+    new (sha256 stays empty until a version is indexed). The insert is the
+    claim: concurrent callers for a new name all end up with the same doc_id.
+    `name` is the caller's scoped key (e.g. a watched-folder path), never a
+    bare upload filename.
+    """
+    async with async_session() as session:
+        doc = await session.get(IngestedDocument, name)
+        if doc:
+            return doc
+        doc = IngestedDocument(name=name, doc_id=str(uuid.uuid4()), sha256="")
+        session.add(doc)
+        try:
+            await session.commit()
+        except IntegrityError:
+            # Lost the race for this name: use the winner's doc_id
+            await session.rollback()
+            return await session.get(IngestedDocument, name)
+        return doc
+
+
+async def get_document(doc_id: str) -> Optional[IngestedDocument]:
+    async with async_session() as session:
+        result = await session.execute(select(IngestedDocument).where(IngestedDocument.doc_id == doc_id))
+        return result.scalars().first()
+
+
+async def load_chunk_ids(doc_id: str) -> Dict[str, int]:
+    """chunk_id -> position for the currently indexed version of `doc_id`."""
+    async with async_session() as session:
+        result = await session.execute(
+            select(DocumentChunk.chunk_id, DocumentChunk.position).where(DocumentChunk.doc_id == doc_id)
+        )
+        return {chunk_id: position for chunk_id, position in result.all()}
+
+
+async def replace_chunk_manifest(name: str, doc_id: str, sha256: str, chunks: List[Tuple[int, str]]):
+    """
+    Record `chunks` ((position, chunk_id) pairs) as the indexed version of
+    `doc_id`, in one transaction. Upload manifest entries for older versions
+    of the document are dropped: their content is no longer what's indexed.
+    """
+    async with async_session() as session:
+        await session.execute(delete(DocumentChunk).where(DocumentChunk.doc_id == doc_id))
+        session.add_all(
+            DocumentChunk(id=vector_id(doc_id, chunk_id), doc_id=doc_id, chunk_id=chunk_id, position=position)
+            for position, chunk_id in chunks
+        )
+        await session.execute(
+            delete(UploadManifest)
+            .where(UploadManifest.doc_id == doc_id)
+            .where(UploadManifest.sha256 != sha256)
+        )
+        await session.merge(
+            IngestedDocument(name=name, doc_id=doc_id, sha256=sha256, chunk_count=len(chunks), updated_at=utc_now())
+        )
+        await session.commit()
+    logger.info(f"🗂️ Chunk manifest for {name} updated: {len(chunks)} chunks")
+
+
+async def get_ingested(name: str) -> Optional[IngestedDocument]:
+    async with async_session() as session:
+        return await session.get(IngestedDocument, name)
+
+
+async def forget_document(name: str) -> List[str]:
+    """Drop a logical document from the manifest. Returns the vector IDs it owned, for deletion."""
+    async with async_session() as session:
+        doc = await session.get(IngestedDocument, name)
+        if doc is None:
+            return []
+        result = await session.execute(select(DocumentChunk.id).where(DocumentChunk.doc_id == doc.doc_id))
+        ids = list(result.scalars().all())
+        await session.execute(delete(DocumentChunk).where(DocumentChunk.doc_id == doc.doc_id))
+        await session.execute(delete(UploadManifest).where(UploadManifest.doc_id == doc.doc_id))
+        await session.delete(doc)
+        await session.commit()
+    return ids
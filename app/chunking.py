@@ -0,0 +1,161 @@
+# apps/backend/app/chunking.py
+import re
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Candidate cut points, as character offsets where the next piece starts
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n\s*")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n\s*")
+_FALLBACK_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+# Characters per chunk (rough upper bound) buffered before a streaming chunker tokenizes
+_STREAM_BUFFER_CHUNKS = 8
+
+
+# -------------------- Tokenizer -------------------- #
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """
+    The embedding model's own (fast) tokenizer, so chunk sizes match what
+    the model actually sees. Returns None if it can't be loaded, in which
+    case a word/punctuation regex stands in.
+    """
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            try:
+                from transformers import AutoTokenizer
+                _tokenizer = AutoTokenizer.from_pretrained(settings.HF_EMBED_MODEL, use_fast=True)
+                logger.info(f"✅ Chunking tokenizer loaded for {settings.HF_EMBED_MODEL}")
+            except Exception as e:
+                logger.warning(f"⚠️ Tokenizer unavailable, approximating tokens with a regex: {e}")
+                _tokenizer = False
+    return _tokenizer or None
+
+
+def token_offsets(text: str) -> np.ndarray:
+    """(n_tokens, 2) array of [start, end) character offsets, without special tokens."""
+    tokenizer = get_tokenizer()
+    if tokenizer is not None:
+        encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        offsets = encoded["offset_mapping"]
+    else:
+        offsets = [m.span() for m in _FALLBACK_TOKEN.finditer(text)]
+    return np.asarray(offsets, dtype=np.int64).reshape(-1, 2)
+
+
+def count_tokens(text: str) -> int:
+    return len(token_offsets(text))
+
+
+# -------------------- Chunking -------------------- #
+def _boundary_tokens(text: str, pattern: re.Pattern, starts: np.ndarray) -> np.ndarray:
+    """Token indices at which a new paragraph/sentence starts, sorted and unique."""
+    chars = np.fromiter((m.end() for m in pattern.finditer(text)), dtype=np.int64)
+    return np.unique(np.searchsorted(starts, chars, side="left"))
+
+
+def _last_in(boundaries: np.ndarray, low: int, high: int) -> Optional[int]:
+    """Largest boundary b with low < b <= high, or None."""
+    i = np.searchsorted(boundaries, high, side="right") - 1
+    if i >= 0 and boundaries[i] > low:
+        return int(boundaries[i])
+    return None
+
+
+def _first_in(boundaries: np.ndarray, low: int, high: int) -> Optional[int]:
+    """Smallest boundary b with low <= b < high, or None."""
+    i = np.searchsorted(boundaries, low, side="left")
+    if i < len(boundaries) and boundaries[i] < high:
+        return int(boundaries[i])
+    return None
+
+
+def chunk_spans(text: str, max_tokens: Optional[int] = None, overlap: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    Character spans of chunks of at most `max_tokens` embedding tokens.
+    Each chunk ends at the last paragraph break that fits, else the last
+    sentence break, and only falls back to a hard token cut for text with
+    neither. Consecutive chunks share about `overlap` tokens, starting on a
+    sentence boundary where one is available. Boundary lookup runs over the
+    whole token stream at once (numpy searchsorted), not token by token.
+    """
+    max_tokens = max_tokens or settings.CHUNK_MAX_TOKENS
+    overlap = settings.CHUNK_OVERLAP_TOKENS if overlap is None else overlap
+    overlap = min(overlap, max_tokens // 2)
+
+    offsets = token_offsets(text)
+    n = len(offsets)
+    if n == 0:
+        return []
+    starts = offsets[:, 0]
+    paragraphs = _boundary_tokens(text, _PARAGRAPH_BREAK, starts)
+    sentences = np.union1d(_boundary_tokens(text, _SENTENCE_BREAK, starts), paragraphs)
+    min_tokens = max_tokens // 2
+
+    spans = []
+    start = 0
+    while start < n:
+        limit = start + max_tokens
+        if limit >= n:
+            end = n
+        else:
+            end = (
+                _last_in(paragraphs, start + min_tokens, limit)
+                or _last_in(sentences, start + min_tokens, limit)
+                or limit
+            )
+        spans.append((int(offsets[start, 0]), int(offsets[end - 1, 1])))
+        if end >= n:
+            break
+        # Overlap: step back up to `overlap` tokens, snapped forward to a sentence start
+        back = max(end - overlap, start + 1)
+        start = (_first_in(sentences, back, end) or back) if overlap else end
+    return spans
+
+
+def chunk_document(text: str, max_tokens: Optional[int] = None, overlap: Optional[int] = None) -> List[str]:
+    """Split `text` into structure-aware, token-bounded chunks (see chunk_spans)."""
+    return [text[s:e].strip() for s, e in chunk_spans(text, max_tokens, overlap) if text[s:e].strip()]
+
+
+class StreamChunker:
+    """
+    Incremental chunk_document for text that arrives page by page. Text is
+    buffered until it spans several chunks; all but the last chunk are then
+    emitted and the buffer restarts at the last chunk's start, so overlap
+    and boundary choice carry across pages.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, overlap: Optional[int] = None):
+        self.max_tokens = max_tokens or settings.CHUNK_MAX_TOKENS
+        self.overlap = overlap
+        self.buffer = ""
+        # ~4 characters per token is enough to decide when to tokenize
+        self.flush_chars = self.max_tokens * 4 * _STREAM_BUFFER_CHUNKS
+
+    def feed(self, text: str) -> List[str]:
+        self.buffer += text
+        if len(self.buffer) < self.flush_chars:
+            return []
+        spans = chunk_spans(self.buffer, self.max_tokens, self.overlap)
+        if len(spans) < 2:
+            return []
+        chunks = [self.buffer[s:e].strip() for s, e in spans[:-1]]
+        self.buffer = self.buffer[spans[-1][0]:]
+        return [c for c in chunks if c]
+
+    def flush(self) -> List[str]:
+        chunks = chunk_document(self.buffer, self.max_tokens, self.overlap)
+        self.buffer = ""
+        return chunks
@@ -52,6 +52,117 @@ class Settings(BaseSettings):
     GEN_AI_INDEX: str = os.getenv("GEN_AI_INDEX", "gemini-index")
     HF_EMBED_MODEL: str = os.getenv("HF_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 
+    # --- Scheduler ---
+    SCHEDULER_MISFIRE_GRACE_SECONDS: int = int(os.getenv("SCHEDULER_MISFIRE_GRACE_SECONDS", 900))
+    SCHEDULER_JOB_CONCURRENCY: int = int(os.getenv("SCHEDULER_JOB_CONCURRENCY", 1))
+    SCHEDULER_BLOCKING_WORKERS: int = int(os.getenv("SCHEDULER_BLOCKING_WORKERS", 2))
+    SCHEDULER_LEASE_TTL_SECONDS: int = int(os.getenv("SCHEDULER_LEASE_TTL_SECONDS", 30))
+    SCHEDULER_LEASE_RENEW_SECONDS: int = int(os.getenv("SCHEDULER_LEASE_RENEW_SECONDS", 10))
+
+    # --- Watchlists & provider quotas ---
+    DEFAULT_STOCK_WATCHLIST: str = os.getenv("DEFAULT_STOCK_WATCHLIST", "AAPL")
+    DEFAULT_NEWS_WATCHLIST: str = os.getenv("DEFAULT_NEWS_WATCHLIST", "technology")
+    WATCHLIST_CONCURRENCY: int = int(os.getenv("WATCHLIST_CONCURRENCY", 8))
+    ALPHAVANTAGE_PER_MINUTE: int = int(os.getenv("ALPHAVANTAGE_PER_MINUTE", 5))
+    ALPHAVANTAGE_PER_DAY: int = int(os.getenv("ALPHAVANTAGE_PER_DAY", 25))
+    NEWSAPI_PER_DAY: int = int(os.getenv("NEWSAPI_PER_DAY", 100))
+    NEWS_PAGE_SIZE: int = int(os.getenv("NEWS_PAGE_SIZE", 100))  # incremental fetches; NewsAPI's maximum
+    NEWS_MAX_PAGES: int = int(os.getenv("NEWS_MAX_PAGES", 5))  # per topic and sweep, one quota unit each
+    GOOGLE_PER_DAY: int = int(os.getenv("GOOGLE_PER_DAY", 100))
+    QUOTA_MAX_WAIT_SECONDS: int = int(os.getenv("QUOTA_MAX_WAIT_SECONDS", 3600))
+    QUOTA_INTERACTIVE_MAX_WAIT_SECONDS: float = float(os.getenv("QUOTA_INTERACTIVE_MAX_WAIT_SECONDS", 2))
+
+    # --- Provider mode: "live", "offline" (local stand-ins, no keys or network) or "record" (live, saving upstream API responses as fixtures) ---
+    PROVIDER_MODE: str = os.getenv("PROVIDER_MODE", "live").lower()
+    OFFLINE_FIXTURES_DIR: str = os.getenv("OFFLINE_FIXTURES_DIR", "")  # empty = app/fixtures
+    OFFLINE_SEED: int = int(os.getenv("OFFLINE_SEED", 0))
+    OFFLINE_EMBED_DIM: int = int(os.getenv("OFFLINE_EMBED_DIM", 384))
+    OFFLINE_LLM_LATENCY_MS: float = float(os.getenv("OFFLINE_LLM_LATENCY_MS", 300))  # time to first token
+    OFFLINE_LLM_TOKENS_PER_SECOND: float = float(os.getenv("OFFLINE_LLM_TOKENS_PER_SECOND", 80))
+    OFFLINE_LLM_OUTPUT_TOKENS: int = int(os.getenv("OFFLINE_LLM_OUTPUT_TOKENS", 200))
+    OFFLINE_LLM_JITTER: float = float(os.getenv("OFFLINE_LLM_JITTER", 0.1))  # +/- fraction of the modeled latency
+
+    # --- LLM providers ---
+    GEMINI_TIMEOUT_SECONDS: float = float(os.getenv("GEMINI_TIMEOUT_SECONDS", 30))
+    LOCAL_LLM_TIMEOUT_SECONDS: float = float(os.getenv("LOCAL_LLM_TIMEOUT_SECONDS", 120))
+    LLM_BREAKER_FAILURES: int = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+    LLM_BREAKER_RESET_SECONDS: float = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+    LLM_HEDGE: bool = os.getenv("LLM_HEDGE", "False").lower() in ("true", "1", "yes")
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+    LLM_INTERACTIVE_CONCURRENCY: int = int(os.getenv("LLM_INTERACTIVE_CONCURRENCY", 8))
+    LLM_BACKGROUND_CONCURRENCY: int = int(os.getenv("LLM_BACKGROUND_CONCURRENCY", 4))
+    LLM_INTERACTIVE_TPM: int = int(os.getenv("LLM_INTERACTIVE_TPM", 0))  # 0 = unlimited
+    LLM_BACKGROUND_TPM: int = int(os.getenv("LLM_BACKGROUND_TPM", 200000))
+    LLM_OUTPUT_TOKENS_ESTIMATE: int = int(os.getenv("LLM_OUTPUT_TOKENS_ESTIMATE", 512))
+    LOCAL_LLM_QUEUE_SIZE: int = int(os.getenv("LOCAL_LLM_QUEUE_SIZE", 64))
+    LOCAL_LLM_MAX_BATCH: int = int(os.getenv("LOCAL_LLM_MAX_BATCH", 8))
+    LOCAL_LLM_BATCH_WAIT_MS: int = int(os.getenv("LOCAL_LLM_BATCH_WAIT_MS", 20))
+    LOCAL_LLM_CONCURRENCY: int = int(os.getenv("LOCAL_LLM_CONCURRENCY", 1))
+    LOCAL_LLM_TORCH_THREADS: int = int(os.getenv("LOCAL_LLM_TORCH_THREADS", min(4, os.cpu_count() or 1)))
+
+    # --- Tracing (Server-Timing header, slow-trace buffer, optional OTLP export: "", "file" or "otlp") ---
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "True").lower() in ("true", "1", "yes")
+    TRACE_SLOW_MS: float = float(os.getenv("TRACE_SLOW_MS", 1000))
+    TRACE_SLOW_BUFFER: int = int(os.getenv("TRACE_SLOW_BUFFER", 100))
+    TRACE_MAX_SPANS: int = int(os.getenv("TRACE_MAX_SPANS", 256))
+    TRACE_EXPORT: str = os.getenv("TRACE_EXPORT", "").lower()
+    TRACE_EXPORT_FILE: str = os.getenv("TRACE_EXPORT_FILE", "traces.jsonl")
+    TRACE_OTLP_ENDPOINT: str = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "ai-worker")
+
+    # --- Admission control for expensive routes (0 concurrency = unlimited; queue timeout in ms) ---
+    ASK_CONCURRENCY: int = int(os.getenv("ASK_CONCURRENCY", 8))
+    ASK_QUEUE_SIZE: int = int(os.getenv("ASK_QUEUE_SIZE", 32))
+    ASK_QUEUE_TIMEOUT_MS: int = int(os.getenv("ASK_QUEUE_TIMEOUT_MS", 5000))
+    UPLOAD_CONCURRENCY: int = int(os.getenv("UPLOAD_CONCURRENCY", 4))
+    UPLOAD_QUEUE_SIZE: int = int(os.getenv("UPLOAD_QUEUE_SIZE", 16))
+    UPLOAD_QUEUE_TIMEOUT_MS: int = int(os.getenv("UPLOAD_QUEUE_TIMEOUT_MS", 10000))
+    ADMISSION_MAX_RETRY_AFTER: int = int(os.getenv("ADMISSION_MAX_RETRY_AFTER", 30))
+
+    # --- Profiling (admin only; per-request profiles via X-Profile header or a sample rate) ---
+    # Off by default: operators opt in with PROFILING_ENABLED=true; while off the endpoints 404 and nothing is sampled
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "False").lower() in ("true", "1", "yes")
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+    PROFILE_MAX_SECONDS: int = int(os.getenv("PROFILE_MAX_SECONDS", 60))
+    PROFILE_MAX_CONCURRENT: int = int(os.getenv("PROFILE_MAX_CONCURRENT", 4))
+    PROFILE_KEEP: int = int(os.getenv("PROFILE_KEEP", 50))
+    PROFILE_TRACEMALLOC_FRAMES: int = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", 10))
+
+    # --- Pipelines ---
+    PIPELINE_BRANCH_TIMEOUT_SECONDS: float = float(os.getenv("PIPELINE_BRANCH_TIMEOUT_SECONDS", 30))
+
+    # --- Summarization (map-reduce) ---
+    SUMMARY_CHUNK_TOKENS: int = int(os.getenv("SUMMARY_CHUNK_TOKENS", 3000))
+    SUMMARY_CONCURRENCY: int = int(os.getenv("SUMMARY_CONCURRENCY", 4))
+
+    # --- Upload ingestion ---
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", 100 * 1024 * 1024))
+    UPLOAD_CHUNK_BYTES: int = int(os.getenv("UPLOAD_CHUNK_BYTES", 1024 * 1024))
+    UPLOAD_STORE_DIR: str = os.getenv("UPLOAD_STORE_DIR", "uploads/objects")
+    INGEST_STALE_SECONDS: int = int(os.getenv("INGEST_STALE_SECONDS", 3600))
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", 8))
+    INGEST_EMBED_BATCH: int = int(os.getenv("INGEST_EMBED_BATCH", 32))
+    BULK_UPSERT_BATCH: int = int(os.getenv("BULK_UPSERT_BATCH", 200))
+    BULK_BATCH_FILES: int = int(os.getenv("BULK_BATCH_FILES", 64))
+    BULK_MAX_FILES: int = int(os.getenv("BULK_MAX_FILES", 10000))
+
+    # --- Watched-folder ingestion (disabled when WATCH_DIR is empty) ---
+    WATCH_DIR: str = os.getenv("WATCH_DIR", "")
+    WATCH_DEBOUNCE_MS: int = int(os.getenv("WATCH_DEBOUNCE_MS", 2000))
+    WATCH_BATCH_FILES: int = int(os.getenv("WATCH_BATCH_FILES", 32))
+
+    # --- Chunking (sizes in embedding-tokenizer tokens; MiniLM truncates at 256 incl. special tokens) ---
+    CHUNK_MAX_TOKENS: int = int(os.getenv("CHUNK_MAX_TOKENS", 254))
+    CHUNK_OVERLAP_TOKENS: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", 32))
+
+    # --- Document text extraction (process pool) ---
+    EXTRACT_WORKERS: int = int(os.getenv("EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+    EXTRACT_PAGES_PER_TASK: int = int(os.getenv("EXTRACT_PAGES_PER_TASK", 16))
+    EXTRACT_TIMEOUT_SECONDS: float = float(os.getenv("EXTRACT_TIMEOUT_SECONDS", 120))
+    EXTRACT_MEMORY_MB: int = int(os.getenv("EXTRACT_MEMORY_MB", 1024))
+
     class Config:
         env_file = ".env"
         extra = "ignore"
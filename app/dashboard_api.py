@@ -141,15 +141,28 @@
 
 # apps/backend/app/dashboard_api.py
 from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import PlainTextResponse
 from sqlmodel import select
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import uuid
 import logging
 
+import asyncio
+import time
+
 from .db import get_session
-from .models import Run, Report
-from .scheduler import scheduler, scheduled_news_summary, scheduled_stock_check, scheduled_google_trends
+from .auth import require_role
+from .config import settings
+from .tracing import slow_traces
+from .profiling import (
+    profile_process, list_request_profiles, get_request_profile, memory_start, memory_stop, memory_diff,
+)
+from .models import Run, Report, WatchlistItem
+from .watchlist import WATCHLIST_KINDS, normalize_entity
+from .utils.llm_providers import provider_health
+from .scheduler import submit_job, scheduled_news_summary, scheduled_stock_check, scheduled_google_trends
 
 logger = logging.getLogger("dashboard_api")
 logger.setLevel(logging.INFO)
@@ -264,8 +277,9 @@ async def request_task(
     if task_type not in job_map:
         raise HTTPException(status_code=400, detail="Invalid task_type")
 
-    # Schedule job to run once immediately
-    scheduler.add_job(job_map[task_type], trigger="date")
+    # Run job once immediately in this process (not via the shared job store,
+    # which only the scheduler leader processes)
+    submit_job(job_map[task_type])
     logger.info(f"Scheduled one-time {task_type} job via /request-task")
 
     # Log into DB with UUID
@@ -280,3 +294,155 @@ async def request_task(
     logger.info(f"Logged new run {run.id} for task {task_type}")
 
     return {"status": "success", "message": f"{task_type} task requested"}
+
+
+# -------------------------
+# LLM Savings Endpoint
+# -------------------------
+@router.get("/llm-savings")
+async def llm_savings(session: AsyncSession = Depends(get_session)):
+    """Runs whose inputs matched the last report's fingerprint, so no LLM call was made."""
+    result = await session.execute(
+        select(Run.job_type, func.count(Run.id))
+        .where(Run.status == "unchanged")
+        .group_by(Run.job_type)
+    )
+    by_kind = {job_type: count for job_type, count in result.all()}
+    return {"llm_calls_avoided": sum(by_kind.values()), "by_kind": by_kind}
+
+# -------------------------
+# LLM Providers Endpoint
+# -------------------------
+@router.get("/llm-providers")
+async def llm_providers():
+    """Circuit state, error counts and p50/p95 latency for each LLM provider in this worker."""
+    return provider_health()
+
+
+# -------------------------
+# Slow Traces Endpoint
+# -------------------------
+@router.get("/traces/slow")
+async def list_slow_traces(
+    limit: int = Query(20, ge=1, le=100),
+    user: dict = Depends(require_role("admin")),
+):
+    """Most recent requests and jobs in this worker that took longer than TRACE_SLOW_MS, with per-stage spans."""
+    return {"threshold_ms": settings.TRACE_SLOW_MS, "traces": slow_traces(limit)}
+
+
+# -------------------------
+# Profiling Endpoints (admin, this worker only)
+# -------------------------
+def _folded_download(body: str, name: str) -> PlainTextResponse:
+    """Collapsed stacks for flamegraph.pl / speedscope / inferno."""
+    return PlainTextResponse(body, headers={"Content-Disposition": f'attachment; filename="{name}.folded"'})
+
+
+def _require_profiling():
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+
+_profiling_enabled = [Depends(_require_profiling)]
+
+
+@router.get("/profile/cpu", dependencies=_profiling_enabled)
+async def cpu_profile(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(settings.PROFILE_INTERVAL_MS, ge=1, le=1000),
+    include_idle: bool = False,
+    user: dict = Depends(require_role("admin")),
+):
+    """Sample every thread of this worker for `seconds` and download the stacks."""
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be <= {settings.PROFILE_MAX_SECONDS}")
+    sampler = await profile_process(seconds, interval_ms, include_idle)
+    return _folded_download(sampler.folded(), f"cpu-{int(time.time())}")
+
+
+@router.get("/profile/requests", dependencies=_profiling_enabled)
+async def request_profiles(user: dict = Depends(require_role("admin"))):
+    """Per-request profiles kept in this worker (requests sent with X-Profile, or sampled)."""
+    return {"sample_rate": settings.PROFILE_SAMPLE_RATE, "profiles": list_request_profiles()}
+
+
+@router.get("/profile/requests/{profile_id}", dependencies=_profiling_enabled)
+async def request_profile_stacks(profile_id: str, user: dict = Depends(require_role("admin"))):
+    profile = get_request_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return _folded_download(profile.sampler.folded(), f"request-{profile_id}")
+
+
+@router.post("/profile/memory/start", dependencies=_profiling_enabled)
+async def start_memory_profile(
+    frames: int = Query(settings.PROFILE_TRACEMALLOC_FRAMES, ge=1, le=100),
+    user: dict = Depends(require_role("admin")),
+):
+    return memory_start(frames)
+
+
+@router.get("/profile/memory", dependencies=_profiling_enabled)
+async def memory_profile(
+    limit: int = Query(20, ge=1, le=200),
+    key_type: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    user: dict = Depends(require_role("admin")),
+):
+    """Top allocating call sites since the previous call (tracemalloc must be started first)."""
+    return await asyncio.to_thread(memory_diff, limit, key_type)
+
+
+@router.post("/profile/memory/stop", dependencies=_profiling_enabled)
+async def stop_memory_profile(user: dict = Depends(require_role("admin"))):
+    return memory_stop()
+
+
+# -------------------------
+# Watchlist Endpoints
+# -------------------------
+@router.get("/watchlist")
+async def list_watchlist(
+    kind: str | None = Query(None, description="Filter by kind: stock, news"),
+    session: AsyncSession = Depends(get_session)
+):
+    query = select(WatchlistItem).order_by(WatchlistItem.created_at.asc())
+    if kind:
+        query = query.where(WatchlistItem.kind == kind)
+    result = await session.execute(query)
+    return {"items": result.scalars().all()}
+
+
+@router.post("/watchlist")
+async def add_watchlist_items(
+    kind: str = Query(..., description="Kind: stock, news"),
+    entities: str = Query(..., description="Comma-separated symbols or topics"),
+    session: AsyncSession = Depends(get_session)
+):
+    if kind not in WATCHLIST_KINDS:
+        raise HTTPException(status_code=400, detail="Invalid kind")
+
+    requested = [normalize_entity(kind, e) for e in entities.split(",") if e.strip()]
+    result = await session.execute(select(WatchlistItem.entity).where(WatchlistItem.kind == kind))
+    existing = set(result.scalars().all())
+
+    added = []
+    for entity in dict.fromkeys(requested):
+        if entity in existing:
+            continue
+        session.add(WatchlistItem(kind=kind, entity=entity))
+        added.append(entity)
+    await session.commit()
+    logger.info(f"Added {len(added)} {kind} watchlist entries")
+
+    return {"status": "success", "added": added, "skipped": [e for e in requested if e not in added]}
+
+
+@router.delete("/watchlist/{item_id}")
+async def delete_watchlist_item(item_id: str, session: AsyncSession = Depends(get_session)):
+    item = await session.get(WatchlistItem, item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Watchlist item not found")
+    await session.delete(item)
+    await session.commit()
+    return {"status": "success", "deleted": item_id}
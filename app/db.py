@@ -28,9 +28,12 @@
 import os
 from typing import AsyncGenerator
 from sqlmodel import SQLModel, create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
+from .metrics import instrument_engine
+
 # Database URL (async for async operations)
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./database.db")
 
@@ -43,6 +46,8 @@ async_engine = create_async_engine(
     connect_args={"check_same_thread": False}  # Needed for SQLite
 )
 
+instrument_engine(async_engine.sync_engine)  # statement latency for /metrics
+
 async_session = sessionmaker(
     async_engine,
     class_=AsyncSession,
@@ -51,7 +56,7 @@ async_session = sessionmaker(
 
 async def async_init_db():
     """Initialize async DB (create tables)"""
-    from .models import Document, Insight, Run, Task, Report  # noqa
+    from .models import Document, Insight, Run, Task, Report, SchedulerLease, ScheduledJob, WatchlistItem, NewsWatermark, SummaryCache, ReportFingerprint, UploadManifest, IngestedDocument, DocumentChunk, WatchedFile  # noqa
     async with async_engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
 
@@ -63,9 +68,14 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
 # --------------------
 # Sync engine (for code that expects 'engine')
 # --------------------
-# Remove '+aiosqlite' for sync engine
-SYNC_DATABASE_URL = DATABASE_URL.replace("+aiosqlite", "")
+# Same database through the dialect's default (blocking) driver
+_ASYNC_DRIVERS = {"aiosqlite", "asyncpg", "aiomysql", "asyncmy", "psycopg_async"}
+_url = make_url(DATABASE_URL)
+SYNC_DATABASE_URL = (
+    _url.set(drivername=_url.get_backend_name()) if _url.get_driver_name() in _ASYNC_DRIVERS else _url
+).render_as_string(hide_password=False)
 engine = create_engine(
     SYNC_DATABASE_URL,
     echo=False
 )
+instrument_engine(engine)
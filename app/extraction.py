@@ -0,0 +1,261 @@
+# apps/backend/app/extraction.py
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from .config import settings
+
+try:
+    import resource  # POSIX only
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".txt", ".docx", ".pdf")
+TXT_LINES_PER_PAGE = 200
+DOCX_PARAGRAPHS_PER_PAGE = 50
+
+
+class ExtractionError(Exception):
+    """Extraction timed out, ran out of memory or crashed its worker."""
+
+
+# -------------------- Worker side -------------------- #
+# These run in pool processes; parser imports stay local so the parent
+# never pays for them and a spawned worker only loads what it uses.
+
+def _limit_memory(max_mb: int):
+    if resource is not None and max_mb > 0:
+        limit = max_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _pdf_page_count(path: str) -> int:
+    from PyPDF2 import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def _pdf_pages(path: str, start: int, end: int) -> List[str]:
+    from PyPDF2 import PdfReader
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, min(end, len(reader.pages)))]
+
+
+def _docx_blocks(path: str) -> List[str]:
+    from docx import Document
+    paragraphs = [p.text for p in Document(path).paragraphs if p.text]
+    return [
+        "\n".join(paragraphs[i : i + DOCX_PARAGRAPHS_PER_PAGE])
+        for i in range(0, len(paragraphs), DOCX_PARAGRAPHS_PER_PAGE)
+    ]
+
+
+def _bytes_pages(data: bytes, suffix: str) -> List[str]:
+    """Whole-document extraction from in-memory bytes (archive members, bulk uploads)."""
+    import io
+    if suffix == ".pdf":
+        from PyPDF2 import PdfReader
+        return [page.extract_text() or "" for page in PdfReader(io.BytesIO(data)).pages]
+    from docx import Document
+    paragraphs = [p.text for p in Document(io.BytesIO(data)).paragraphs if p.text]
+    return [
+        "\n".join(paragraphs[i : i + DOCX_PARAGRAPHS_PER_PAGE])
+        for i in range(0, len(paragraphs), DOCX_PARAGRAPHS_PER_PAGE)
+    ]
+
+
+# -------------------- Process pool -------------------- #
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs threads and an event loop is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_limit_memory,
+                initargs=(settings.EXTRACT_MEMORY_MB,),
+            )
+        return _pool
+
+
+def _reset_pool(pool: ProcessPoolExecutor):
+    """
+    Kill the workers of `pool` and stop handing it out. A runaway parser
+    cannot be cancelled from outside, so this is the only way to get its
+    CPU back; a pool broken by a dead worker (parser crash, memory cap) is
+    unusable anyway. Other documents extracting on the same pool are
+    resubmitted to a fresh one.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    for proc in list((pool._processes or {}).values()):
+        proc.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_extraction_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Budget:
+    """
+    Seconds a document may spend waiting on the parser. Only time blocked on
+    a pool result counts: while a page is with the consumer (chunking,
+    embedding) the clock is stopped, so a slow consumer can't time out a
+    document that parses fine.
+    """
+
+    def __init__(self, seconds: float):
+        self.remaining = seconds
+
+    def wait(self, future):
+        started = time.monotonic()
+        try:
+            return future.result(timeout=max(0.0, self.remaining))
+        finally:
+            self.remaining -= time.monotonic() - started
+
+
+def _timed_out(pool: ProcessPoolExecutor, future):
+    """Kill the pool only if the task is actually running; one still queued behind others is just dropped."""
+    if not future.cancel():
+        _reset_pool(pool)
+
+
+def _submit(label: str, fn, *args):
+    """Submit to the current pool, replacing it once if it is broken or was just shut down. Returns (pool, future)."""
+    for attempt in range(2):
+        pool = _get_pool()
+        try:
+            return pool, pool.submit(fn, *args)
+        except (BrokenProcessPool, RuntimeError):
+            _reset_pool(pool)
+            if attempt:
+                raise ExtractionError(f"Could not start extraction of {label}: worker pool unavailable")
+
+
+def _call(budget: _Budget, label: str, fn, *args):
+    """Run `fn(*args)` in the pool within `budget`, retrying once on a fresh pool if a worker died."""
+    for attempt in range(2):
+        pool, future = _submit(label, fn, *args)
+        try:
+            return budget.wait(future)
+        except FutureTimeout:
+            _timed_out(pool, future)
+            raise ExtractionError(f"Extraction of {label} timed out")
+        except BrokenProcessPool:
+            _reset_pool(pool)
+            if attempt:
+                raise ExtractionError(f"Extraction worker for {label} crashed (memory cap exceeded?)")
+        except MemoryError:
+            raise ExtractionError(f"Extraction of {label} exceeded the {settings.EXTRACT_MEMORY_MB} MB memory cap")
+
+
+# -------------------- Public API -------------------- #
+def _iter_txt(path: Path) -> Iterator[str]:
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        lines = []
+        for line in f:
+            lines.append(line)
+            if len(lines) >= TXT_LINES_PER_PAGE:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
+
+
+def _iter_pdf(path: Path, budget: _Budget) -> Iterator[str]:
+    """
+    Page ranges are extracted in parallel, a bounded window ahead of the
+    consumer, and yielded in page order.
+    """
+    label = path.name
+    page_count = _call(budget, label, _pdf_page_count, str(path))
+    step = max(1, settings.EXTRACT_PAGES_PER_TASK)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    window = max(1, settings.EXTRACT_WORKERS) * 2
+
+    def submit(start: int, end: int):
+        return ((start, end), *_submit(label, _pdf_pages, str(path), start, end))
+
+    pending = []  # (range, pool, future) in page order
+    next_range = 0
+    try:
+        while pending or next_range < len(ranges):
+            while next_range < len(ranges) and len(pending) < window:
+                pending.append(submit(*ranges[next_range]))
+                next_range += 1
+
+            (start, end), pool, future = pending.pop(0)
+            try:
+                pages = budget.wait(future)
+            except FutureTimeout:
+                _timed_out(pool, future)
+                raise ExtractionError(f"Extraction of {label} timed out at pages {start + 1}-{end}")
+            except BrokenProcessPool:
+                # A worker died or another document's timeout recycled the pool; redo the in-flight ranges on a fresh one
+                _reset_pool(pool)
+                pages = _call(budget, label, _pdf_pages, str(path), start, end)
+                pending = [submit(s, e) for (s, e), _, _ in pending]
+            except MemoryError:
+                raise ExtractionError(f"Extraction of {label} exceeded the {settings.EXTRACT_MEMORY_MB} MB memory cap")
+            yield from pages
+    finally:
+        # Consumer stopped early or extraction failed: don't leave work queued
+        for _, _, future in pending:
+            future.cancel()
+
+
+def iter_pages(file_path: Path, timeout: Optional[float] = None) -> Iterator[str]:
+    """
+    Yield text page by page (PDF pages, blocks of DOCX paragraphs or TXT
+    lines). PDF and DOCX parsing runs in a process pool with a per-document
+    `timeout` (seconds of waiting on the parser, default
+    EXTRACT_TIMEOUT_SECONDS) and a per-worker memory cap; either limit
+    raises ExtractionError. Raises ValueError for unsupported file types.
+    """
+    budget = _Budget(timeout or settings.EXTRACT_TIMEOUT_SECONDS)
+    suffix = file_path.suffix.lower()
+    started = time.perf_counter()
+
+    if suffix == ".txt":
+        yield from _iter_txt(file_path)
+    elif suffix == ".docx":
+        yield from _call(budget, file_path.name, _docx_blocks, str(file_path))
+    elif suffix == ".pdf":
+        yield from _iter_pdf(file_path, budget)
+    else:
+        raise ValueError(f"Unsupported file type: {suffix or file_path.name}")
+
+    logger.info(f"📄 Extracted {file_path.name} in {time.perf_counter() - started:.2f}s")
+
+
+def extract_bytes(data: bytes, filename: str, timeout: Optional[float] = None) -> List[str]:
+    """
+    Page texts of an in-memory document, for content that never touches
+    disk. Parallelism is across documents (one pool task each), with the
+    same timeout and memory cap as iter_pages.
+    """
+    suffix = Path(filename).suffix.lower()
+    if suffix == ".txt":
+        return [data.decode("utf-8", errors="ignore")]
+    if suffix not in (".pdf", ".docx"):
+        raise ValueError(f"Unsupported file type: {suffix or filename}")
+    return _call(_Budget(timeout or settings.EXTRACT_TIMEOUT_SECONDS), filename, _bytes_pages, data, suffix)
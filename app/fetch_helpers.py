@@ -1,70 +1,76 @@
-import os
+import math
+import time
+import asyncio
+import hashlib
 import logging
-import requests
+import httpx
 from fastapi import HTTPException
 
-from .utils.vector_db import upsert_embeddings
-from .utils.fallback_llm import get_embedding_with_fallback
+from .config import settings
+from .db import async_session
+from .models import NewsWatermark, utc_now
+from .utils.vector_db import upsert_embeddings, fetch_existing_ids
+from .utils.fallback_llm import get_embeddings_with_fallback
+from .utils.rate_limiter import acquire_quota, quota_retry_after
+from .utils.offline import OFFLINE, RECORD, api_key, record_fixture, fixture_transport
+from .metrics import observe_upstream, count_cache
 
 logger = logging.getLogger(__name__)
 
-# -------------------- NewsAPI Helper -------------------- #
-def fetch_news_helper(topic: str = "AI", limit: int = 5, do_embed: bool = True):
-    NEWS_API_KEY = os.getenv("NEWS_API_KEY")
-    if not NEWS_API_KEY:
-        raise HTTPException(status_code=500, detail="NEWS_API_KEY not set")
+NEWS_API_URL = "https://newsapi.org/v2/everything"
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+GOOGLE_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
 
-    url = f"https://newsapi.org/v2/everything?q={topic}&language=en&sortBy=publishedAt&pageSize={limit}&apiKey={NEWS_API_KEY}"
-    try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-    except Exception as e:
-        logger.warning(f"⚠️ NewsAPI request failed: {e}")
-        return []
+# Shared async HTTP client (connection pooling across scheduled jobs)
+_async_client: httpx.AsyncClient | None = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        # Offline mode answers upstream requests from recorded fixtures
+        _async_client = httpx.AsyncClient(timeout=10, transport=fixture_transport() if OFFLINE else None)
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
 
+
+# -------------------- Response parsers -------------------- #
+def news_doc_id(url: str, text: str) -> str:
+    """Stable, content-derived ID so the same article always maps to the same vector."""
+    digest = hashlib.sha256(f"{url}\n{text}".encode("utf-8")).hexdigest()
+    return f"news_{digest[:32]}"
+
+
+def _parse_news(data: dict, limit: int) -> list[dict]:
     if data.get("status") != "ok":
         logger.warning(f"⚠️ NewsAPI error: {data}")
         return []
 
     articles = []
-    for i, art in enumerate(data.get("articles", [])[:limit]):
-        title = art.get("title", "")
-        desc = art.get("description", "")
+    for art in data.get("articles", [])[:limit]:
+        title = art.get("title") or ""
+        desc = art.get("description") or ""
         text = f"{title} {desc}".strip()
         if not text:
             continue
-
-        emb = get_embedding_with_fallback(text) if do_embed else None
+        url = art.get("url", "unknown")
         articles.append({
-            "doc_id": f"news_{i}",
-            "chunk_id": f"chunk_{i}",
+            "doc_id": news_doc_id(url, text),
+            "chunk_id": "chunk_0",
             "text": text,
-            "source": art.get("url", "unknown"),
-            "embedding": emb
+            "source": url,
+            "published_at": art.get("publishedAt"),
         })
-
-    if articles and do_embed:
-        upsert_embeddings(articles, provider="newsapi")
-
     return articles
 
 
-# -------------------- Alpha Vantage Stock Helper -------------------- #
-def fetch_stock_helper(symbol: str = "AAPL", limit: int = 5, do_embed: bool = True):
-    ALPHA_KEY = os.getenv("ALPHA_KEY")
-    if not ALPHA_KEY:
-        raise HTTPException(status_code=500, detail="ALPHA_KEY not set")
-
-    url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={symbol}&apikey={ALPHA_KEY}"
-    try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-    except Exception as e:
-        logger.warning(f"⚠️ AlphaVantage request failed: {e}")
-        return []
-
+def _parse_stock(data: dict, symbol: str, limit: int) -> list[dict]:
     if "Error Message" in data or "Note" in data:
         logger.warning(f"⚠️ AlphaVantage error: {data}")
         return []
@@ -73,60 +79,221 @@ def fetch_stock_helper(symbol: str = "AAPL", limit: int = 5, do_embed: bool = Tr
     articles = []
     for i, (date, metrics) in enumerate(list(daily.items())[:limit]):
         text = f"{symbol} on {date}: Open {metrics['1. open']}, Close {metrics['4. close']}, Volume {metrics['5. volume']}"
-        emb = get_embedding_with_fallback(text) if do_embed else None
         articles.append({
             "doc_id": f"{symbol}_{date}",
             "chunk_id": f"chunk_{i}",
             "text": text,
             "source": "Alpha Vantage",
-            "embedding": emb
         })
-
-    if articles and do_embed:
-        upsert_embeddings(articles, provider="alphavantage")
-
     return articles
 
 
-# -------------------- Google Search Helper -------------------- #
-def search_web_helper(query: str, limit: int = 5, do_embed: bool = True):
-    GOOGLE_KEY = os.getenv("GOOGLE_KEY")
-    CX_ID = os.getenv("CX_ID")
-    if not GOOGLE_KEY or not CX_ID:
-        raise HTTPException(status_code=500, detail="GOOGLE_KEY or CX_ID not set")
-
-    url = f"https://www.googleapis.com/customsearch/v1?q={query}&key={GOOGLE_KEY}&cx={CX_ID}"
-    try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-    except Exception as e:
-        logger.warning(f"⚠️ Google search request failed: {e}")
-        return []
-
+def _parse_search(data: dict, limit: int) -> list[dict]:
     if "error" in data:
         logger.warning(f"⚠️ Google API error: {data}")
         return []
 
-    items = data.get("items", [])
     results = []
-    for i, item in enumerate(items[:limit]):
+    for i, item in enumerate(data.get("items", [])[:limit]):
         title = item.get("title", "")
         snippet = item.get("snippet", "")
         text = f"{title} {snippet}".strip()
         if not text:
             continue
-
-        emb = get_embedding_with_fallback(text) if do_embed else None
         results.append({
             "doc_id": f"google_{i}",
             "chunk_id": f"chunk_{i}",
             "text": text,
             "source": item.get("link", "unknown"),
-            "embedding": emb
         })
+    return results
 
-    if results and do_embed:
-        upsert_embeddings(results, provider="google")
 
-    return results
+def _vector_id(item: dict) -> str:
+    return f"{item['doc_id']}__{item['chunk_id']}"
+
+
+def _embed_and_upsert(items: list[dict], provider: str) -> list[dict]:
+    """
+    Embed and upsert, in one batch, only the items not already in the index (blocking).
+    Returns the newly indexed items; already-indexed ones keep `embedding=None`.
+    """
+    for item in items:
+        item["embedding"] = None
+    try:
+        existing = fetch_existing_ids([_vector_id(item) for item in items])
+    except Exception as e:
+        logger.warning(f"⚠️ Could not check existing vectors, embedding all: {e}")
+        existing = set()
+
+    new_items = [item for item in items if _vector_id(item) not in existing]
+    count_cache("vector_dedupe", len(items) - len(new_items), len(new_items))
+    if not new_items:
+        return []
+    embeddings = get_embeddings_with_fallback([item["text"] for item in new_items])
+    for item, emb in zip(new_items, embeddings):
+        item["embedding"] = emb
+    upsert_embeddings(new_items, provider=provider)
+    return new_items
+
+
+def _news_params(topic: str, limit: int, since: str | None = None) -> dict:
+    NEWS_API_KEY = api_key("NEWS_API_KEY")
+    if not NEWS_API_KEY:
+        raise HTTPException(status_code=500, detail="NEWS_API_KEY not set")
+    params = {"q": topic, "language": "en", "sortBy": "publishedAt", "pageSize": limit, "apiKey": NEWS_API_KEY}
+    if since:
+        params["from"] = since
+    return params
+
+
+def _stock_params(symbol: str) -> dict:
+    ALPHA_KEY = api_key("ALPHA_KEY")
+    if not ALPHA_KEY:
+        raise HTTPException(status_code=500, detail="ALPHA_KEY not set")
+    return {"function": "TIME_SERIES_DAILY", "symbol": symbol, "apikey": ALPHA_KEY}
+
+
+def _search_params(query: str) -> dict:
+    GOOGLE_KEY = api_key("GOOGLE_KEY")
+    CX_ID = api_key("CX_ID")
+    if not GOOGLE_KEY or not CX_ID:
+        raise HTTPException(status_code=500, detail="GOOGLE_KEY or CX_ID not set")
+    return {"q": query, "key": GOOGLE_KEY, "cx": CX_ID}
+
+
+# -------------------- Fetchers -------------------- #
+# Network I/O runs on the event loop; only the CPU-bound embedding and the
+# Pinecone upsert are pushed to `executor` (defaults to the loop's pool).
+# Every call waits for a slot from the provider's quota pacer first.
+# Interactive callers pass a short `max_wait` and get a 429 instead of a
+# place in the queue; background sweeps wait up to QUOTA_MAX_WAIT_SECONDS.
+async def _aget_json(url: str, params: dict, label: str, provider: str,
+                     max_wait: float | None = None) -> dict | None:
+    if not await acquire_quota(provider, max_wait, interactive=max_wait is not None):
+        if max_wait is not None:
+            raise HTTPException(
+                status_code=429,
+                detail=f"{label} quota exhausted. Try again later.",
+                headers={"Retry-After": str(math.ceil(quota_retry_after(provider)))},
+            )
+        logger.warning(f"⚠️ {label} request skipped: quota exhausted")
+        return None
+    started = time.perf_counter()
+    try:
+        resp = await get_async_client().get(url, params=params)
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception as e:
+        observe_upstream(provider, "fetch", time.perf_counter() - started, e)
+        logger.warning(f"⚠️ {label} request failed: {e}")
+        return None
+    observe_upstream(provider, "fetch", time.perf_counter() - started)
+    if RECORD:
+        record_fixture(url, params, data)
+    return data
+
+
+async def _aembed(items: list[dict], provider: str, do_embed: bool, executor=None) -> list[dict]:
+    if items and do_embed:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, _embed_and_upsert, items, provider)
+    else:
+        for item in items:
+            item["embedding"] = None
+    return items
+
+
+# -------------------- News watermarks -------------------- #
+def _topic_key(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+async def get_news_watermark(topic: str) -> str | None:
+    async with async_session() as session:
+        mark = await session.get(NewsWatermark, _topic_key(topic))
+        return mark.published_at if mark else None
+
+
+async def set_news_watermark(topic: str, published_at: str):
+    async with async_session() as session:
+        mark = await session.get(NewsWatermark, _topic_key(topic))
+        if mark is None:
+            session.add(NewsWatermark(topic=_topic_key(topic), published_at=published_at))
+        elif published_at > mark.published_at:
+            mark.published_at = published_at
+            mark.updated_at = utc_now()
+        await session.commit()
+
+
+async def fetch_news_async(
+    topic: str = "AI",
+    limit: int = 5,
+    do_embed: bool = True,
+    executor=None,
+    incremental: bool = False,
+    max_wait: float | None = None,
+):
+    """
+    With `incremental=True` every article published since the topic's
+    watermark is requested (newest first, page by page until the watermark
+    is reached), already-indexed ones are dropped before embedding, and
+    only genuinely new articles are returned. `limit` then only caps the
+    first request's page size when there is no watermark yet.
+    """
+    if not incremental:
+        data = await _aget_json(NEWS_API_URL, _news_params(topic, limit), "NewsAPI", "newsapi", max_wait)
+        if data is None:
+            return []
+        return await _aembed(_parse_news(data, limit), "newsapi", do_embed, executor)
+
+    since = await get_news_watermark(topic)
+    page_size = settings.NEWS_PAGE_SIZE if since else limit
+    articles = []
+    complete = True
+    for page in range(1, settings.NEWS_MAX_PAGES + 1):
+        params = {**_news_params(topic, page_size, since), "page": page}
+        data = await _aget_json(NEWS_API_URL, params, "NewsAPI", "newsapi", max_wait)
+        if data is None:
+            complete = False
+            break
+        articles.extend(_parse_news(data, page_size))
+        if not since or len(data.get("articles", [])) < page_size:
+            break  # first run (no watermark to reach) or the last page
+    else:
+        complete = False
+
+    # NewsAPI's `from` is inclusive, so the boundary article comes back again
+    articles = [a for a in articles if not since or (a["published_at"] or "") >= since]
+    if not articles:
+        return []
+
+    loop = asyncio.get_running_loop()
+    new_articles = await loop.run_in_executor(executor, _embed_and_upsert, articles, "newsapi")
+
+    # Only move the watermark once everything since it has been seen; if paging
+    # stopped short, the next sweep pages down from the newest again (already
+    # indexed articles cost a request, not an embedding)
+    newest = max((a["published_at"] for a in articles if a["published_at"]), default=None)
+    if newest and complete:
+        await set_news_watermark(topic, newest)
+    elif not complete:
+        logger.warning(f"⚠️ {topic}: stopped after {len(articles)} articles without reaching the watermark; kept it")
+    logger.info(f"📰 {topic}: {len(new_articles)} new of {len(articles)} fetched articles")
+    return new_articles
+
+
+async def fetch_stock_async(symbol: str = "AAPL", limit: int = 5, do_embed: bool = True, executor=None,
+                            max_wait: float | None = None):
+    data = await _aget_json(ALPHA_VANTAGE_URL, _stock_params(symbol), "AlphaVantage", "alphavantage", max_wait)
+    if data is None:
+        return []
+    return await _aembed(_parse_stock(data, symbol, limit), "alphavantage", do_embed, executor)
+
+
+async def search_web_async(query: str, limit: int = 5, do_embed: bool = True, executor=None,
+                           max_wait: float | None = None):
+    data = await _aget_json(GOOGLE_SEARCH_URL, _search_params(query), "Google search", "google", max_wait)
+    if data is None:
+        return []
+    return await _aembed(_parse_search(data, limit), "google", do_embed, executor)
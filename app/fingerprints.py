@@ -0,0 +1,29 @@
+# apps/backend/app/fingerprints.py
+import hashlib
+from typing import List, Optional
+
+from .db import async_session
+from .models import ReportFingerprint
+
+
+def fingerprint_key(kind: str, entity: Optional[str]) -> str:
+    return f"{kind}:{(entity or '').strip().lower()}"
+
+
+def fingerprint_inputs(texts: List[str], instruction: str = "") -> str:
+    """
+    Order- and whitespace-insensitive hash of a job's input set. The
+    instruction is included so a prompt change still produces a new report.
+    """
+    normalized = sorted(" ".join(t.lower().split()) for t in texts if t and t.strip())
+    h = hashlib.sha256(instruction.encode("utf-8"))
+    for text in normalized:
+        h.update(b"\0")
+        h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+async def get_last_fingerprint(kind: str, entity: Optional[str]) -> Optional[ReportFingerprint]:
+    """Fingerprint behind the last report of this kind and entity, if any."""
+    async with async_session() as session:
+        return await session.get(ReportFingerprint, fingerprint_key(kind, entity))
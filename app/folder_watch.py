@@ -0,0 +1,229 @@
+# apps/backend/app/folder_watch.py
+import time
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlmodel import select
+from watchfiles import awatch, Change
+
+from .config import settings
+from .db import async_session
+from .models import WatchedFile, utc_now
+from .leader_lease import try_acquire_lease, release_lease, INSTANCE_ID
+from .bulk_ingest import file_sha256, extract_chunks, index_documents, Throughput, delete_vectors
+from .chunk_manifest import forget_document
+from .extraction import SUPPORTED_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "folder-watch"
+
+throughput = Throughput()
+_queue: Dict[str, None] = {}  # relative paths waiting to be processed, in arrival order
+_queue_event = asyncio.Event()
+_main_task: Optional[asyncio.Task] = None
+_leader = False
+
+
+def _watch_filter(change: Change, path: str) -> bool:
+    name = Path(path).name
+    return name.lower().endswith(SUPPORTED_EXTENSIONS) and not name.startswith((".", "~$"))
+
+
+def _relative(root: Path, path: Path) -> str:
+    return path.relative_to(root).as_posix()
+
+
+# -------------------- Checkpoints -------------------- #
+async def _load_checkpoints() -> Dict[str, WatchedFile]:
+    async with async_session() as session:
+        result = await session.execute(select(WatchedFile))
+        return {row.path: row for row in result.scalars().all()}
+
+
+async def _save_checkpoints(rows: List[WatchedFile]):
+    async with async_session() as session:
+        for row in rows:
+            await session.merge(row)
+        await session.commit()
+
+
+async def _drop_checkpoint(rel: str):
+    async with async_session() as session:
+        row = await session.get(WatchedFile, rel)
+        if row:
+            await session.delete(row)
+            await session.commit()
+
+
+def _enqueue(rel: str):
+    _queue.pop(rel, None)
+    _queue[rel] = None
+    _queue_event.set()
+
+
+# -------------------- Processing -------------------- #
+def _prepare(root: Path, rel: str) -> Dict[str, Any]:
+    """Stat, hash, extract and chunk one file (blocking)."""
+    path = root / rel
+    stat = path.stat()
+    doc = {"name": rel, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(path)}
+    try:
+        doc["chunks"] = extract_chunks(path)
+    except Exception as e:
+        doc.update(chunks=[], error=str(e))
+    return doc
+
+
+async def _process_batch(root: Path, paths: List[str]):
+    started = time.perf_counter()
+    checkpoints = await _load_checkpoints()
+
+    async def prepare(rel: str) -> Optional[Dict[str, Any]]:
+        try:
+            stat = (root / rel).stat()
+        except FileNotFoundError:
+            return None
+        seen = checkpoints.get(rel)
+        if seen and seen.status != "failed" and (seen.size, seen.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+            return None  # already processed in an earlier run
+        try:
+            return await asyncio.to_thread(_prepare, root, rel)
+        except FileNotFoundError:
+            return None
+
+    # Files extract concurrently; the extraction pool bounds actual parallelism
+    docs = [d for d in await asyncio.gather(*(prepare(rel) for rel in paths)) if d]
+    if not docs:
+        return
+    results = await index_documents(docs, provider="watched_folder")
+
+    rows = []
+    for doc, result in zip(docs, results):
+        error = result["error"] or doc.get("error")
+        rows.append(WatchedFile(
+            path=doc["name"], size=doc["size"], mtime_ns=doc["mtime_ns"], sha256=doc["sha256"],
+            status=result["status"], doc_id=result["doc_id"], error=error, updated_at=utc_now(),
+        ))
+        if result["status"] == "failed":
+            logger.warning(f"⚠️ Watched file {doc['name']} failed: {error}")
+    await _save_checkpoints(rows)
+    throughput.record(results, time.perf_counter() - started)
+
+
+async def _handle_deleted(rel: str):
+    ids = await forget_document(rel)
+    await delete_vectors(asyncio.get_running_loop(), None, ids)
+    await _drop_checkpoint(rel)
+    logger.info(f"🗑️ Watched file {rel} removed; deleted {len(ids)} vectors")
+
+
+async def _worker(root: Path):
+    while True:
+        await _queue_event.wait()
+        batch = list(_queue)[: settings.WATCH_BATCH_FILES]
+        for rel in batch:
+            _queue.pop(rel, None)
+        if not _queue:
+            _queue_event.clear()
+        try:
+            await _process_batch(root, batch)
+        except Exception as e:
+            logger.error(f"❌ Watched-folder batch failed: {e}")
+            await asyncio.sleep(settings.WATCH_DEBOUNCE_MS / 1000)
+
+
+async def _run_watcher(root: Path):
+    """Catch up on whatever changed while we weren't watching, then follow file events."""
+    worker = asyncio.create_task(_worker(root))
+    try:
+        checkpoints = await _load_checkpoints()
+        present = set()
+        for path in sorted(root.rglob("*")):
+            if path.is_file() and _watch_filter(Change.added, str(path)):
+                rel = _relative(root, path)
+                present.add(rel)
+                _enqueue(rel)  # unchanged files are skipped cheaply against their checkpoint
+        for rel in set(checkpoints) - present:
+            await _handle_deleted(rel)
+        logger.info(f"📂 Watching {root} ({len(present)} files, {len(_queue)} queued)")
+
+        async for changes in awatch(root, watch_filter=_watch_filter, debounce=settings.WATCH_DEBOUNCE_MS):
+            for change, raw in changes:
+                rel = _relative(root, Path(raw))
+                if change == Change.deleted:
+                    _queue.pop(rel, None)
+                    await _handle_deleted(rel)
+                else:
+                    _enqueue(rel)
+    finally:
+        worker.cancel()
+        # Whoever watches next rescans the folder
+        _queue.clear()
+        _queue_event.clear()
+
+
+async def _watch_main(root: Path):
+    """Only the lease holder watches, so several workers don't ingest the same files."""
+    global _leader
+    ttl = settings.SCHEDULER_LEASE_TTL_SECONDS
+    watcher: Optional[asyncio.Task] = None
+    try:
+        while True:
+            try:
+                acquired = await try_acquire_lease(LEASE_NAME, ttl)
+            except Exception as e:
+                logger.error(f"❌ Folder-watch lease renewal failed: {e}")
+                acquired = False
+
+            if acquired and watcher is None:
+                _leader = True
+                watcher = asyncio.create_task(_run_watcher(root))
+                logger.info(f"👑 {INSTANCE_ID} is watching {root}")
+            elif not acquired and watcher is not None:
+                _leader = False
+                watcher.cancel()
+                watcher = None
+                logger.info(f"⏸️ {INSTANCE_ID} lost the folder-watch lease")
+            elif watcher is not None and watcher.done() and not watcher.cancelled():
+                logger.error(f"❌ Folder watcher stopped: {watcher.exception()}; restarting")
+                watcher = asyncio.create_task(_run_watcher(root))
+
+            await asyncio.sleep(settings.SCHEDULER_LEASE_RENEW_SECONDS)
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+
+def start_folder_watch():
+    """Start watching WATCH_DIR if configured. Must be called from the running event loop."""
+    global _main_task
+    if not settings.WATCH_DIR:
+        return
+    root = Path(settings.WATCH_DIR).resolve()
+    root.mkdir(parents=True, exist_ok=True)
+    _main_task = asyncio.create_task(_watch_main(root))
+
+
+async def stop_folder_watch():
+    global _leader
+    if _main_task is not None:
+        _main_task.cancel()
+    if _leader:
+        _leader = False
+        try:
+            await release_lease(LEASE_NAME)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not release folder-watch lease: {e}")
+
+
+def watch_status() -> Dict[str, Any]:
+    return {
+        "enabled": bool(settings.WATCH_DIR),
+        "directory": settings.WATCH_DIR or None,
+        "watching": _leader,
+        "queued": len(_queue),
+        "throughput": throughput.snapshot(),
+    }
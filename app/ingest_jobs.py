@@ -0,0 +1,280 @@
+# apps/backend/app/ingest_jobs.py
+import json
+import time
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from .config import settings
+from .db import async_session
+from .models import Run, utc_now
+from .upload_store import update_manifest, drop_manifest
+from .chunking import StreamChunker
+from .chunk_manifest import stable_chunk_id, vector_id, load_chunk_ids, replace_chunk_manifest
+from .utils.vector_db import upsert_embeddings, delete_embeddings
+from .utils.fallback_llm import get_embeddings_with_fallback
+from .tracing import start_trace, span
+from .metrics import count_cache
+
+logger = logging.getLogger(__name__)
+
+# In-process progress for jobs started by this worker; the Run row is the
+# durable copy (read by /upload/status when the job lives in another worker).
+_jobs: Dict[str, Dict[str, Any]] = {}
+_tasks: set[asyncio.Task] = set()
+
+_DONE = object()
+PERSIST_EVERY_SECONDS = 2.0
+MAX_TRACKED_JOBS = 1000
+DELETE_BATCH = 1000
+
+
+async def load_job_progress(job_id: str) -> Optional[Dict[str, Any]]:
+    """Progress from this process if known, otherwise the last snapshot saved on the Run row."""
+    progress = _jobs.get(job_id)
+    if progress:
+        return {k: v for k, v in progress.items() if not k.startswith("_")}
+    async with async_session() as session:
+        run = await session.get(Run, job_id)
+    if not run or run.job_type != "upload":
+        return None
+    log = json.loads(run.state_log or "[]")
+    return log[-1] if log else {"job_id": run.id, "status": run.status}
+
+
+async def _persist(progress: Dict[str, Any], force: bool = False):
+    now = time.monotonic()
+    if not force and now - progress.get("_persisted", 0.0) < PERSIST_EVERY_SECONDS:
+        return
+    progress["_persisted"] = now
+    snapshot = {k: v for k, v in progress.items() if not k.startswith("_")}
+    try:
+        async with async_session() as session:
+            run = await session.get(Run, progress["job_id"])
+            if run:
+                run.status = progress["status"]
+                run.state_log = json.dumps([snapshot])
+                if progress["status"] in ("completed", "failed"):
+                    run.finished_at = utc_now()
+                await session.commit()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not persist ingest progress for {progress['job_id']}: {e}")
+
+
+async def start_ingest_job(file_path: Path, filename: str, doc_id: str,
+                           sha256: Optional[str] = None, document: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Record the job, start the background pipeline and return immediately.
+    With `sha256`, the upload manifest entry for that content is marked
+    indexed on success (or released on failure). `document` is the logical
+    document key the chunk manifest is recorded under (default: filename).
+    """
+    progress = {
+        "job_id": None,
+        "doc_id": doc_id,
+        "filename": filename,
+        "status": "queued",
+        "pages_extracted": 0,
+        "chunks_created": 0,
+        "chunks_embedded": 0,
+        "chunks_indexed": 0,
+        "chunks_reused": 0,
+        "chunks_deleted": 0,
+        "error": None,
+    }
+    async with async_session() as session:
+        run = Run(status="queued", job_type="upload", state_log=json.dumps([progress]))
+        session.add(run)
+        await session.commit()
+    progress["job_id"] = run.id
+    progress["_document"] = document or filename
+    if sha256:
+        progress["_sha256"] = sha256
+        await update_manifest(sha256, job_id=run.id)
+    _jobs[run.id] = progress
+    if len(_jobs) > MAX_TRACKED_JOBS:
+        # Forget the oldest finished jobs; their final state is on the Run row
+        for job_id in [j for j, p in _jobs.items() if p["status"] in ("completed", "failed")][: len(_jobs) - MAX_TRACKED_JOBS]:
+            _jobs.pop(job_id, None)
+
+    task = asyncio.create_task(_traced_ingest(progress, file_path))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return progress
+
+
+async def _traced_ingest(progress: Dict[str, Any], file_path: Path):
+    # Its own trace: the upload request that started the job has already returned
+    with start_trace("ingest", job_id=progress["job_id"], filename=progress["filename"]):
+        await _run_ingest(progress, file_path)
+
+
+async def _run_ingest(progress: Dict[str, Any], file_path: Path):
+    """
+    extract -> chunk -> embed -> upsert, each stage a coroutine connected by
+    bounded queues so a large document never sits fully in memory and
+    embedding starts as soon as the first pages are parsed.
+    """
+    # Local import: upload_api imports this module for its routes
+    from .upload_api import iter_extract_pages
+
+    loop = asyncio.get_running_loop()
+    size = settings.INGEST_QUEUE_SIZE
+    pages_q: asyncio.Queue = asyncio.Queue(maxsize=size)
+    chunks_q: asyncio.Queue = asyncio.Queue(maxsize=size)
+    vectors_q: asyncio.Queue = asyncio.Queue(maxsize=size)
+
+    async def extract_stage():
+        # Stage spans cover wall time, including waits on the next stage's queue
+        with span("extract"):
+            pages = iter_extract_pages(file_path)
+            while True:
+                page = await loop.run_in_executor(None, next, pages, _DONE)
+                if page is _DONE:
+                    break
+                progress["pages_extracted"] += 1
+                if page:
+                    await pages_q.put(page)
+        await pages_q.put(_DONE)
+
+    async def chunk_stage():
+        # Paragraph/sentence-aligned, token-bounded chunks carried across pages.
+        # Cuts prefer paragraph breaks, so after an edit later chunks realign
+        # and keep their content-hash IDs in the next version.
+        chunker = StreamChunker()
+        index = 0
+
+        async def emit(chunks: list[str]):
+            nonlocal index
+            for text in chunks:
+                await chunks_q.put((index, text))
+                progress["chunks_created"] += 1
+                index += 1
+
+        with span("chunk"):
+            while (page := await pages_q.get()) is not _DONE:
+                # Tokenizing is CPU-bound, keep it off the event loop
+                await emit(await loop.run_in_executor(None, chunker.feed, page + "\n"))
+            await emit(await loop.run_in_executor(None, chunker.flush))
+        await chunks_q.put(_DONE)
+
+    async def embed_stage():
+        batch: list = []
+
+        async def flush():
+            with span("embed", chunks=len(batch)):
+                embeddings = await loop.run_in_executor(None, get_embeddings_with_fallback, [t for _, t in batch])
+            docs = [
+                {
+                    "doc_id": progress["doc_id"],
+                    "chunk_id": chunk_id,
+                    "embedding": emb,
+                    "text": text,
+                    "source": progress["filename"],
+                }
+                for (chunk_id, text), emb in zip(batch, embeddings)
+            ]
+            progress["chunks_embedded"] += len(docs)
+            await vectors_q.put(docs)
+            batch.clear()
+            await _persist(progress)
+
+        while (item := await chunks_q.get()) is not _DONE:
+            position, text = item
+            chunk_id = stable_chunk_id(text)
+            if chunk_id in chunks:
+                continue  # identical text earlier in this version
+            chunks[chunk_id] = position
+            if chunk_id in previous:
+                # Unchanged since the indexed version: its vector is already there
+                progress["chunks_reused"] += 1
+                continue
+            batch.append((chunk_id, text))
+            if len(batch) >= settings.INGEST_EMBED_BATCH:
+                await flush()
+        if batch:
+            await flush()
+        await vectors_q.put(_DONE)
+
+    async def upsert_stage():
+        while (docs := await vectors_q.get()) is not _DONE:
+            with span("upsert", vectors=len(docs)):
+                await loop.run_in_executor(None, upsert_embeddings, docs)
+            added.extend(vector_id(progress["doc_id"], d["chunk_id"]) for d in docs)
+            progress["chunks_indexed"] += len(docs)
+
+    async def delete_vectors(ids: list[str]):
+        for i in range(0, len(ids), DELETE_BATCH):
+            await loop.run_in_executor(None, delete_embeddings, ids[i : i + DELETE_BATCH])
+
+    previous: Dict[str, int] = {}  # chunk_id -> position in the indexed version
+    chunks: Dict[str, int] = {}  # chunk_id -> position in this version
+    added: list[str] = []
+    recorded = False
+
+    progress["status"] = "running"
+    await _persist(progress, force=True)
+    started = time.perf_counter()
+    try:
+        previous = await load_chunk_ids(progress["doc_id"])
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(extract_stage())
+            tg.create_task(chunk_stage())
+            tg.create_task(embed_stage())
+            tg.create_task(upsert_stage())
+        if not chunks:
+            raise ValueError("No text could be extracted from file")
+
+        # Record the new version first, then drop vectors of chunks it no longer has
+        with span("manifest", chunks=len(chunks)):
+            await replace_chunk_manifest(
+                progress["_document"], progress["doc_id"], progress.get("_sha256") or "",
+                sorted((position, chunk_id) for chunk_id, position in chunks.items()),
+            )
+        recorded = True
+        removed = [vector_id(progress["doc_id"], c) for c in previous if c not in chunks]
+        if removed:
+            with span("delete_vectors", vectors=len(removed)):
+                await delete_vectors(removed)
+            progress["chunks_deleted"] = len(removed)
+
+        progress["status"] = "completed"
+        count_cache("chunk_reuse", progress["chunks_reused"], progress["chunks_indexed"])
+        logger.info(
+            f"✅ Ingested {progress['filename']}: {progress['pages_extracted']} pages, "
+            f"{progress['chunks_indexed']} chunks embedded, {progress['chunks_reused']} reused, "
+            f"{progress['chunks_deleted']} deleted in {time.perf_counter() - started:.1f}s"
+        )
+    except BaseException as e:
+        errors = e.exceptions if isinstance(e, BaseExceptionGroup) else [e]
+        progress["status"] = "failed"
+        progress["error"] = "; ".join(str(err) for err in errors)
+        logger.error(f"❌ Ingest job {progress['job_id']} failed: {progress['error']}")
+        # Don't leave vectors of a version that never made it into the manifest
+        if added and not recorded:
+            try:
+                await delete_vectors(added)
+            except Exception as cleanup_error:
+                logger.warning(f"⚠️ Could not remove vectors of failed ingest {progress['job_id']}: {cleanup_error}")
+        if not isinstance(e, Exception):
+            raise
+    finally:
+        progress["seconds"] = round(time.perf_counter() - started, 3)
+        await _persist(progress, force=True)
+        await _finish_manifest(progress)
+
+
+async def _finish_manifest(progress: Dict[str, Any]):
+    sha256 = progress.get("_sha256")
+    if not sha256:
+        return
+    try:
+        if progress["status"] == "completed":
+            await update_manifest(
+                sha256, status="indexed", chunk_count=progress["chunks_indexed"] + progress["chunks_reused"]
+            )
+        else:
+            await drop_manifest(sha256)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not update upload manifest for {progress['job_id']}: {e}")
@@ -0,0 +1,62 @@
+# apps/backend/app/leader_lease.py
+import os
+import socket
+import uuid
+import logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+
+from .db import async_session
+from .models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+# Unique per process, so several uvicorn workers on one host are distinct holders
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _now() -> datetime:
+    # Stored naive (UTC) so comparisons behave the same on SQLite and Postgres
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def try_acquire_lease(name: str, ttl_seconds: int) -> bool:
+    """
+    Acquire or renew the named lease for this process.
+    Succeeds if the lease is free, expired, or already held by us.
+    """
+    now = _now()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+
+    async with async_session() as session:
+        result = await session.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.name == name)
+            .where(or_(SchedulerLease.holder == INSTANCE_ID, SchedulerLease.expires_at < now))
+            .values(holder=INSTANCE_ID, expires_at=expires_at)
+        )
+        if result.rowcount == 1:
+            await session.commit()
+            return True
+
+        # No row updated: either someone else holds a live lease or the row doesn't exist yet
+        session.add(SchedulerLease(name=name, holder=INSTANCE_ID, expires_at=expires_at))
+        try:
+            await session.commit()
+            return True
+        except IntegrityError:
+            await session.rollback()
+            return False
+
+
+async def release_lease(name: str):
+    """Expire our lease immediately so another instance can take over without waiting for the TTL."""
+    async with async_session() as session:
+        await session.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.name == name)
+            .where(SchedulerLease.holder == INSTANCE_ID)
+            .values(expires_at=_now())
+        )
+        await session.commit()
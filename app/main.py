@@ -286,21 +286,28 @@
 from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 import json
+import time
 
 # Internal modules
 from .db import get_session, async_init_db
 from .models import Document, Task, Run, Insight, Report
 from .schemas import IngestRequest, RunResponse
 from .auth import current_user
-from .config import APP_ENV
+from .config import APP_ENV, settings
 from .upload_api import router as upload_router
 from .rag_api import router as rag_router
 from .dashboard_api import router as dashboard_router
-from .scheduler import start_scheduler
+from .scheduler import start_scheduler, shutdown_scheduler
+from .extraction import shutdown_extraction_pool
+from .folder_watch import start_folder_watch, stop_folder_watch
+from .tracing import start_trace, shutdown_tracing
+from .metrics import HTTP_REQUESTS, HTTP_LATENCY, CONTENT_TYPE, expose
+from .profiling import request_profile
+from .admission import AdmissionControl, build_limiters
 from .auth_routes import router as auth_router
 
 app = FastAPI(title="AI Worker", version="0.1.0")
@@ -308,14 +315,63 @@ app = FastAPI(title="AI Worker", version="0.1.0")
 # --------------------
 # Middleware
 # --------------------
+# Innermost, so shed requests still get CORS headers, traces and metrics
+app.add_middleware(
+    AdmissionControl,
+    limiters=build_limiters(
+        {
+            ("POST", "/rag/ask"): (
+                "ask", settings.ASK_CONCURRENCY, settings.ASK_QUEUE_SIZE, settings.ASK_QUEUE_TIMEOUT_MS / 1000,
+            ),
+            ("POST", "/upload/upload"): (
+                "upload", settings.UPLOAD_CONCURRENCY, settings.UPLOAD_QUEUE_SIZE,
+                settings.UPLOAD_QUEUE_TIMEOUT_MS / 1000,
+            ),
+        },
+        settings.ADMISSION_MAX_RETRY_AFTER,
+    ),
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # 🔥 allow frontend deployment
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """
+    Trace every request (per-stage span totals go back in a Server-Timing
+    header) and record its latency and status for /metrics. Requests picked
+    for CPU profiling get an X-Profile-Id header (see /dashboard/profile).
+    """
+    started = time.perf_counter()
+    status = 500
+    with start_trace(f"{request.method} {request.url.path}", kind="server", method=request.method) as trace, \
+            request_profile(request) as profile:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            # Templated path, not per-ID values, to keep names and label sets bounded;
+            # requests shed by AdmissionControl never reach the router but name their route
+            route = request.scope.get("route")
+            route_path = route.path if route is not None else request.scope.get("admission_route", "unmatched")
+            HTTP_LATENCY.labels(request.method, route_path).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(request.method, route_path, str(status)).inc()
+            if trace is not None:
+                trace.root.name = f"{request.method} {route_path}"
+                trace.root.attributes["status_code"] = status
+            if profile is not None:
+                profile.path = route_path
+    if trace is not None:
+        response.headers["Server-Timing"] = trace.server_timing()
+    if profile is not None:
+        response.headers["X-Profile-Id"] = profile.id
+    return response
+
 # --------------------
 # Exception Handlers
 # --------------------
@@ -343,6 +399,14 @@ app.include_router(auth_router, prefix="/auth", tags=["Auth"])
 async def startup_event():
     await async_init_db()
     start_scheduler()
+    start_folder_watch()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_folder_watch()
+    await shutdown_scheduler()
+    shutdown_extraction_pool()
+    shutdown_tracing()
 
 # --------------------
 # Health
@@ -351,6 +415,13 @@ async def startup_event():
 async def health():
     return {"ok": True, "env": APP_ENV}
 
+# --------------------
+# Metrics (Prometheus text format, per worker process)
+# --------------------
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(expose(), media_type=CONTENT_TYPE)
+
 # --------------------
 # Ingest Run
 # --------------------
@@ -0,0 +1,272 @@
+# apps/backend/app/metrics.py
+import time
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition without a client library. Hot paths never take a
+# lock: each thread increments its own cell of a metric (created once per
+# thread), and a scrape sums the cells. Label children are created once and
+# cached, so steady-state recording allocates nothing beyond the label tuple.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+JOB_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Cells:
+    """One list of floats per thread; `cell()` is lock-free after a thread's first call."""
+
+    __slots__ = ("size", "_local", "_all", "_lock")
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._all: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def cell(self) -> List[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0.0] * self.size
+            with self._lock:
+                self._all.append(cell)
+            self._local.cell = cell
+            return cell
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            cells = list(self._all)
+        out = [0.0] * self.size
+        for cell in cells:
+            for i, v in enumerate(cell):
+                out[i] += v
+        return out
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _CounterChild:
+    __slots__ = ("_cells",)
+
+    def __init__(self):
+        self._cells = _Cells(1)
+
+    def inc(self, amount: float = 1.0):
+        self._cells.cell()[0] += amount
+
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        for values, child in list(self._children.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {_fmt(child.value())}")
+        return lines
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_cells")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # one slot per bucket, one for +Inf, then the sum
+        self._cells = _Cells(len(bounds) + 2)
+
+    def observe(self, value: float):
+        cell = self._cells.cell()
+        cell[bisect_left(self._bounds, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Tuple[List[float], float]:
+        totals = self._cells.totals()
+        return totals[:-1], totals[-1]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        for values, child in list(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _fmt(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {_fmt(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {_fmt(cumulative)}")
+        return lines
+
+
+class GaugeFunc(_Metric):
+    """Gauge read at scrape time: `fn` returns {label values tuple: value}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Dict[Tuple[str, ...], float]],
+                 labelnames: Sequence[str] = ()):
+        self.fn = fn
+        super().__init__(name, help, labelnames)
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        try:
+            samples = self.fn()
+        except Exception:
+            return []
+        for values, value in samples.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {_fmt(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def expose(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# -------------------- Metrics -------------------- #
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to external providers.", ("provider", "operation")
+)
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Failed calls to external providers.", ("provider", "operation"))
+
+EMBED_BATCH_SIZE = Histogram("embedding_batch_size", "Texts per embedding call.", ("provider",), buckets=SIZE_BUCKETS)
+EMBED_LATENCY = Histogram("embedding_duration_seconds", "Duration of embedding calls.", ("provider",))
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by result (hit/miss); hit ratio = hit / (hit + miss).", ("cache", "result")
+)
+
+JOB_RUNS = Counter("scheduler_job_runs_total", "Scheduler job runs by outcome.", ("kind", "outcome"))
+JOB_LATENCY = Histogram("scheduler_job_duration_seconds", "Scheduler job duration.", ("kind",), buckets=JOB_BUCKETS)
+
+DB_LATENCY = Histogram("db_query_duration_seconds", "Database statement latency.", ("operation",), buckets=DB_BUCKETS)
+
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requests shed with 503 by admission control.", ("route", "reason")
+)
+ADMISSION_WAIT = Histogram("admission_queue_wait_seconds", "Time admitted requests spent queued.", ("route",))
+
+
+def observe_upstream(provider: str, operation: str, seconds: float, error: Optional[BaseException] = None):
+    """Record one external call and whether it failed."""
+    UPSTREAM_LATENCY.labels(provider, operation).observe(seconds)
+    if error is not None:
+        UPSTREAM_ERRORS.labels(provider, operation).inc()
+
+
+def count_cache(cache: str, hits: int, misses: int):
+    if hits:
+        CACHE_REQUESTS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache, "miss").inc(misses)
+
+
+def instrument_engine(sync_engine):
+    """Time every statement on an SQLAlchemy engine (pass `async_engine.sync_engine` for async ones)."""
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is not None:
+            operation = statement.lstrip()[:6].upper()
+            if operation not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+                operation = "OTHER"
+            DB_LATENCY.labels(operation).observe(time.perf_counter() - started)
+
+
+def expose() -> str:
+    return REGISTRY.expose()
+
+
+def register_gauge(name: str, help: str, fn: Callable[[], Dict[Tuple[str, ...], float]],
+                   labelnames: Iterable[str] = ()) -> GaugeFunc:
+    return GaugeFunc(name, help, fn, tuple(labelnames))
@@ -69,4 +69,84 @@ class User(SQLModel, table=True):
     created_at: datetime = Field(default_factory=utc_now)
     updated_at: datetime = Field(default_factory=utc_now)
 
+# ----------------- Watchlist Table -----------------
+class WatchlistItem(SQLModel, table=True):
+    id: str = Field(default_factory=generate_uuid, primary_key=True)
+    kind: str = Field(index=True)  # stock|news
+    entity: str
+    enabled: bool = Field(default=True)
+    created_at: datetime = Field(default_factory=utc_now)
+
+# ----------------- News Watermark -----------------
+class NewsWatermark(SQLModel, table=True):
+    topic: str = Field(primary_key=True)
+    published_at: str  # newest NewsAPI publishedAt (ISO 8601) already ingested
+    updated_at: datetime = Field(default_factory=utc_now)
+
+# ----------------- Upload Manifest -----------------
+class UploadManifest(SQLModel, table=True):
+    sha256: str = Field(primary_key=True)
+    doc_id: str
+    filename: str
+    size: int
+    status: str  # ingesting|indexed
+    job_id: Optional[str] = None
+    chunk_count: int = 0
+    embedding_model: str
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
+
+# ----------------- Ingested Document Chunks -----------------
+class IngestedDocument(SQLModel, table=True):
+    name: str = Field(primary_key=True)  # logical document (upload filename)
+    doc_id: str = Field(index=True)  # stable across versions
+    sha256: str  # content of the currently indexed version
+    chunk_count: int = 0
+    updated_at: datetime = Field(default_factory=utc_now)
+
+class DocumentChunk(SQLModel, table=True):
+    id: str = Field(primary_key=True)  # vector ID "<doc_id>__<chunk_id>"
+    doc_id: str = Field(index=True)
+    chunk_id: str  # derived from the chunk's content hash
+    position: int
+
+# ----------------- Watched Folder Checkpoint -----------------
+class WatchedFile(SQLModel, table=True):
+    path: str = Field(primary_key=True)  # relative to WATCH_DIR, POSIX separators
+    size: int
+    mtime_ns: int
+    sha256: str
+    status: str  # indexed|unchanged|failed
+    doc_id: Optional[str] = None
+    error: Optional[str] = None
+    updated_at: datetime = Field(default_factory=utc_now)
+
+# ----------------- Report Fingerprint -----------------
+class ReportFingerprint(SQLModel, table=True):
+    key: str = Field(primary_key=True)  # "<kind>:<entity>"
+    kind: str
+    entity: Optional[str] = None
+    fingerprint: str
+    report_id: str = Field(foreign_key="report.id")
+    updated_at: datetime = Field(default_factory=utc_now)
+
+# ----------------- Summary Cache -----------------
+class SummaryCache(SQLModel, table=True):
+    content_hash: str = Field(primary_key=True)  # sha256 of prompt + chunk text
+    summary: str
+    created_at: datetime = Field(default_factory=utc_now)
+
+# ----------------- Scheduler Lease -----------------
+class SchedulerLease(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    holder: str
+    expires_at: datetime
+
+# ----------------- Scheduled Job State -----------------
+class ScheduledJob(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    trigger: str  # str() of the trigger next_run_at was computed from
+    next_run_at: Optional[datetime] = None  # naive UTC
+    updated_at: datetime = Field(default_factory=utc_now)
+
 # ----------------- End of Models -----------------
@@ -110,32 +110,87 @@
 # scheduler.start()
 # logger.info("⏰ Scheduler started (optional)")
 
+import json
+import time
 import logging
 import asyncio
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.ext.asyncio import AsyncEngine
-from apscheduler.schedulers.background import BackgroundScheduler
 from langchain.prompts import PromptTemplate
 from langchain.schema.runnable import RunnableLambda, RunnableSequence
 
+from .config import settings
 from .db import async_engine, get_session
-from .models import Report
-from .fetch_helpers import fetch_news_helper, fetch_stock_helper, search_web_helper
-from .utils.fallback_llm import generate_response_with_fallback
+from .models import Report, Run, ReportFingerprint, utc_now
+from .fingerprints import fingerprint_inputs, fingerprint_key, get_last_fingerprint
+from .fetch_helpers import fetch_news_async, fetch_stock_async, search_web_async
+from .utils.fallback_llm import generate_response_with_fallback, agenerate_response_with_fallback
+from .utils.llm_dispatch import llm_priority, BACKGROUND
+from .summarizer import map_reduce_summarize
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # ---------------------------
-# Helper: Save report into DB (async)
+# Helper: Save reports into DB (async, one transaction)
 # ---------------------------
-async def save_report(kind: str, content: str):
+async def save_reports(reports: list[dict]):
+    """
+    Persist several job outcomes at once. Each item:
+    {"kind", "content", "entity"?, "started_at"?, "fingerprint"?}
+    A Run row next to each report records the entity it covers. Items with
+    "unchanged": True (and "report_id" of the matching earlier report)
+    only record a cheap "unchanged" Run, no Report.
+    """
+    if not reports:
+        return
     async with AsyncSession(async_engine) as session:
-        report = Report(kind=kind, content=content)
-        session.add(report)
+        for item in reports:
+            kind, entity = item["kind"], item.get("entity")
+            if item.get("unchanged"):
+                session.add(Run(
+                    status="unchanged",
+                    job_type=kind,
+                    state_log=json.dumps([{
+                        "event": "unchanged",
+                        "entity": entity,
+                        "fingerprint": item.get("fingerprint"),
+                        "report_id": item.get("report_id"),
+                        "llm_calls_avoided": 1,
+                    }]),
+                    started_at=item.get("started_at") or utc_now(),
+                    finished_at=utc_now(),
+                ))
+                continue
+
+            report = Report(kind=kind, content=item["content"])
+            session.add(report)
+            session.add(Run(
+                status="completed",
+                job_type=kind,
+                state_log=json.dumps([{
+                    "event": "report_saved",
+                    "entity": entity,
+                    "report_id": report.id,
+                    "fingerprint": item.get("fingerprint"),
+                }]),
+                started_at=item.get("started_at") or utc_now(),
+                finished_at=utc_now(),
+            ))
+            if item.get("fingerprint"):
+                await session.merge(ReportFingerprint(
+                    key=fingerprint_key(kind, entity),
+                    kind=kind,
+                    entity=entity,
+                    fingerprint=item["fingerprint"],
+                    report_id=report.id,
+                    updated_at=utc_now(),
+                ))
         await session.commit()
-        await session.refresh(report)
-        logger.info(f"✅ Saved {kind} report at {report.created_at}")
+    logger.info(f"✅ Saved {len(reports)} job outcome(s): {', '.join(r['kind'] for r in reports)}")
+
+async def save_report(kind: str, content: str):
+    await save_reports([{"kind": kind, "content": content}])
 
 # ---------------------------
 # Prompt Templates
@@ -155,9 +210,19 @@ trends_prompt = PromptTemplate.from_template(
 # ---------------------------
 # Runnable Wrappers
 # ---------------------------
-news_llm = RunnableLambda(lambda x: generate_response_with_fallback(x))
-stock_llm = RunnableLambda(lambda x: generate_response_with_fallback(x))
-trends_llm = RunnableLambda(lambda x: generate_response_with_fallback(x))
+def _as_text(x) -> str:
+    return x.to_string() if hasattr(x, "to_string") else str(x)
+
+async def _allm(x) -> str:
+    return await agenerate_response_with_fallback(_as_text(x))
+
+def _make_llm() -> RunnableLambda:
+    # `ainvoke` uses the async Gemini path; `invoke` keeps working for sync callers
+    return RunnableLambda(lambda x: generate_response_with_fallback(_as_text(x)), afunc=_allm)
+
+news_llm = _make_llm()
+stock_llm = _make_llm()
+trends_llm = _make_llm()
 
 # ---------------------------
 # Pipelines
@@ -166,59 +231,100 @@ news_pipeline: RunnableSequence = news_prompt | news_llm
 stock_pipeline: RunnableSequence = stock_prompt | stock_llm
 trends_pipeline: RunnableSequence = trends_prompt | trends_llm
 
+# ---------------------------
+# Branch runner
+# ---------------------------
+async def _run_branch(kind: str, entity: str, fetch_coro, pipeline: RunnableSequence, inputs: dict, limit: int):
+    """
+    Fetch + summarize one branch. Returns an outcome dict for save_reports,
+    or None when nothing was fetched. If the inputs match the fingerprint of
+    the last report for this kind/entity the LLM is skipped.
+    """
+    items = await fetch_coro
+    texts = [i["text"] for i in items[:limit]] if items else []
+    if not any(t.strip() for t in texts):
+        return None
+
+    fingerprint = fingerprint_inputs(texts, getattr(pipeline.first, "template", ""))
+    last = await get_last_fingerprint(kind, entity)
+    if last and last.fingerprint == fingerprint:
+        async with AsyncSession(async_engine) as session:
+            previous = await session.get(Report, last.report_id)
+        if previous:
+            return {"kind": kind, "entity": entity, "unchanged": True, "fingerprint": fingerprint,
+                    "report_id": previous.id, "content": previous.content}
+
+    async def final(text: str) -> str:
+        return await pipeline.ainvoke({**inputs, "text": text})
+    summary = await map_reduce_summarize(texts, final)
+    return {"kind": kind, "entity": entity, "content": summary, "fingerprint": fingerprint}
+
 # ---------------------------
 # Pipeline Runner (Dynamic, async)
 # ---------------------------
-async def run_pipeline(topic=None, symbol=None, query=None, limit_news=5, limit_stock=3, limit_trends=5):
+async def run_pipeline(topic=None, symbol=None, query=None, limit_news=5, limit_stock=3, limit_trends=5,
+                       timeout=None):
     """
     Run pipelines dynamically based on the provided topic/entity/query.
-    Only fetches and processes the pipelines that have input.
+    Only fetches and processes the pipelines that have input. Branches run
+    concurrently; a branch that exceeds `timeout` seconds is dropped and the
+    others are still returned. Per-branch status and timing are in
+    `branches`; `llm_calls_avoided` counts branches whose inputs were
+    unchanged since their last report.
     """
     logger.info("🚀 Running dynamic LangChain pipeline...")
+    timeout = timeout or settings.PIPELINE_BRANCH_TIMEOUT_SECONDS
+
+    branches = {}
+    if topic:
+        branches["news"] = _run_branch(
+            "news", topic, fetch_news_async(topic, limit=limit_news), news_pipeline, {}, limit_news)
+    if symbol:
+        branches["stock"] = _run_branch(
+            "stock", symbol, fetch_stock_async(symbol, limit=limit_stock), stock_pipeline, {"symbol": symbol}, limit_stock)
+    if query:
+        branches["trends"] = _run_branch(
+            "trends", query, search_web_async(query, limit=limit_trends), trends_pipeline, {"query": query}, limit_trends)
+
+    started_at = utc_now()
+
+    async def timed(kind, coro):
+        started = time.perf_counter()
+        try:
+            outcome = await asyncio.wait_for(coro, timeout=timeout)
+            status = "empty" if not outcome else ("unchanged" if outcome.get("unchanged") else "ok")
+        except asyncio.TimeoutError:
+            outcome, status = None, "timeout"
+            logger.warning(f"⚠️ {kind} branch timed out after {timeout}s")
+        except Exception as e:
+            outcome, status = None, "error"
+            logger.error(f"❌ {kind} branch failed: {e}")
+        return kind, outcome, {"status": status, "seconds": round(time.perf_counter() - started, 3)}
+
+    # Branch tasks inherit the background LLM priority
+    with llm_priority(BACKGROUND):
+        outcomes = await asyncio.gather(*(timed(kind, coro) for kind, coro in branches.items()))
+
     results = {}
+    branch_info = {}
+    reports = []
+    for kind, outcome, info in outcomes:
+        branch_info[kind] = info
+        if outcome:
+            results[f"{kind}_summary"] = outcome["content"]
+            reports.append({**outcome, "started_at": started_at})
 
     try:
-        # News pipeline
-        if topic:
-            news_items = fetch_news_helper(topic)
-            news_text = " ".join([i["text"] for i in news_items[:limit_news]]) if news_items else ""
-            if news_text:
-                summary = news_pipeline.invoke({"text": news_text})
-                results["news_summary"] = summary
-                await save_report("news", summary)
-
-        # Stock pipeline
-        if symbol:
-            stock_items = fetch_stock_helper(symbol)
-            stock_text = " ".join([i["text"] for i in stock_items[:limit_stock]]) if stock_items else ""
-            if stock_text:
-                summary = stock_pipeline.invoke({"text": stock_text, "symbol": symbol})
-                results["stock_summary"] = summary
-                await save_report("stock", summary)
-
-        # Trends / Search pipeline
-        if query:
-            trends_items = search_web_helper(query)
-            trends_text = " ".join([i["text"] for i in trends_items[:limit_trends]]) if trends_items else ""
-            if trends_text:
-                summary = trends_pipeline.invoke({"text": trends_text, "query": query})
-                results["trends_summary"] = summary
-                await save_report("trends", summary)
-
-        if not results:
-            logger.warning("⚠️ No input data provided for any pipeline")
-        else:
-            logger.info("✅ Pipeline execution completed")
-
-        return results
-
+        await save_reports(reports)
     except Exception as e:
-        logger.error(f"❌ Pipeline execution failed: {e}")
+        logger.error(f"❌ Saving pipeline reports failed: {e}")
         raise
 
-# ---------------------------
-# Scheduler (Optional)
-# ---------------------------
-scheduler = BackgroundScheduler()
-scheduler.start()
-logger.info("⏰ Scheduler started (optional)")
+    if not results:
+        logger.warning("⚠️ No input data provided for any pipeline")
+    else:
+        logger.info("✅ Pipeline execution completed")
+
+    results["branches"] = branch_info
+    results["llm_calls_avoided"] = sum(1 for r in reports if r.get("unchanged"))
+    return results
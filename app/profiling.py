@@ -0,0 +1,301 @@
+# apps/backend/app/profiling.py
+import os
+import sys
+import time
+import random
+import asyncio
+import secrets
+import logging
+import threading
+import tracemalloc
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from .auth import get_current_user_jwt
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Stack sampling from a side thread (sys._current_frames): nothing runs on the
+# profiled threads, so overhead is one walk of every stack per interval, and
+# only while a profile is being taken. The sampler needs the GIL, so work in
+# bursts shorter than the switch interval (5 ms) between awaits is
+# under-counted; the long CPU-bound stretches worth finding are not. Output
+# is the "folded" format (`frame;frame;frame count` per line) read by
+# flamegraph.pl, speedscope and inferno.
+
+# Leaf frames of threads that are parked, not working
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+_labels: Dict[Any, str] = {}
+
+
+def _frame_label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename.replace(os.sep, "/").rsplit("/", 2)
+        label = f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+        _labels[code] = label
+    return label
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+# -------------------- Sampler -------------------- #
+class Sampler:
+    """
+    Counts the stacks of every busy thread each `interval` seconds. `select`
+    maps (thread id, thread name) to the root frame a sample is filed under,
+    or None to skip that thread this tick; by default it's the thread name.
+    """
+
+    def __init__(self, interval: float, select: Optional[Callable[[int, str], Optional[str]]] = None,
+                 include_idle: bool = False):
+        self.interval = interval
+        self.select = select or (lambda ident, name: name)
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.ticks = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        me = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if frames.keys() - names.keys():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == me or (not self.include_idle and _is_idle(frame)):
+                    continue
+                root = self.select(ident, names.get(ident, str(ident)))
+                if root is not None:
+                    self.stacks[f"{root};{_collapse(frame)}"] += 1
+            self.ticks += 1
+            del frames
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+# -------------------- Whole-process profile -------------------- #
+_process_lock = asyncio.Lock()
+
+
+async def profile_process(seconds: float, interval_ms: float, include_idle: bool = False) -> Sampler:
+    """Sample every thread for `seconds` (one whole-process profile at a time; 409 if one is running)."""
+    if _process_lock.locked():
+        raise HTTPException(status_code=409, detail="A CPU profile is already running")
+    async with _process_lock:
+        sampler = Sampler(interval_ms / 1000, include_idle=include_idle)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await asyncio.to_thread(sampler.stop)
+    logger.info(f"🔥 CPU profile: {sampler.samples} samples over {sampler.elapsed:.1f}s")
+    return sampler
+
+
+# -------------------- Per-request profiles -------------------- #
+# Samples of the event loop thread are kept only while a task of the profiled
+# request is the one running (tasks carry a copy of the request's context).
+# Busy worker threads (to_thread, executors) are included under their own
+# name: they may be doing work for other requests running at the same time.
+_active: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+_request_profiles: deque = deque(maxlen=settings.PROFILE_KEEP)
+_running = 0
+_running_lock = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.created_at = time.time()
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.sampler = Sampler(settings.PROFILE_INTERVAL_MS / 1000, select=self._select)
+
+    def _select(self, ident: int, name: str) -> Optional[str]:
+        if ident != self.loop_thread:
+            return f"thread:{name}"
+        task = asyncio.current_task(self.loop)
+        get_context = getattr(task, "get_context", None)  # Python 3.12+
+        if get_context is not None and get_context().get(_active) is not self:
+            return None
+        return "request"
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "created_at": self.created_at,
+            "duration_ms": round(self.sampler.elapsed * 1000, 1),
+            "samples": self.sampler.samples,
+        }
+
+
+def wants_profile(headers) -> bool:
+    """X-Profile from an admin, or PROFILE_SAMPLE_RATE. Costs a settings lookup when neither applies."""
+    if not settings.PROFILING_ENABLED:
+        return False
+    if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+        return True
+    if not headers.get("x-profile"):
+        return False
+    try:
+        return get_current_user_jwt(headers.get("authorization") or "")["role"] == "admin"
+    except HTTPException:
+        return False
+
+
+@contextmanager
+def _profile_request(method: str, path: str):
+    global _running
+    with _running_lock:
+        admitted = _running < settings.PROFILE_MAX_CONCURRENT
+        if admitted:
+            _running += 1
+    if not admitted:
+        yield None
+        return
+    profile = RequestProfile(method, path)
+    token = _active.set(profile)
+    profile.sampler.start()
+    try:
+        yield profile
+    finally:
+        profile.sampler.stop()
+        _active.reset(token)
+        _request_profiles.append(profile)
+        with _running_lock:
+            _running -= 1
+
+
+def request_profile(request):
+    """Context manager profiling this request when asked for; yields the profile or None."""
+    if wants_profile(request.headers):
+        return _profile_request(request.method, request.url.path)
+    return nullcontext()
+
+
+def list_request_profiles() -> List[Dict[str, Any]]:
+    """Most recent first."""
+    return [p.summary() for p in list(_request_profiles)[::-1]]
+
+
+def get_request_profile(profile_id: str) -> Optional[RequestProfile]:
+    for profile in list(_request_profiles):
+        if profile.id == profile_id:
+            return profile
+    return None
+
+
+# -------------------- Memory (tracemalloc) -------------------- #
+_MEMORY_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+_baseline: Optional[tracemalloc.Snapshot] = None
+_memory_lock = threading.Lock()
+
+
+def memory_start(frames: int) -> Dict[str, Any]:
+    """Start tracing allocations (slows allocation-heavy code noticeably while on)."""
+    global _baseline
+    with _memory_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _baseline = None
+        return {"tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+
+def memory_stop() -> Dict[str, Any]:
+    global _baseline
+    with _memory_lock:
+        tracemalloc.stop()
+        _baseline = None
+        return {"tracing": False}
+
+
+def _mb(n: int) -> float:
+    return round(n / 1024 / 1024, 2)
+
+
+def memory_diff(limit: int = 20, key_type: str = "lineno") -> Dict[str, Any]:
+    """
+    Snapshot allocations and return the top call sites by growth since the
+    previous snapshot (by size on the first one); the new snapshot becomes
+    the baseline. Blocking and CPU heavy: run it off the event loop.
+    """
+    global _baseline
+    with _memory_lock:
+        if not tracemalloc.is_tracing():
+            raise HTTPException(status_code=409, detail="tracemalloc is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+        previous, _baseline = _baseline, snapshot
+        traced, peak = tracemalloc.get_traced_memory()
+
+    if previous is not None:
+        stats = snapshot.compare_to(previous, key_type)
+    else:
+        stats = snapshot.statistics(key_type)
+    top = []
+    for stat in stats[:limit]:
+        top.append({
+            "site": stat.traceback.format(most_recent_first=True, limit=1 if key_type == "lineno" else None),
+            "size_kb": round(stat.size / 1024, 1),
+            "size_diff_kb": round(getattr(stat, "size_diff", stat.size) / 1024, 1),
+            "count": stat.count,
+            "count_diff": getattr(stat, "count_diff", stat.count),
+        })
+    return {
+        "compared_to_previous": previous is not None,
+        "traced_mb": _mb(traced),
+        "peak_mb": _mb(peak),
+        "key_type": key_type,
+        "top": top,
+    }
@@ -264,7 +264,6 @@ from pathlib import Path
 from typing import Optional, Tuple
 import uuid
 import traceback
-import time
 import logging
 import re
 import asyncio
@@ -274,12 +273,21 @@ from sqlmodel import Session, select
 
 # Import existing utils / helpers
 from .utils.vector_db import search_in_pinecone, upsert_embeddings
-from .utils.fallback_llm import get_embedding_with_fallback, generate_response_with_fallback
-from .fetch_helpers import fetch_news_helper, fetch_stock_helper, search_web_helper
+from .utils.fallback_llm import get_embedding_with_fallback, get_embeddings_with_fallback, agenerate_response_with_fallback
+from .utils.local_llm import LocalLLMOverloaded
+from .fetch_helpers import fetch_news_async, fetch_stock_async, search_web_async
 from .db import get_session
 from .models import Report
 from .context_memory import get_context, save_context
 from .upload_api import extract_text
+from .upload_store import (
+    store_upload, safe_filename, resolve_object, get_manifest, claim_manifest, update_manifest, drop_manifest,
+)
+from .summarizer import summarize_texts, estimate_tokens
+from .chunking import chunk_document
+from .chunk_manifest import stable_chunk_id
+from .config import settings
+from .tracing import span, annotate
 
 # Import pipeline runner
 from .pipelines import run_pipeline
@@ -316,30 +324,8 @@ def safe_decode(x):
         return [safe_decode(i) for i in x]
     return str(x)
 
-# -------------------- Rate limiting -------------------- #
-_API_RATE_STATE = {
-    "google": {"last": 0.0, "period": 60.0, "max_calls": 5, "count": 0},
-    "news": {"last": 0.0, "period": 60.0, "max_calls": 5, "count": 0},
-    "stock": {"last": 0.0, "period": 60.0, "max_calls": 5, "count": 0},
-}
-
-def _check_rate_limit(key: str):
-    state = _API_RATE_STATE.get(key)
-    if not state:
-        return
-    now = time.time()
-    period = state["period"]
-    if now - state["last"] > period:
-        state["last"] = now
-        state["count"] = 0
-    if state["count"] >= state["max_calls"]:
-        raise HTTPException(
-            status_code=429, detail=f"Rate limit for {key} exceeded. Try again later."
-        )
-    state["count"] += 1
-
 # -------------------- Intent + Entity classifier -------------------- #
-def classify_query_intent_and_entity(query: str) -> Tuple[str, Optional[str]]:
+async def classify_query_intent_and_entity(query: str) -> Tuple[str, Optional[str]]:
     prompt = f"""
 You are an assistant that must classify user queries and extract a single short entity (topic or stock ticker or search phrase).
 Classify the following query into exactly one of: news, stock, search, general.
@@ -352,7 +338,7 @@ entity:<entity or leave blank>
 Query: "{query}"
 """
     try:
-        resp = generate_response_with_fallback(prompt, "")
+        resp = await agenerate_response_with_fallback(prompt, "")
         text = (resp or "").strip()
         intent = "general"
         entity = None
@@ -377,16 +363,28 @@ Query: "{query}"
 @router.post("/upload")
 async def upload(file: UploadFile = File(...)):
     try:
-        safe_name = f"{int(time.time())}-{uuid.uuid4().hex}-{file.filename}"
-        file_path = UPLOAD_DIR / safe_name
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-        logger.info("Saved upload to %s", str(file_path))
+        stored = await store_upload(file, safe_filename(file.filename))
+        logger.info("Saved upload to %s", str(stored["path"]))
+        manifest = await get_manifest(stored["sha256"])
+        if manifest and manifest.status == "indexed" and manifest.embedding_model == settings.HF_EMBED_MODEL:
+            return {
+                "status": "duplicate",
+                "message": f"Content already ingested as {manifest.doc_id}.",
+                "filename": stored["name"],
+                "size": stored["size"],
+                "sha256": stored["sha256"],
+                "doc_id": manifest.doc_id,
+                "chunk_count": manifest.chunk_count,
+            }
         return {
             "status": "success",
-            "message": f"Saved file to {file_path.name}. Use /rag/ingest to trigger ingestion.",
-            "filename": file_path.name,
+            "message": f"Saved file to {stored['name']}. Use /rag/ingest to trigger ingestion.",
+            "filename": stored["name"],
+            "size": stored["size"],
+            "sha256": stored["sha256"],
         }
+    except HTTPException:
+        raise
     except Exception as e:
         return error_response(e, "Upload failed")
 
@@ -396,25 +394,46 @@ async def ingest_document(
     filename: str = Form(...), session: Session = Depends(get_session)
 ):
     try:
-        file_path = UPLOAD_DIR / filename
+        # Object-store names (<sha256><ext>) resolve to the shared copy; older uploads live in UPLOAD_DIR
+        file_path = resolve_object(filename) or UPLOAD_DIR / safe_filename(filename)
         if not file_path.exists():
             raise HTTPException(status_code=404, detail="File not found")
         content = await asyncio.to_thread(extract_text, file_path)
         if not content:
             raise HTTPException(status_code=400, detail="No text extracted from file")
         context_dict = get_context(session_id="default_session", session=session) or {}
-        context_dict["document"] = content
+        # Long documents are condensed with map-reduce so the session context stays within the LLM window
+        context_dict["document"] = await summarize_texts(
+            [content], "Summarize the following document for use as context in later questions:\n\n"
+        ) if estimate_tokens(content) > settings.SUMMARY_CHUNK_TOKENS else content
         save_context(session_id="default_session", context_data=context_dict, session=session)
-        embedding = await asyncio.to_thread(get_embedding_with_fallback, content)
-        await asyncio.to_thread(upsert_embeddings, [{
-            "doc_id": f"doc_{uuid.uuid4().hex}",
-            "chunk_id": "chunk_0",
-            "text": content,
-            "source": filename,
-            "embedding": embedding
-        }], provider="ingested_docs")
-        logger.info("Ingested document %s into context memory and vector DB", filename)
-        return {"status": "success", "message": f"Document {filename} ingested and embedded"}
+
+        sha256 = file_path.stem if resolve_object(filename) else None
+        doc_id = f"doc_{uuid.uuid4().hex}"
+        if sha256:
+            manifest, claimed = await claim_manifest(sha256, doc_id, filename, file_path.stat().st_size)
+            if not claimed:
+                logger.info("Document %s already indexed as %s, skipping embedding", filename, manifest.doc_id)
+                return {"status": "success", "message": f"Document {filename} ingested", "doc_id": manifest.doc_id}
+        try:
+            # One vector per token-bounded chunk; a single whole-document vector was truncated by the model
+            chunks = list(dict.fromkeys(await asyncio.to_thread(chunk_document, content)))
+            embeddings = await asyncio.to_thread(get_embeddings_with_fallback, chunks)
+            await asyncio.to_thread(upsert_embeddings, [{
+                "doc_id": doc_id,
+                "chunk_id": stable_chunk_id(text),
+                "text": text,
+                "source": filename,
+                "embedding": embedding
+            } for text, embedding in zip(chunks, embeddings)], provider="ingested_docs")
+        except Exception:
+            if sha256:
+                await drop_manifest(sha256)
+            raise
+        if sha256:
+            await update_manifest(sha256, status="indexed", chunk_count=len(chunks))
+        logger.info("Ingested document %s into context memory and vector DB (%d chunks)", filename, len(chunks))
+        return {"status": "success", "message": f"Document {filename} ingested and embedded", "doc_id": doc_id}
     except HTTPException:
         raise
     except Exception as e:
@@ -436,53 +455,60 @@ async def ask(request: AskRequest, session: Session = Depends(get_session)):
             raise HTTPException(status_code=400, detail="Query cannot be empty")
 
         # Fetch session context
-        context_dict = get_context("default_session", session=session)
+        with span("context_load"):
+            context_dict = get_context("default_session", session=session)
         context_str = "\n".join([f"Q: {q}\nA: {a}" for q, a in context_dict.items()]) if context_dict else ""
         enriched_context = f"{context_str}\n\nUser: {query}" if context_str else f"User: {query}"
 
         # -------------------- Vector DB retrieval -------------------- #
         try:
-            q_emb = await asyncio.to_thread(get_embedding_with_fallback, query)
-            results = await asyncio.to_thread(search_in_pinecone, q_emb, top_k=5)
+            with span("embed"):
+                q_emb = await asyncio.to_thread(get_embedding_with_fallback, query)
+            with span("vector_search", top_k=5):
+                results = await asyncio.to_thread(search_in_pinecone, q_emb, top_k=5)
+                annotate(matches=len(results))
             if results:
                 enriched_context += "\n\nContext from Pinecone:\n" + "\n\n".join([safe_decode(r.get("text", "")) for r in results if r.get("text")])
         except Exception as e:
             logger.warning("Pinecone/embedding failed: %s", e)
 
         # -------------------- Intent classification -------------------- #
-        intent, entity = classify_query_intent_and_entity(query)
+        with span("classify"):
+            intent, entity = await classify_query_intent_and_entity(query)
+            annotate(intent=intent)
         logger.debug("Classified intent=%s entity=%s for query=%s", intent, entity, query)
 
         # -------------------- Fetch live data based on intent -------------------- #
         pipeline_results = {}
-        try:
-            if intent == "news":
-                _check_rate_limit("news")
-                topic = entity if entity else query
-                pipeline_results = await asyncio.to_thread(fetch_news_helper, topic, limit=10)
-
-            elif intent == "stock":
-                _check_rate_limit("stock")
-                symbol = entity.upper() if entity else None
-                if not symbol:
-                    candidates = [t for t in re.findall(r"\b[A-Za-z0-9]{1,5}\b", query) if t.isupper()]
-                    symbol = candidates[0] if candidates else "AAPL"
-                pipeline_results = await asyncio.to_thread(fetch_stock_helper, symbol, limit=5)
-
-            elif intent == "search":
-                _check_rate_limit("google")
-                queries = [q.strip() for q in query.split(",") if q.strip()]
-                search_results = []
-                for q in queries:
-                    results = await asyncio.to_thread(search_web_helper, q, limit=5, do_embed=False)
-                    for r in results:
-                        search_results.append(f"- {r['text']} (Source: {r['source']})")
-                pipeline_results = {"google_search": "\n".join(search_results)}
-
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.warning("Pipeline execution failed: %s", e)
+        with span("live_fetch", intent=intent):
+            try:
+                # Live fetches share the provider quota pacers with the scheduled sweeps;
+                # no slot within a couple of seconds means a 429 rather than a long wait
+                max_wait = settings.QUOTA_INTERACTIVE_MAX_WAIT_SECONDS
+                if intent == "news":
+                    topic = entity if entity else query
+                    pipeline_results = await fetch_news_async(topic, limit=10, max_wait=max_wait)
+
+                elif intent == "stock":
+                    symbol = entity.upper() if entity else None
+                    if not symbol:
+                        candidates = [t for t in re.findall(r"\b[A-Za-z0-9]{1,5}\b", query) if t.isupper()]
+                        symbol = candidates[0] if candidates else "AAPL"
+                    pipeline_results = await fetch_stock_async(symbol, limit=5, max_wait=max_wait)
+
+                elif intent == "search":
+                    queries = [q.strip() for q in query.split(",") if q.strip()]
+                    search_results = []
+                    for q in queries:
+                        results = await search_web_async(q, limit=5, do_embed=False, max_wait=max_wait)
+                        for r in results:
+                            search_results.append(f"- {r['text']} (Source: {r['source']})")
+                    pipeline_results = {"google_search": "\n".join(search_results)}
+
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.warning("Pipeline execution failed: %s", e)
 
         # -------------------- Compose enriched context -------------------- #
         if pipeline_results:
@@ -496,14 +522,16 @@ async def ask(request: AskRequest, session: Session = Depends(get_session)):
                 enriched_context += f"\n\nPipeline Result:\n{str(pipeline_results)}"
 
         # -------------------- Generate final response -------------------- #
-        answer = await asyncio.to_thread(generate_response_with_fallback, query, enriched_context)
+        with span("generate"):
+            answer = await agenerate_response_with_fallback(query, enriched_context)
         answer = safe_decode(answer)
 
         # -------------------- Save context -------------------- #
         try:
             new_context_dict = context_dict or {}
             new_context_dict[query] = answer
-            save_context("default_session", new_context_dict, session=session)
+            with span("context_save"):
+                save_context("default_session", new_context_dict, session=session)
         except Exception as e:
             logger.warning("Saving context failed: %s", e)
 
@@ -517,6 +545,8 @@ async def ask(request: AskRequest, session: Session = Depends(get_session)):
 
     except HTTPException:
         raise
+    except LocalLLMOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         return error_response(e, "Unexpected error in /ask")
 
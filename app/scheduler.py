@@ -1,56 +1,196 @@
 # apps/backend/app/scheduler.py
-from apscheduler.schedulers.background import BackgroundScheduler
+import asyncio
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import timezone
 import logging
-from sqlmodel import Session
-from .db import engine
-from .models import Report
+from concurrent.futures import ThreadPoolExecutor
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.schedulers.base import STATE_PAUSED
+from apscheduler.executors.asyncio import AsyncIOExecutor
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlmodel import select
+
+from .config import settings
+from .db import async_session
+from .models import ScheduledJob, utc_now
+from .pipelines import save_reports
+from .fingerprints import fingerprint_inputs, get_last_fingerprint
+from .watchlist import load_watchlist
+from .leader_lease import INSTANCE_ID, try_acquire_lease, release_lease
 from .fetch_helpers import (
-    fetch_news_helper,
-    fetch_stock_helper,
-    search_web_helper
+    fetch_news_async,
+    fetch_stock_async,
+    search_web_async,
+    close_async_client,
 )
-from .utils.fallback_llm import generate_response_with_fallback
+from .summarizer import summarize_texts
+from .utils.llm_dispatch import llm_priority, BACKGROUND
+from .tracing import start_trace, span, annotate
+from .metrics import JOB_RUNS, JOB_LATENCY, count_cache
 
 # --- Logging setup --- #
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # --- Scheduler instance --- #
-scheduler = BackgroundScheduler()
+# Jobs are coroutines executed on the app's event loop. Missed runs are
+# coalesced into one and only fired if still within the misfire grace time.
+# Job definitions live in code (SCHEDULED_JOBS) and the job store is in
+# memory; only each job's next run time is saved (ScheduledJob, through the
+# async session), so a new leader picks up where the previous one stopped
+# without the scheduler doing blocking DB I/O on the event loop.
+scheduler = AsyncIOScheduler(
+    executors={"default": AsyncIOExecutor()},
+    job_defaults={
+        "coalesce": True,
+        "max_instances": 1,
+        "misfire_grace_time": settings.SCHEDULER_MISFIRE_GRACE_SECONDS,
+    },
+)
+
+# Small dedicated pool for the CPU-bound parts of jobs (embedding, GPT-2
+# fallback, Pinecone upserts) so they never take threads from request handling.
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.SCHEDULER_BLOCKING_WORKERS,
+    thread_name_prefix="scheduler",
+)
+
+# Per-job concurrency caps (shared by scheduled and manual runs)
+_job_slots: dict[str, asyncio.Semaphore] = {}
+
+# Set for runs started by the scheduler: they stop once this instance no
+# longer holds the lease (manual runs don't depend on it)
+_needs_lease: ContextVar[bool] = ContextVar("scheduler_needs_lease", default=False)
+
+
+def _lease_lost(label: str) -> bool:
+    if _needs_lease.get() and not is_leader():
+        logger.warning(f"⚠️ Stopping {label}: {INSTANCE_ID} no longer holds the scheduler lease")
+        return True
+    return False
+
+
+def _job_slot(kind: str) -> asyncio.Semaphore:
+    if kind not in _job_slots:
+        _job_slots[kind] = asyncio.Semaphore(settings.SCHEDULER_JOB_CONCURRENCY)
+    return _job_slots[kind]
 
-# --- Helper: Save report into DB --- #
-def save_report(kind: str, content: str):
-    """Save summarized report into DB"""
-    with Session(engine) as session:
-        report = Report(kind=kind, content=content)
-        session.add(report)
-        session.commit()
-        logger.info(f"✅ Saved {kind} report at {report.created_at}")
 
 # --- Job functions --- #
-def scheduled_news_summary():
-    run_job("news", lambda: fetch_news_helper("technology"), limit=5, prompt="Summarize today's news: ")
+async def scheduled_news_summary():
+    await run_watchlist(
+        "news",
+        lambda topic: fetch_news_async(topic, executor=_blocking_executor, incremental=True),
+        limit=5,
+        prompt="Summarize today's news about {entity}: ",
+    )
 
-def scheduled_stock_check():
-    run_job("stock", lambda: fetch_stock_helper("AAPL"), limit=3, prompt="Summarize stock performance: ")
+async def scheduled_stock_check():
+    await run_watchlist(
+        "stock",
+        lambda symbol: fetch_stock_async(symbol, executor=_blocking_executor),
+        limit=3,
+        prompt="Summarize stock performance of {entity}: ",
+    )
 
-def scheduled_google_trends():
-    run_job("search", lambda: search_web_helper("AI trends 2025"), limit=5, prompt="Summarize web search results: ")
+async def scheduled_google_trends():
+    async with _job_slot("search"):
+        await run_job(
+            "search",
+            lambda: search_web_async("AI trends 2025", executor=_blocking_executor),
+            limit=5,
+            prompt="Summarize web search results: ",
+            entity="AI trends 2025",
+        )
+
+# --- Watchlist sweep --- #
+async def run_watchlist(kind: str, fetch_for, limit: int, prompt: str):
+    """
+    Run one job per watchlist entity concurrently. Provider quotas are
+    enforced by the pacers inside the fetch helpers, so the sweep finishes
+    as fast as the quotas allow.
+    """
+    async with _job_slot(kind):
+        entities = await load_watchlist(kind)
+        fan_out = asyncio.Semaphore(settings.WATCHLIST_CONCURRENCY)
+        started = time.monotonic()
+
+        async def one(entity: str) -> str:
+            async with fan_out:
+                if _lease_lost(f"{kind}:{entity}"):
+                    return "skipped"
+                return await run_job(
+                    kind,
+                    lambda: fetch_for(entity),
+                    limit=limit,
+                    prompt=prompt.format(entity=entity),
+                    entity=entity,
+                )
+
+        outcomes = Counter(await asyncio.gather(*(one(e) for e in entities)))
+        logger.info(
+            f"✅ {kind} watchlist sweep over {len(entities)} entities in {time.monotonic() - started:.1f}s: "
+            f"{dict(outcomes)} ({outcomes['unchanged']} LLM call(s) avoided)"
+        )
 
 # --- Generic Job Runner --- #
-def run_job(kind: str, fetch_fn, limit: int, prompt: str):
+async def run_job(kind: str, fetch_fn, limit: int, prompt: str, entity: str | None = None) -> str:
+    """
+    Fetch, summarize and store one report. Returns the outcome:
+    "completed", "unchanged" (inputs match the last report, LLM skipped),
+    "empty", "skipped" (scheduled run whose instance lost the lease) or "error".
+    """
+    started = time.perf_counter()
+    outcome = await _run_job(kind, fetch_fn, limit, prompt, entity)
+    JOB_LATENCY.labels(kind).observe(time.perf_counter() - started)
+    JOB_RUNS.labels(kind, outcome).inc()
+    if outcome in ("completed", "unchanged"):
+        count_cache("report_fingerprint", int(outcome == "unchanged"), int(outcome == "completed"))
+    return outcome
+
+
+async def _run_job(kind: str, fetch_fn, limit: int, prompt: str, entity: str | None) -> str:
+    label = f"{kind}:{entity}" if entity else kind
+    started_at = utc_now()
     try:
-        data = fetch_fn()
+        with span("fetch", kind=kind, entity=entity):
+            data = await fetch_fn()
+            annotate(items=len(data or []))
         if not data:
-            logger.warning(f"⚠️ No {kind} data fetched.")
-            return
+            logger.warning(f"⚠️ No {label} data fetched.")
+            return "empty"
 
-        text = " ".join([item["text"] for item in data[:limit]])
-        summary = generate_response_with_fallback(f"{prompt}{text}")
-        save_report(kind, summary)
-        logger.info(f"✅ {kind} job completed.")
+        texts = [item["text"] for item in data[:limit]]
+        fingerprint = fingerprint_inputs(texts, prompt)
+        last = await get_last_fingerprint(kind, entity)
+        if last and last.fingerprint == fingerprint:
+            if _lease_lost(label):
+                return "skipped"
+            await save_reports([{
+                "kind": kind, "entity": entity, "unchanged": True,
+                "fingerprint": fingerprint, "report_id": last.report_id, "started_at": started_at,
+            }])
+            logger.info(f"♻️ {label} inputs unchanged since report {last.report_id}; skipped LLM call.")
+            return "unchanged"
+
+        # Queued behind interactive /rag/ask calls for LLM capacity
+        with llm_priority(BACKGROUND), span("summarize", kind=kind, entity=entity, texts=len(texts)):
+            summary = await summarize_texts(texts, prompt, executor=_blocking_executor)
+        if _lease_lost(label):
+            return "skipped"
+        with span("save", kind=kind, entity=entity):
+            await save_reports([{
+                "kind": kind, "content": summary, "entity": entity,
+                "fingerprint": fingerprint, "started_at": started_at,
+            }])
+        logger.info(f"✅ {label} job completed.")
+        return "completed"
     except Exception as e:
-        logger.error(f"❌ Error in {kind} job: {e}")
+        logger.error(f"❌ Error in {label} job: {e}")
+        return "error"
 
 # --- Job registry for manual trigger --- #
 JOB_REGISTRY = {
@@ -59,21 +199,159 @@ JOB_REGISTRY = {
     "search": scheduled_google_trends,
 }
 
-def run_manual_job(job_name: str):
+async def run_manual_job(job_name: str):
     """Manually run a job by name"""
     job = JOB_REGISTRY.get(job_name)
     if not job:
         raise ValueError(f"Unknown job: {job_name}")
-    job()
+    with start_trace(f"job.{job_name}", job=job_name):
+        await job()
 
-# --- Start Scheduler --- #
-def start_scheduler():
-    # Run at fixed times (cron style)
-    scheduler.add_job(scheduled_news_summary, "cron", hour=9, minute=0)    # daily 9:00 AM
-    scheduler.add_job(scheduled_stock_check, "interval", hours=6)          # every 6 hours
-    scheduler.add_job(scheduled_google_trends, "cron", hour=10, minute=0)  # daily 10:00 AM
+# --- Leader election --- #
+# Every process starts the scheduler paused; only the holder of the
+# "scheduler" lease resumes it. When the leader dies its lease expires and
+# another instance takes over within one TTL.
+LEASE_NAME = "scheduler"
+_lease_valid_until = 0.0  # monotonic deadline of the lease we last renewed
+_leader_task: asyncio.Task | None = None
+_background_tasks: set[asyncio.Task] = set()
+_scheduled_runs: set[asyncio.Task] = set()  # scheduled job runs in progress, cancelled if the lease is lost
+
+SCHEDULED_JOBS = {
+    "news": lambda: CronTrigger(hour=9, minute=0),      # daily 9:00 AM
+    "stock": lambda: IntervalTrigger(hours=6),          # every 6 hours
+    "search": lambda: CronTrigger(hour=10, minute=0),   # daily 10:00 AM
+}
 
-    scheduler.start()
-    logger.info("🚀 Scheduler started (news 9 AM, stock 6h, trends 10 AM)")
 
+def is_leader() -> bool:
+    return time.monotonic() < _lease_valid_until
+
+
+async def run_scheduled_job(job_name: str):
+    """Scheduled entry point; skips the run if our lease has lapsed meanwhile."""
+    if not is_leader():
+        logger.warning(f"⚠️ Skipping {job_name}: {INSTANCE_ID} no longer holds the scheduler lease")
+        return
+    # The scheduler has already moved the job to its next run; record that first,
+    # so a leader taking over mid-run doesn't start this run again
+    await _save_next_run(job_name)
+    task = asyncio.current_task()
+    _scheduled_runs.add(task)
+    _needs_lease.set(True)
+    try:
+        await run_manual_job(job_name)
+    except asyncio.CancelledError:
+        if is_leader():
+            raise  # shutdown, not a lost lease
+        logger.warning(f"⚠️ {job_name} run cancelled: scheduler lease lost")
+    finally:
+        _scheduled_runs.discard(task)
+
+
+async def _save_next_run(job_name: str):
+    job = scheduler.get_job(job_name)
+    if job is None:
+        return
+    next_run = job.next_run_time.astimezone(timezone.utc).replace(tzinfo=None) if job.next_run_time else None
+    try:
+        async with async_session() as session:
+            await session.merge(
+                ScheduledJob(name=job_name, trigger=str(job.trigger), next_run_at=next_run, updated_at=utc_now())
+            )
+            await session.commit()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save next run time of {job_name}: {e}")
+
+
+async def _register_jobs():
+    """(Re)schedule every job from the next run times saved by whichever instance led last."""
+    async with async_session() as session:
+        result = await session.execute(select(ScheduledJob))
+        saved = {row.name: row for row in result.scalars().all()}
+
+    for job_name, make_trigger in SCHEDULED_JOBS.items():
+        trigger = make_trigger()
+        options = {}
+        state = saved.get(job_name)
+        # A saved time only applies to the trigger it was computed from
+        if state is not None and state.next_run_at is not None and state.trigger == str(trigger):
+            options["next_run_time"] = state.next_run_at.replace(tzinfo=timezone.utc)
+        scheduler.add_job(
+            run_scheduled_job,
+            trigger,
+            args=[job_name],
+            id=job_name,
+            name=job_name,
+            replace_existing=True,
+            **options,
+        )
+        if "next_run_time" not in options:
+            await _save_next_run(job_name)
+
+
+async def _leader_loop():
+    global _lease_valid_until
+    ttl = settings.SCHEDULER_LEASE_TTL_SECONDS
+    while True:
+        started = time.monotonic()
+        try:
+            acquired = await try_acquire_lease(LEASE_NAME, ttl)
+        except Exception as e:
+            logger.error(f"❌ Scheduler lease renewal failed: {e}")
+            acquired = False
+
+        if acquired:
+            _lease_valid_until = started + ttl
+            if scheduler.state == STATE_PAUSED:
+                try:
+                    await _register_jobs()
+                except Exception as e:
+                    # Stay paused; registration is retried on the next renewal
+                    logger.error(f"❌ Could not load scheduled jobs: {e}")
+                else:
+                    scheduler.resume()
+                    logger.info(f"👑 {INSTANCE_ID} acquired the scheduler lease")
+        else:
+            _lease_valid_until = 0.0
+            if scheduler.state != STATE_PAUSED:
+                scheduler.pause()
+                logger.info(f"⏸️ {INSTANCE_ID} lost the scheduler lease; scheduler paused")
+            # Runs already going (a sweep can wait on provider quotas for a long time) stop too
+            for task in list(_scheduled_runs):
+                task.cancel()
+
+        await asyncio.sleep(settings.SCHEDULER_LEASE_RENEW_SECONDS)
+
+
+def submit_job(job_fn):
+    """Run a job once, now, in this process (manual triggers bypass leader election)."""
+    task = asyncio.create_task(job_fn())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+# --- Start / stop Scheduler --- #
+def start_scheduler():
+    """Start the scheduler paused and begin competing for the leader lease. Must be called from the running event loop."""
+    global _leader_task
+    scheduler.start(paused=True)
+    _leader_task = asyncio.create_task(_leader_loop())
+    logger.info("🚀 Scheduler started (news watchlist 9 AM, stock watchlist 6h, trends 10 AM); waiting for leader lease")
 
+async def shutdown_scheduler():
+    global _lease_valid_until
+    if _leader_task is not None:
+        _leader_task.cancel()
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    if _lease_valid_until:
+        _lease_valid_until = 0.0
+        try:
+            await release_lease(LEASE_NAME)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not release scheduler lease: {e}")
+    _blocking_executor.shutdown(wait=False, cancel_futures=True)
+    await close_async_client()
+    logger.info("🛑 Scheduler stopped")
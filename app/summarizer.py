@@ -0,0 +1,176 @@
+# apps/backend/app/summarizer.py
+import asyncio
+import hashlib
+import logging
+from typing import Awaitable, Callable, List, Optional
+from sqlmodel import select
+
+from .config import settings
+from .db import async_session
+from .models import SummaryCache
+from .utils.fallback_llm import agenerate_response_with_fallback
+from .metrics import count_cache
+
+logger = logging.getLogger(__name__)
+
+MAP_PROMPT = (
+    "Summarize the following content concisely. Keep key facts, names, numbers and dates:\n\n"
+)
+REDUCE_PROMPT = (
+    "Combine the following partial summaries into one concise summary. "
+    "Merge duplicates and keep key facts, names, numbers and dates:\n\n"
+)
+
+# Only cache summaries from the primary model; fallback output is not worth reusing
+CACHEABLE_PROVIDERS = {"gemini-2.0-flash"}
+
+
+# -------------------- Token budgeting -------------------- #
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English prose)."""
+    return len(text) // 4 + 1
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _split_oversized(text: str, budget: int) -> List[str]:
+    """Split a single text that exceeds the budget on word boundaries."""
+    words = text.split()
+    max_chars = budget * 4
+    pieces, current, size = [], [], 0
+    for word in words:
+        if current and size + len(word) + 1 > max_chars:
+            pieces.append(" ".join(current))
+            current, size = [], 0
+        current.append(word)
+        size += len(word) + 1
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def split_by_token_budget(texts: List[str], budget: int, boundary_every: Optional[int] = 4) -> List[str]:
+    """
+    Pack texts into chunks of at most `budget` tokens, never splitting an
+    item unless it alone is over budget. Chunk boundaries are also placed
+    after items whose content hash selects them (about one in
+    `boundary_every`; None disables this), so the same items produce the
+    same chunks even when new items are added around them. This keeps
+    per-chunk cache hits high across runs.
+    """
+    chunks, current, current_tokens = [], [], 0
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        pieces = _split_oversized(text, budget) if estimate_tokens(text) > budget else [text]
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > budget:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+            if boundary_every and int(_hash(piece)[:8], 16) % boundary_every == 0:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+# -------------------- Summary cache -------------------- #
+async def _cache_get(keys: List[str]) -> dict:
+    if not keys:
+        return {}
+    async with async_session() as session:
+        result = await session.execute(select(SummaryCache).where(SummaryCache.content_hash.in_(keys)))
+        return {row.content_hash: row.summary for row in result.scalars().all()}
+
+
+async def _cache_put(entries: dict):
+    if not entries:
+        return
+    async with async_session() as session:
+        for key, summary in entries.items():
+            await session.merge(SummaryCache(content_hash=key, summary=summary))
+        await session.commit()
+
+
+# -------------------- Map / reduce -------------------- #
+async def _summarize_many(chunks: List[str], prompt: str, concurrency: int, executor=None,
+                          use_cache: bool = True) -> List[str]:
+    keys = [_hash(prompt + chunk) for chunk in chunks]
+    cached = await _cache_get(keys) if use_cache else {}
+    semaphore = asyncio.Semaphore(concurrency)
+    fresh = {}
+
+    async def one(key: str, chunk: str) -> str:
+        if key in cached:
+            return cached[key]
+        async with semaphore:
+            summary, provider = await agenerate_response_with_fallback(
+                f"{prompt}{chunk}", return_provider=True, executor=executor
+            )
+        if provider in CACHEABLE_PROVIDERS:
+            fresh[key] = summary
+        return summary
+
+    summaries = await asyncio.gather(*(one(k, c) for k, c in zip(keys, chunks)))
+    if use_cache:
+        try:
+            await _cache_put(fresh)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not store chunk summaries: {e}")
+
+    hits = sum(1 for k in keys if k in cached)
+    if use_cache:
+        count_cache("summary", hits, len(keys) - hits)
+    logger.info(f"🧩 Summarized {len(chunks)} chunk(s), {hits} from cache")
+    return list(summaries)
+
+
+async def map_reduce_summarize(
+    texts: List[str],
+    final: Callable[[str], Awaitable[str]],
+    chunk_tokens: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    executor=None,
+) -> str:
+    """
+    Summarize `texts` with `final(text)`. If the joined input fits in
+    `chunk_tokens` this is a single call. Otherwise chunks are summarized
+    concurrently (cached by content hash), partial summaries are reduced
+    level by level until they fit, and `final` runs on the result.
+    """
+    chunk_tokens = chunk_tokens or settings.SUMMARY_CHUNK_TOKENS
+    concurrency = concurrency or settings.SUMMARY_CONCURRENCY
+
+    joined = " ".join(t.strip() for t in texts if t and t.strip())
+    if estimate_tokens(joined) <= chunk_tokens:
+        return await final(joined)
+
+    parts = await _summarize_many(
+        split_by_token_budget(texts, chunk_tokens), MAP_PROMPT, concurrency, executor
+    )
+    level = 1
+    while len(parts) > 1 and estimate_tokens("\n\n".join(parts)) > chunk_tokens:
+        groups = split_by_token_budget(parts, chunk_tokens, boundary_every=None)
+        if len(groups) >= len(parts):
+            # Partials are too long to pack under the budget; pair them so each level still halves
+            groups = ["\n\n".join(parts[i:i + 2]) for i in range(0, len(parts), 2)]
+        # Reduce levels are cheap to recompute and rarely repeat, so skip the cache
+        parts = await _summarize_many(groups, REDUCE_PROMPT, concurrency, executor, use_cache=False)
+        level += 1
+
+    logger.info(f"🧩 Map-reduce finished after {level} level(s)")
+    return await final("\n\n".join(parts))
+
+
+async def summarize_texts(texts: List[str], instruction: str, executor=None) -> str:
+    """Map-reduce summary of `texts`, with `instruction` prefixed to the final call."""
+    async def final(text: str) -> str:
+        return await agenerate_response_with_fallback(f"{instruction}{text}", executor=executor)
+    return await map_reduce_summarize(texts, final, executor=executor)
@@ -0,0 +1,280 @@
+# apps/backend/app/tracing.py
+import re
+import json
+import time
+import queue
+import secrets
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+_slow_traces: deque = deque(maxlen=settings.TRACE_SLOW_BUFFER)
+_TIMING_NAME = re.compile(r"[^\w-]")
+
+
+# -------------------- Spans -------------------- #
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "_t0", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self._t0 = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def end(self):
+        self.end_ns = self.start_ns + (time.perf_counter_ns() - self._t0)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else self.start_ns + (time.perf_counter_ns() - self._t0)
+        return (end - self.start_ns) / 1e6
+
+
+class Trace:
+    """One request or job: a root span plus up to TRACE_MAX_SPANS children."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any], kind: str = "internal"):
+        self.trace_id = secrets.token_hex(16)
+        self.kind = kind
+        self.root = Span(self, name, None, attributes)
+        self.spans: List[Span] = []
+        self.dropped = 0
+
+    def add(self, span: Span) -> bool:
+        if len(self.spans) >= settings.TRACE_MAX_SPANS:
+            self.dropped += 1
+            return False
+        self.spans.append(span)
+        return True
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: total time per span name, then the whole request."""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            if span.end_ns is not None:
+                name = _TIMING_NAME.sub("_", span.name)
+                totals[name] = totals.get(name, 0.0) + span.duration_ms
+        parts = [f"{name};dur={ms:.1f}" for name, ms in totals.items()]
+        parts.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "start": self.root.start_ns / 1e9,
+            "duration_ms": round(self.root.duration_ms, 2),
+            "attributes": self.root.attributes,
+            "error": self.root.error,
+            "dropped_spans": self.dropped,
+            "spans": [
+                {
+                    "name": s.name,
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "offset_ms": round((s.start_ns - self.root.start_ns) / 1e6, 2),
+                    "duration_ms": round(s.duration_ms, 2),
+                    "attributes": s.attributes,
+                    "error": s.error,
+                }
+                for s in self.spans
+            ],
+        }
+
+
+@contextmanager
+def start_trace(name: str, kind: str = "internal", **attributes):
+    """
+    Begin a new trace (even inside another one: background work started by
+    a request gets its own). Yields the Trace, or None when tracing is off.
+    """
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+    trace = Trace(name, attributes, kind)
+    token = _current.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        trace.root.end()
+        _finish(trace)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a stage of the current trace; a no-op outside one. Works in sync code, async code and threads."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    if not parent.trace.add(child):
+        yield None
+        return
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+def annotate(**attributes):
+    """Add attributes to the innermost active span, if any."""
+    current = _current.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def current_trace() -> Optional[Trace]:
+    current = _current.get()
+    return current.trace if current is not None else None
+
+
+# -------------------- Slow traces -------------------- #
+def _finish(trace: Trace):
+    if trace.root.duration_ms >= settings.TRACE_SLOW_MS:
+        _slow_traces.append(trace)
+    if settings.TRACE_EXPORT:
+        _exporter.submit(trace)
+
+
+def slow_traces(limit: int = 20) -> List[Dict[str, Any]]:
+    """Most recent slow traces first."""
+    return [t.to_dict() for t in list(_slow_traces)[::-1][:limit]]
+
+
+# -------------------- OTLP export -------------------- #
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span, kind: int) -> Dict[str, Any]:
+    out = {
+        "traceId": span.trace.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns or span.start_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+    }
+    if span.parent_id:
+        out["parentSpanId"] = span.parent_id
+    return out
+
+
+def to_otlp(traces: List[Trace]) -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest, accepted by collectors on /v1/traces."""
+    spans = []
+    for trace in traces:
+        spans.append(_otlp_span(trace.root, 2 if trace.kind == "server" else 1))
+        spans.extend(_otlp_span(s, 1) for s in trace.spans)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": settings.TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class _Exporter:
+    """
+    Ships finished traces off the request path: a daemon thread drains a
+    bounded queue in batches and appends them to TRACE_EXPORT_FILE (one
+    OTLP/JSON request per line) or POSTs them to TRACE_OTLP_ENDPOINT.
+    Traces are dropped, not waited for, when the queue is full.
+    """
+
+    BATCH = 64
+    _STOP = object()
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=1000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, trace: Trace):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self, batch: List[Trace], client):
+        payload = to_otlp(batch)
+        if settings.TRACE_EXPORT == "otlp":
+            client.post(settings.TRACE_OTLP_ENDPOINT, json=payload).raise_for_status()
+        else:
+            with open(settings.TRACE_EXPORT_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload) + "\n")
+
+    def _run(self):
+        import httpx
+
+        with httpx.Client(timeout=5) as client:
+            stopping = False
+            while not stopping:
+                batch = [self._queue.get()]
+                while len(batch) < self.BATCH:
+                    try:
+                        batch.append(self._queue.get(timeout=1))
+                    except queue.Empty:
+                        break
+                if self._STOP in batch:
+                    stopping = True
+                    batch = [t for t in batch if t is not self._STOP]
+                if not batch:
+                    continue
+                try:
+                    self._write(batch, client)
+                except Exception as e:
+                    logger.warning(f"⚠️ Trace export of {len(batch)} traces failed: {e}")
+
+    def shutdown(self, timeout: float = 5):
+        if self._thread is not None:
+            try:
+                self._queue.put(self._STOP, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+
+_exporter = _Exporter()
+
+
+def shutdown_tracing():
+    """Flush pending exports (called on app shutdown)."""
+    _exporter.shutdown()
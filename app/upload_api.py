@@ -1,19 +1,33 @@
 # apps/backend/app/upload_api.py
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from pathlib import Path
-from docx import Document
-from PyPDF2 import PdfReader
+from typing import Any, Dict, Iterator, List, Optional
+import time
 import uuid
+import asyncio
+import tarfile
+import zipfile
 import traceback
 
-from .utils.vector_db import upsert_embeddings
-from .utils.fallback_llm import get_embedding_with_fallback
+from .extraction import iter_pages, ExtractionError, SUPPORTED_EXTENSIONS
+from .chunking import chunk_document
+from .ingest_jobs import start_ingest_job, load_job_progress
+from .upload_store import store_upload, safe_filename, claim_manifest
+from .chunk_manifest import get_document
+from .folder_watch import watch_status
+from .bulk_ingest import is_archive, iter_archive_members, prepare_bytes, prepare_file, index_documents, Throughput
+from .config import settings
+from .tracing import span
+from .metrics import count_cache
 
 router = APIRouter()
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Logical documents from /bulk live apart from watched-folder paths
+BULK_NAMESPACE = "bulk/"
+
 
 def safe_decode_bytes(b: bytes) -> str:
     """Decode bytes to str, ignoring invalid bytes."""
@@ -23,34 +37,29 @@ def safe_decode_bytes(b: bytes) -> str:
         return b.decode("utf-8", errors="ignore")
 
 
+def iter_extract_pages(file_path: Path) -> Iterator[str]:
+    """
+    Yield extracted text page by page (PDF pages, blocks of DOCX paragraphs
+    or TXT lines) so callers can start chunking before the whole file is parsed.
+    Parsing runs in the extraction process pool with a per-document timeout.
+    """
+    if not file_path.name.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Unsupported file type. Use .txt, .docx, or .pdf")
+    return iter_pages(file_path)
+
+
 def extract_text(file_path: Path) -> str:
     """
     Extract plain text from TXT, DOCX, or PDF files.
     Returns an empty string if nothing could be extracted.
     """
-    filename = file_path.name.lower()
     try:
-        if filename.endswith(".txt"):
-            return file_path.read_text(encoding="utf-8", errors="ignore").strip()
-
-        if filename.endswith(".docx"):
-            doc = Document(file_path)
-            paragraphs = [p.text for p in doc.paragraphs if p.text]
-            return "\n".join(paragraphs).strip()
-
-        if filename.endswith(".pdf"):
-            reader = PdfReader(str(file_path))
-            texts = []
-            for page in reader.pages:
-                ptext = page.extract_text()
-                if ptext:
-                    texts.append(ptext)
-            return "\n".join(texts).strip()
-
-        # unsupported type
-        raise HTTPException(status_code=400, detail="Unsupported file type. Use .txt, .docx, or .pdf")
+        return "\n".join(t for t in iter_extract_pages(file_path) if t).strip()
     except HTTPException:
         raise
+    except ExtractionError as e:
+        # Timed out or hit the memory cap; decoding the raw bytes would only yield garbage
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception:
         # fallback: try reading binary and decode safely
         try:
@@ -61,56 +70,73 @@ def extract_text(file_path: Path) -> str:
             return ""
 
 
-def chunk_text(text: str, chunk_size_words: int = 500) -> list[str]:
-    """Split text into word-based chunks. Returns list of chunk strings."""
+def chunk_text(text: str, max_tokens: Optional[int] = None) -> list[str]:
+    """Split text into sentence/paragraph-aligned chunks of at most `max_tokens` embedding tokens."""
     if not text:
         return []
-    words = text.split()
-    return [" ".join(words[i : i + chunk_size_words]) for i in range(0, len(words), chunk_size_words)]
+    return chunk_document(text, max_tokens)
 
 
-@router.post("/upload")
-async def upload(file: UploadFile = File(...)):
+@router.post("/upload", status_code=202)
+async def upload(file: UploadFile = File(...), replaces: Optional[str] = Form(None)):
     """
-    Upload a document -> extract text -> split into chunks ->
-    generate embeddings -> push to vector DB (upsert_embeddings).
+    Upload a document and return a job ID immediately. Extraction, chunking,
+    embedding and the vector DB upsert run as a background job; poll
+    /upload/status/{job_id} for progress. Content that is already indexed
+    returns its existing doc_id with status "duplicate" and no new job.
+
+    Every upload is a new document unless `replaces` names the doc_id it is
+    a new version of; only then are unchanged chunks reused and the old
+    version's other chunks deleted.
     """
     try:
-        # 1. Save uploaded file
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-
-        # 2. Extract text
-        text_content = extract_text(file_path)
-        if not text_content:
-            raise HTTPException(status_code=400, detail="No text could be extracted from file")
-
-        # 3. Chunk text
-        chunks = chunk_text(text_content, chunk_size_words=500)
-        if not chunks:
-            raise HTTPException(status_code=400, detail="Chunking produced no chunks")
-
-        # 4. Create embeddings + docs
-        doc_id = str(uuid.uuid4())
-        docs = []
-        for i, chunk in enumerate(chunks):
-            # Use your fallback embedding function (may raise; we catch below)
-            embedding = get_embedding_with_fallback(chunk)
-            docs.append(
-                {
-                    "doc_id": doc_id,
-                    "chunk_id": f"chunk{i}",
-                    "embedding": embedding,
-                    "text": chunk,
-                    "source": file.filename,
-                }
-            )
+        filename = safe_filename(file.filename)
+        if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            raise HTTPException(status_code=400, detail="Unsupported file type. Use .txt, .docx, or .pdf")
 
-        # 5. Upsert into vector DB
-        upsert_embeddings(docs)
+        # 1. Stream uploaded file into the content-addressed store
+        with span("store"):
+            stored = await store_upload(file, filename)
+        result = {
+            "filename": filename,
+            "size": stored["size"],
+            "sha256": stored["sha256"],
+        }
 
-        return {"status": "success", "filename": file.filename, "chunks_ingested": len(docs), "doc_id": doc_id}
+        # 2. Same content already indexed (or being indexed): reuse it
+        # An explicit new version keeps the document's doc_id and is diffed chunk by chunk
+        with span("manifest"):
+            if replaces:
+                current = await get_document(replaces)
+                if current is None:
+                    raise HTTPException(status_code=404, detail=f"Document {replaces} not found")
+                doc_id, document = current.doc_id, current.name
+            else:
+                doc_id = str(uuid.uuid4())
+                document = f"upload/{doc_id}/{filename}"
+            manifest, claimed = await claim_manifest(stored["sha256"], doc_id, filename, stored["size"])
+        count_cache("upload_dedupe", int(not claimed), int(claimed))
+        if not claimed:
+            return {
+                **result,
+                "status": "duplicate" if manifest.status == "indexed" else "accepted",
+                "job_id": manifest.job_id,
+                "doc_id": manifest.doc_id,
+                "chunk_count": manifest.chunk_count,
+            }
+
+        # 3. Start background ingestion
+        with span("enqueue"):
+            progress = await start_ingest_job(
+                stored["path"], filename, manifest.doc_id, sha256=stored["sha256"], document=document
+            )
+
+        return {
+            **result,
+            "status": "accepted",
+            "job_id": progress["job_id"],
+            "doc_id": manifest.doc_id,
+        }
 
     except HTTPException:
         # re-raise FastAPI HTTP exceptions unchanged
@@ -118,3 +144,115 @@ async def upload(file: UploadFile = File(...)):
     except Exception as exc:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(exc))
+
+
+@router.get("/status/{job_id}")
+async def upload_status(job_id: str):
+    """Progress of a background ingestion job: pages extracted, chunks embedded and indexed."""
+    progress = await load_job_progress(job_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return progress
+
+
+@router.post("/bulk")
+async def bulk_upload(files: List[UploadFile] = File(...), replace: bool = Form(False)):
+    """
+    Ingest many files and/or zip/tar archives in one request. Archive
+    members are streamed from the upload without being extracted to disk;
+    plain files are streamed into the upload store and extracted from there.
+    Files are extracted concurrently, embedding calls are batched across
+    all files and upserts coalesced. Returns a per-file result manifest.
+
+    Bulk documents are identified by name ("<archive>/<member>" for archive
+    members), so a repeated name within one request is skipped. A name
+    already indexed with other content is skipped unless `replace` is set,
+    in which case it becomes a new version of that document.
+    """
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    max_bytes = settings.UPLOAD_MAX_BYTES
+    manifest: List[Dict[str, Any]] = []
+    names: set[str] = set()
+    group: List[asyncio.Task] = []
+    semaphore = asyncio.Semaphore(max(1, settings.EXTRACT_WORKERS) * 2)
+    stats = Throughput()
+
+    async def prepare(fn, *args) -> Dict[str, Any]:
+        try:
+            return await asyncio.to_thread(fn, *args)
+        finally:
+            semaphore.release()
+
+    async def index_group():
+        docs = await asyncio.gather(*group)
+        group.clear()
+        group_started = time.perf_counter()
+        results = await index_documents(docs, provider="bulk_upload", namespace=BULK_NAMESPACE, replace=replace)
+        for doc, result in zip(docs, results):
+            manifest.append({**result, "size": doc["size"], "error": result["error"] or doc.get("error")})
+        stats.record(results, time.perf_counter() - group_started)
+
+    async def add(name: str, data: Optional[bytes], error: Optional[str],
+                  stored: Optional[Dict[str, Any]] = None):
+        if len(manifest) + len(group) >= settings.BULK_MAX_FILES:
+            raise HTTPException(status_code=413, detail=f"Too many files. Maximum is {settings.BULK_MAX_FILES}")
+        # Two files of one name would be planned as competing versions of the same document
+        if name in names:
+            manifest.append({"name": name, "status": "skipped", "error": "Duplicate file name in this request"})
+            return
+        names.add(name)
+        if data is None and stored is None:
+            manifest.append({"name": name, "status": "skipped", "error": error})
+            return
+        # Bounds how many documents sit in memory waiting for extraction
+        await semaphore.acquire()
+        if stored is not None:
+            group.append(asyncio.create_task(prepare(prepare_file, name, stored["path"], stored["sha256"])))
+        else:
+            group.append(asyncio.create_task(prepare(prepare_bytes, name, data)))
+        if len(group) >= settings.BULK_BATCH_FILES:
+            await index_group()
+
+    try:
+        for upload in files:
+            filename = safe_filename(upload.filename)
+            if is_archive(filename):
+                members = iter_archive_members(upload.file, filename, max_bytes)
+                while (member := await loop.run_in_executor(None, next, members, None)) is not None:
+                    await add(*member)
+            elif filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                try:
+                    stored = await store_upload(upload, filename)
+                except HTTPException as exc:
+                    if exc.status_code != 413:
+                        raise
+                    await add(filename, None, "File too large")
+                else:
+                    await add(filename, None, None, stored=stored)
+            else:
+                await add(filename, None, "Unsupported file type")
+        if group:
+            await index_group()
+    except (tarfile.TarError, zipfile.BadZipFile) as exc:
+        raise HTTPException(status_code=400, detail=f"Could not read archive: {exc}")
+    finally:
+        for task in group:
+            task.cancel()
+
+    counts: Dict[str, int] = {}
+    for entry in manifest:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    return {
+        "status": "completed",
+        "files": manifest,
+        "counts": counts,
+        "seconds": round(time.perf_counter() - started, 3),
+        "throughput": stats.snapshot(),
+    }
+
+
+@router.get("/watch/status")
+async def watched_folder_status():
+    """Watched-folder ingestion: whether this worker is watching, queue depth and files/chunks per second."""
+    return watch_status()
@@ -0,0 +1,177 @@
+# apps/backend/app/upload_store.py
+import os
+import re
+import uuid
+import asyncio
+import hashlib
+import logging
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.exc import IntegrityError
+
+from .config import settings
+from .db import async_session
+from .models import UploadManifest, utc_now
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed object store: <UPLOAD_STORE_DIR>/<sha[:2]>/<sha><ext>
+OBJECTS_DIR = Path(settings.UPLOAD_STORE_DIR)
+_OBJECT_NAME = re.compile(r"^[0-9a-f]{64}(\.[A-Za-z0-9]+)?$")
+
+
+def safe_filename(filename: Optional[str]) -> str:
+    """Strip any directory components a client may send."""
+    name = Path(filename or "").name
+    return name or "upload"
+
+
+async def save_upload_stream(
+    file: UploadFile,
+    dest_path: Path,
+    max_bytes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Stream an upload to `dest_path` in fixed-size chunks, hashing on the fly.
+    Data goes to a temp file in the same directory and is renamed into place
+    only when complete, so readers never see a partial file. Memory use is
+    one chunk regardless of file size. Raises 413 past `max_bytes`.
+    Returns {"path", "sha256", "size"}.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_BYTES
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(dir=dest_path.parent, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size is {max_bytes // (1024 * 1024)} MB",
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+        os.replace(tmp_name, dest_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+    logger.info(f"💾 Stored upload {dest_path.name} ({size} bytes)")
+    return {"path": dest_path, "sha256": digest.hexdigest(), "size": size}
+
+
+# ---- Content-addressed store ---- #
+
+def object_name(sha256: str, filename: str) -> str:
+    return f"{sha256}{Path(filename).suffix.lower()}"
+
+
+def object_path(name: str) -> Path:
+    return OBJECTS_DIR / name[:2] / name
+
+
+def resolve_object(name: str) -> Optional[Path]:
+    """Path of a stored object by its name (`<sha256><ext>`), or None if it isn't one."""
+    if not _OBJECT_NAME.match(name):
+        return None
+    path = object_path(name)
+    return path if path.exists() else None
+
+
+async def store_upload(file: UploadFile, filename: str) -> Dict[str, Any]:
+    """
+    Stream an upload into the content-addressed store. Identical content
+    always lands on the same path, so re-uploads don't pile up copies.
+    Returns {"path", "name", "sha256", "size"}.
+    """
+    staging = OBJECTS_DIR / f".staging-{uuid.uuid4().hex}"
+    stored = await save_upload_stream(file, staging)
+    name = object_name(stored["sha256"], filename)
+    final = object_path(name)
+    final.parent.mkdir(parents=True, exist_ok=True)
+    if final.exists():
+        staging.unlink()
+    else:
+        os.replace(staging, final)
+    return {**stored, "path": final, "name": name}
+
+
+# ---- Upload manifest ---- #
+
+async def get_manifest(sha256: str) -> Optional[UploadManifest]:
+    async with async_session() as session:
+        return await session.get(UploadManifest, sha256)
+
+
+async def claim_manifest(sha256: str, doc_id: str, filename: str, size: int):
+    """
+    Reserve ingestion of this content for `doc_id`. Returns (manifest, claimed):
+    claimed is False when the content is already indexed with the current
+    embedding model or another ingest of it is in flight.
+    """
+    async with async_session() as session:
+        existing = await session.get(UploadManifest, sha256)
+        if existing:
+            stale = existing.status == "ingesting" and (
+                existing.updated_at.replace(tzinfo=None)
+                < utc_now().replace(tzinfo=None) - timedelta(seconds=settings.INGEST_STALE_SECONDS)
+            )
+            reusable = existing.status == "indexed" and existing.embedding_model == settings.HF_EMBED_MODEL
+            if reusable or (existing.status == "ingesting" and not stale):
+                return existing, False
+            existing.doc_id = doc_id
+            existing.filename = filename
+            existing.status = "ingesting"
+            existing.job_id = None
+            existing.embedding_model = settings.HF_EMBED_MODEL
+            existing.updated_at = utc_now()
+            await session.commit()
+            return existing, True
+
+        manifest = UploadManifest(
+            sha256=sha256,
+            doc_id=doc_id,
+            filename=filename,
+            size=size,
+            status="ingesting",
+            embedding_model=settings.HF_EMBED_MODEL,
+        )
+        session.add(manifest)
+        try:
+            await session.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent upload of the same content
+            await session.rollback()
+            return await session.get(UploadManifest, sha256), False
+        return manifest, True
+
+
+async def update_manifest(sha256: str, **fields):
+    async with async_session() as session:
+        manifest = await session.get(UploadManifest, sha256)
+        if manifest:
+            for key, value in fields.items():
+                setattr(manifest, key, value)
+            manifest.updated_at = utc_now()
+            await session.commit()
+
+
+async def drop_manifest(sha256: str):
+    """Forget a failed ingest so the next upload of the same content retries it."""
+    async with async_session() as session:
+        manifest = await session.get(UploadManifest, sha256)
+        if manifest and manifest.status != "indexed":
+            await session.delete(manifest)
+            await session.commit()
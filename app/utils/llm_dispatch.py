@@ -0,0 +1,176 @@
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from .rate_limiter import TokenBucket, MINUTE
+from ..tracing import annotate
+from ..metrics import register_gauge
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITY = {INTERACTIVE: 0, BACKGROUND: 1}
+
+# Class of the LLM calls made in the current task; background entry points
+# (scheduled/manual jobs, pipelines) switch it with `llm_priority(BACKGROUND)`.
+current_priority: ContextVar[str] = ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(name: str):
+    token = current_priority.set(name)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+def estimate_call_tokens(*texts: str) -> int:
+    """Prompt tokens (~4 chars each) plus the expected completion, charged against the class budget."""
+    return sum(len(t or "") for t in texts) // 4 + settings.LLM_OUTPUT_TOKENS_ESTIMATE
+
+
+class _Class:
+    def __init__(self, name: str, concurrency: int, tokens_per_minute: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(tokens_per_minute, MINUTE) if tokens_per_minute > 0 else None
+        self.running = 0
+        self.admitted = 0
+        self.waited_seconds = 0.0
+
+
+class LLMDispatcher:
+    """
+    Admission for LLM calls. Waiters are served strictly by class priority,
+    then arrival: whenever a slot frees up, queued interactive calls go
+    before any queued background call. Each class has its own concurrency
+    cap and token-per-minute budget, and all classes share
+    LLM_MAX_CONCURRENCY slots; the background cap is kept below it so
+    interactive calls always find headroom.
+    """
+
+    def __init__(self):
+        self.classes = {
+            INTERACTIVE: _Class(INTERACTIVE, settings.LLM_INTERACTIVE_CONCURRENCY, settings.LLM_INTERACTIVE_TPM),
+            BACKGROUND: _Class(BACKGROUND, settings.LLM_BACKGROUND_CONCURRENCY, settings.LLM_BACKGROUND_TPM),
+        }
+        self.max_concurrency = settings.LLM_MAX_CONCURRENCY
+        self.running = 0
+        self._waiters: List[list] = []  # heap of [priority, seq, class, cost, future]
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _try_admit(self, cls: _Class, cost: int, now: float) -> float:
+        """0 if admitted now; otherwise seconds until the token budget allows it (inf if blocked on slots)."""
+        if self.running >= self.max_concurrency or cls.running >= cls.concurrency:
+            return float("inf")
+        if cls.bucket is not None:
+            wait = cls.bucket.wait_time(now, cost)
+            if wait > 0:
+                return wait
+            cls.bucket.consume(cost)
+        self.running += 1
+        cls.running += 1
+        cls.admitted += 1
+        return 0.0
+
+    def _pump(self):
+        self._timer = None
+        now = time.monotonic()
+        retry_in = float("inf")
+        blocked = set()  # classes with an earlier waiter still queued: keep FIFO within a class
+        kept = []
+        while self._waiters:
+            entry = heapq.heappop(self._waiters)
+            _, _, cls, cost, future = entry
+            if future.done():
+                continue
+            if cls.name in blocked:
+                kept.append(entry)
+                continue
+            wait = self._try_admit(cls, cost, now)
+            if wait == 0:
+                future.set_result(None)
+                continue
+            kept.append(entry)
+            blocked.add(cls.name)
+            retry_in = min(retry_in, wait)
+            if self.running >= self.max_concurrency:
+                break  # no slot for anyone; lower classes can't jump ahead
+        for entry in kept:
+            heapq.heappush(self._waiters, entry)
+        if retry_in != float("inf") and self._waiters:
+            self._timer = asyncio.get_running_loop().call_later(retry_in, self._pump)
+
+    @asynccontextmanager
+    async def slot(self, cost: int, priority: Optional[str] = None):
+        cls = self.classes.get(priority or current_priority.get(), self.classes[INTERACTIVE])
+        started = time.monotonic()
+        if self._waiters or self._try_admit(cls, cost, started) != 0:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, [PRIORITY[cls.name], next(self._seq), cls, cost, future])
+            if self._timer is not None:
+                self._timer.cancel()
+            self._pump()
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release(cls)  # admitted just as we were cancelled
+                raise
+            cls.waited_seconds += time.monotonic() - started
+            annotate(llm_queue_ms=round((time.monotonic() - started) * 1000, 1))
+        try:
+            yield
+        finally:
+            self._release(cls)
+
+    def _release(self, cls: _Class):
+        self.running -= 1
+        cls.running -= 1
+        if self._waiters:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._pump()
+
+    def stats(self) -> Dict[str, Any]:
+        queued: Dict[str, int] = {}
+        for _, _, cls, _, future in self._waiters:
+            if not future.done():
+                queued[cls.name] = queued.get(cls.name, 0) + 1
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "classes": {
+                name: {
+                    "concurrency": cls.concurrency,
+                    "tokens_per_minute": int(cls.bucket.capacity) if cls.bucket else None,
+                    "running": cls.running,
+                    "queued": queued.get(name, 0),
+                    "admitted": cls.admitted,
+                    "avg_wait_seconds": round(cls.waited_seconds / cls.admitted, 3) if cls.admitted else None,
+                }
+                for name, cls in self.classes.items()
+            },
+        }
+
+
+dispatcher = LLMDispatcher()
+
+
+def _dispatch_gauge(field: str):
+    def read():
+        return {(name,): c[field] for name, c in dispatcher.stats()["classes"].items()}
+    return read
+
+
+register_gauge("llm_dispatch_running", "LLM calls in flight per priority class.", _dispatch_gauge("running"), ("priority",))
+register_gauge("llm_dispatch_queued", "LLM calls waiting per priority class.", _dispatch_gauge("queued"), ("priority",))
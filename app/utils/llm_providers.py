@@ -0,0 +1,335 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import settings
+from .fallback_llm import gemini_model, hf_llm, _build_prompt
+from .local_llm import local_worker
+from .llm_dispatch import dispatcher, estimate_call_tokens
+from .offline import OFFLINE, offline_llm
+from ..tracing import span
+from ..metrics import observe_upstream
+
+logger = logging.getLogger(__name__)
+
+GEMINI = "gemini-2.0-flash"
+LOCAL = "huggingface"
+OFFLINE_LLM = "offline"
+
+
+class ProviderUnavailable(RuntimeError):
+    """Raised when every provider failed or was skipped by its circuit breaker."""
+
+
+# ---- Circuit breaker ---- #
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open ->
+    half-open after `reset_seconds`, letting one trial call through; the
+    trial's outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """A trial call was cancelled before it could tell us anything."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"⚠️ Circuit opened after {self.consecutive_failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+
+# ---- Latency tracking ---- #
+
+class LatencyWindow:
+    """Latencies of the last `size` successful calls, for percentiles."""
+
+    def __init__(self, size: int = 200):
+        self.samples: deque = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# ---- Providers ---- #
+
+class Provider:
+    def __init__(self, name: str, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_SECONDS)
+        self.latency = LatencyWindow()
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    async def _generate(self, prompt: str, context: str, executor=None) -> str:
+        raise NotImplementedError
+
+    def _generate_sync(self, prompt: str, context: str) -> str:
+        raise NotImplementedError
+
+    def _record(self, started: float, error: Optional[BaseException]):
+        self.calls += 1
+        elapsed = time.monotonic() - started
+        if error is None:
+            self.latency.add(elapsed)
+            self.breaker.record_success()
+            observe_upstream(self.name, "generate", elapsed)
+            return
+        if getattr(error, "shed", False):
+            # Rejected by our own load shedding: the provider itself is fine
+            self.last_error = str(error)
+            return
+        observe_upstream(self.name, "generate", elapsed, error)
+        self.failures += 1
+        if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+            self.timeouts += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        self.breaker.record_failure()
+
+    async def generate(self, prompt: str, context: str, executor=None) -> str:
+        started = time.monotonic()
+        try:
+            with span("llm_call", provider=self.name):
+                text = await asyncio.wait_for(self._generate(prompt, context, executor), self.timeout)
+        except asyncio.CancelledError:
+            # Lost a hedge race: not the provider's fault
+            self.breaker.release_trial()
+            raise
+        except Exception as e:
+            self._record(started, e)
+            raise
+        self._record(started, None)
+        return text
+
+    def generate_sync(self, prompt: str, context: str) -> str:
+        started = time.monotonic()
+        try:
+            text = self._generate_sync(prompt, context)
+        except Exception as e:
+            self._record(started, e)
+            raise
+        self._record(started, None)
+        return text
+
+    def health(self) -> Dict[str, Any]:
+        p50, p95 = self.latency.percentile(0.5), self.latency.percentile(0.95)
+        return {
+            "available": self.available,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "timeout_seconds": self.timeout,
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+class GeminiProvider(Provider):
+    async def _generate(self, prompt: str, context: str, executor=None) -> str:
+        resp = await gemini_model.generate_content_async(
+            _build_prompt(prompt, context), request_options={"timeout": self.timeout}
+        )
+        return resp.text.strip()
+
+    def _generate_sync(self, prompt: str, context: str) -> str:
+        resp = gemini_model.generate_content(
+            _build_prompt(prompt, context), request_options={"timeout": self.timeout}
+        )
+        return resp.text.strip()
+
+
+class LocalProvider(Provider):
+    @property
+    def available(self) -> bool:
+        return hf_llm is not None
+
+    async def _generate(self, prompt: str, context: str, executor=None) -> str:
+        # Batched on the dedicated local inference worker; `executor` is not used
+        return await local_worker.submit(prompt)
+
+    def _generate_sync(self, prompt: str, context: str) -> str:
+        return local_worker.submit_blocking(prompt, self.timeout)
+
+    def health(self) -> Dict[str, Any]:
+        return {**super().health(), "worker": local_worker.stats()}
+
+
+class OfflineProvider(Provider):
+    """Modeled latency, deterministic text (PROVIDER_MODE=offline); see utils/offline."""
+
+    async def _generate(self, prompt: str, context: str, executor=None) -> str:
+        return await offline_llm.agenerate(prompt, context)
+
+    def _generate_sync(self, prompt: str, context: str) -> str:
+        return offline_llm.generate(prompt, context)
+
+
+# Offline mode keeps the routing (dispatch, timeouts, breakers) but swaps every provider out
+PROVIDERS: List[Provider] = [OfflineProvider(OFFLINE_LLM, settings.GEMINI_TIMEOUT_SECONDS)] if OFFLINE else [
+    GeminiProvider(GEMINI, settings.GEMINI_TIMEOUT_SECONDS),
+    LocalProvider(LOCAL, settings.LOCAL_LLM_TIMEOUT_SECONDS),
+]
+
+
+def _next_allowed(chain: List[Provider], errors: List[str]) -> Optional[Provider]:
+    """Pop providers until one whose circuit lets a call through (checked lazily: half-open admits one trial)."""
+    while chain:
+        provider = chain.pop(0)
+        if provider.breaker.allow():
+            return provider
+        errors.append(f"{provider.name}: circuit open")
+    return None
+
+
+def _raise_unavailable(errors: list):
+    """Everything failed. Load shedding is re-raised as is so callers can answer 503 and retry later."""
+    for error in errors:
+        if isinstance(error, Exception):
+            raise error
+    raise ProviderUnavailable("No LLM provider available. " + "; ".join(errors))
+
+
+def _hedge_delay(primary: Provider) -> Optional[float]:
+    """Primary's p95 latency, once enough samples exist to trust it."""
+    if not settings.LLM_HEDGE or len(primary.latency.samples) < settings.LLM_HEDGE_MIN_SAMPLES:
+        return None
+    return primary.latency.percentile(0.95)
+
+
+# ---- Routing ---- #
+
+async def agenerate(prompt: str, context: str = "", executor=None) -> Tuple[str, str]:
+    """
+    Wait for an LLM slot in the current priority class (see llm_dispatch),
+    then generate through the provider chain.
+    """
+    async with dispatcher.slot(estimate_call_tokens(prompt, context)):
+        return await _agenerate(prompt, context, executor)
+
+
+async def _agenerate(prompt: str, context: str, executor=None) -> Tuple[str, str]:
+    """
+    Generate with the first healthy provider, falling back down the chain
+    on error or timeout. Providers whose circuit is open are skipped
+    without waiting. With LLM_HEDGE, the next provider is also started if
+    the primary hasn't answered within its p95 latency; the first success
+    wins and the other call is cancelled. Returns (text, provider name).
+    """
+    chain = [p for p in PROVIDERS if p.available]
+    errors: List[str] = []
+    while (primary := _next_allowed(chain, errors)) is not None:
+        task = asyncio.ensure_future(primary.generate(prompt, context, executor))
+        delay = _hedge_delay(primary) if chain else None
+        if delay is not None:
+            done, _ = await asyncio.wait({task}, timeout=delay)
+            backup = None if done else _next_allowed(chain, errors)
+            if backup is not None:
+                logger.info(f"⏱️ {primary.name} slower than p95 ({delay:.2f}s); hedging with {backup.name}")
+                hedge = asyncio.ensure_future(backup.generate(prompt, context, executor))
+                result = await _first_success({primary.name: task, backup.name: hedge}, errors)
+                if result is not None:
+                    return result
+                continue
+        try:
+            return await task, primary.name
+        except Exception as e:
+            errors.append(e if getattr(e, "shed", False) else f"{primary.name}: {e}")
+            logger.error(f"❌ {primary.name} failed: {e}")
+    _raise_unavailable(errors)
+
+
+async def _first_success(tasks: Dict[str, asyncio.Future], errors: List[str]) -> Optional[Tuple[str, str]]:
+    pending = set(tasks.values())
+    names = {task: name for name, task in tasks.items()}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), names[task]
+                error = task.exception()
+                errors.append(error if getattr(error, "shed", False) else f"{names[task]}: {error}")
+                logger.error(f"❌ {names[task]} failed: {task.exception()}")
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def generate(prompt: str, context: str = "") -> Tuple[str, str]:
+    """Blocking variant for sync callers: same chain, timeouts and breakers, no hedging."""
+    chain = [p for p in PROVIDERS if p.available]
+    errors: List[str] = []
+    while (provider := _next_allowed(chain, errors)) is not None:
+        try:
+            return provider.generate_sync(prompt, context), provider.name
+        except Exception as e:
+            errors.append(e if getattr(e, "shed", False) else f"{provider.name}: {e}")
+            logger.error(f"❌ {provider.name} failed: {e}")
+    _raise_unavailable(errors)
+
+
+def provider_health() -> Dict[str, Any]:
+    return {
+        "mode": settings.PROVIDER_MODE,
+        "hedging": settings.LLM_HEDGE,
+        "providers": {p.name: p.health() for p in PROVIDERS},
+        "dispatch": dispatcher.stats(),
+    }
@@ -0,0 +1,155 @@
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from ..config import settings
+from .fallback_llm import hf_llm, _hf_generate
+
+logger = logging.getLogger(__name__)
+
+MAX_NEW_TOKENS = 256
+
+
+class LocalLLMOverloaded(RuntimeError):
+    """The local inference queue is full; the caller should back off and retry."""
+    shed = True  # load shedding, not a provider fault: circuit breakers ignore it
+
+
+def _configure_model():
+    """Cap torch's intra-op threads and enable padded batches for GPT-2 (no pad token by default)."""
+    try:
+        import torch
+        torch.set_num_threads(settings.LOCAL_LLM_TORCH_THREADS)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not set torch threads: {e}")
+    tokenizer = hf_llm.tokenizer
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    # Decoder-only models must be left-padded so generation continues from the prompt's end
+    tokenizer.padding_side = "left"
+
+
+def _generate_batch(prompts: List[str]) -> List[str]:
+    outputs = hf_llm(
+        prompts,
+        max_new_tokens=MAX_NEW_TOKENS,
+        truncation=True,
+        batch_size=len(prompts),
+        pad_token_id=hf_llm.tokenizer.pad_token_id,
+    )
+    return [out[0]["generated_text"].strip() for out in outputs]
+
+
+class LocalInferenceWorker:
+    """
+    Single consumer for local GPT-2 generation. Concurrent prompts queue up
+    (bounded by LOCAL_LLM_QUEUE_SIZE, overflow is rejected immediately),
+    are collected into batches of up to LOCAL_LLM_MAX_BATCH within
+    LOCAL_LLM_BATCH_WAIT_MS, and each batch is one `generate` call. At most
+    LOCAL_LLM_CONCURRENCY batches run at once, on dedicated threads, so
+    generations don't fight over the same cores.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.LOCAL_LLM_CONCURRENCY, thread_name_prefix="local-llm"
+        )
+        self._configured = False
+        self.batches = 0
+        self.prompts = 0
+        self.shed = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=settings.LOCAL_LLM_QUEUE_SIZE)
+            self._slots = asyncio.Semaphore(settings.LOCAL_LLM_CONCURRENCY)
+            self._task = loop.create_task(self._run())
+
+    async def submit(self, prompt: str) -> str:
+        if hf_llm is None:
+            raise RuntimeError("Local LLM not loaded")
+        self._ensure_started()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait((prompt, future))
+        except asyncio.QueueFull:
+            self.shed += 1
+            raise LocalLLMOverloaded(
+                f"Local LLM queue is full ({settings.LOCAL_LLM_QUEUE_SIZE} waiting); try again later"
+            )
+        return await future
+
+    def submit_blocking(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """For sync callers on other threads: go through the same queue if the worker is running."""
+        if self._loop is not None and self._loop.is_running() and self._task and not self._task.done():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not self._loop:
+                return asyncio.run_coroutine_threadsafe(self.submit(prompt), self._loop).result(timeout)
+        return _hf_generate(prompt)
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + settings.LOCAL_LLM_BATCH_WAIT_MS / 1000
+        while len(batch) < settings.LOCAL_LLM_MAX_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Callers that timed out while queued don't need a generation
+        return [(p, f) for p, f in batch if not f.done()]
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            await self._slots.acquire()
+            self._loop.create_task(self._execute(batch))
+
+    async def _execute(self, batch: List[Tuple[str, asyncio.Future]]):
+        try:
+            if not self._configured:
+                await self._loop.run_in_executor(self._executor, _configure_model)
+                self._configured = True
+            started = time.perf_counter()
+            texts = await self._loop.run_in_executor(self._executor, _generate_batch, [p for p, _ in batch])
+            self.batches += 1
+            self.prompts += len(batch)
+            logger.info(f"🧠 Local LLM batch of {len(batch)} in {time.perf_counter() - started:.1f}s")
+            for (_, future), text in zip(batch, texts):
+                if not future.done():
+                    future.set_result(text)
+        except Exception as e:
+            logger.error(f"❌ Local LLM batch failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "queue_size": settings.LOCAL_LLM_QUEUE_SIZE,
+            "batches": self.batches,
+            "prompts": self.prompts,
+            "avg_batch": round(self.prompts / self.batches, 2) if self.batches else None,
+            "shed": self.shed,
+        }
+
+
+local_worker = LocalInferenceWorker()
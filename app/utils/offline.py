@@ -0,0 +1,234 @@
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import numpy as np
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+OFFLINE = settings.PROVIDER_MODE == "offline"
+RECORD = settings.PROVIDER_MODE == "record"
+
+FIXTURES_DIR = (
+    Path(settings.OFFLINE_FIXTURES_DIR) if settings.OFFLINE_FIXTURES_DIR
+    else Path(__file__).resolve().parent.parent / "fixtures"
+)
+
+_WORD = re.compile(r"\w+")
+
+
+def _seeded(*parts: str) -> random.Random:
+    digest = hashlib.sha256("\x00".join((str(settings.OFFLINE_SEED),) + parts).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def api_key(name: str) -> Optional[str]:
+    """Upstream API key from the environment; a placeholder is enough when offline."""
+    return os.getenv(name) or ("offline" if OFFLINE else None)
+
+
+# -------------------- Embeddings -------------------- #
+class HashEmbeddings:
+    """
+    Feature-hashed bag of words, L2-normalized: deterministic, no model, and
+    texts sharing words still land close together, so retrieval behaves
+    plausibly. Same interface as the HuggingFace embedder.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+            vec[h % self.dim] += 1.0 if (h >> 63) else -1.0
+        norm = np.linalg.norm(vec)
+        if norm:
+            vec /= norm
+        return vec.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+
+# -------------------- LLM -------------------- #
+class OfflineLLM:
+    """
+    Stand-in generator. Latency is modeled as time to first token plus
+    output tokens at a fixed rate, with seeded jitter, so the same prompt
+    always takes the same time and returns the same text.
+    """
+
+    def __init__(self, latency_ms: float, tokens_per_second: float, output_tokens: int, jitter: float):
+        self.latency = latency_ms / 1000
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.jitter = jitter
+
+    def complete(self, prompt: str, context: str = "") -> Tuple[str, float]:
+        """(text, seconds the call should take)."""
+        rng = _seeded("llm", prompt, context)
+        words = _WORD.findall(context) or _WORD.findall(prompt) or ["offline"]
+        body = " ".join(rng.choice(words) for _ in range(self.output_tokens))
+        text = f"**Offline answer** to: {prompt.strip()[:120]}\n\n{body}"
+        seconds = self.latency + (self.output_tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0)
+        seconds *= 1 + rng.uniform(-self.jitter, self.jitter)
+        return text, max(0.0, seconds)
+
+    async def agenerate(self, prompt: str, context: str = "") -> str:
+        text, seconds = self.complete(prompt, context)
+        await asyncio.sleep(seconds)
+        return text
+
+    def generate(self, prompt: str, context: str = "") -> str:
+        text, seconds = self.complete(prompt, context)
+        time.sleep(seconds)
+        return text
+
+
+# -------------------- Vector store -------------------- #
+class InMemoryIndex:
+    """
+    The subset of the Pinecone Index API that vector_db uses (upsert, query
+    with a doc_id filter, fetch, delete), held in process memory. Queries
+    are exact cosine similarity over a matrix rebuilt after writes.
+    """
+
+    def __init__(self):
+        self._vectors: Dict[str, Tuple[List[float], Dict[str, Any]]] = {}
+        self._matrix: Optional[Tuple[List[str], np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        with self._lock:
+            for v in vectors:
+                self._vectors[v["id"]] = (v["values"], v.get("metadata", {}))
+            self._matrix = None
+        return {"upserted_count": len(vectors)}
+
+    def _snapshot(self) -> Tuple[List[str], np.ndarray]:
+        with self._lock:
+            if self._matrix is None:
+                ids = list(self._vectors)
+                mat = np.array([self._vectors[i][0] for i in ids], dtype=np.float32).reshape(len(ids), -1)
+                norms = np.linalg.norm(mat, axis=1, keepdims=True)
+                self._matrix = (ids, mat / np.where(norms == 0, 1, norms))
+            return self._matrix
+
+    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = True,
+              filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        ids, mat = self._snapshot()
+        if not ids:
+            return {"matches": []}
+        q = np.asarray(vector, dtype=np.float32)
+        scores = mat @ (q / (np.linalg.norm(q) or 1))
+        wanted = (filter or {}).get("doc_id", {}).get("$eq")
+        order = np.argsort(-scores)
+        matches = []
+        for i in order:
+            entry = self._vectors.get(ids[i])
+            if entry is None:
+                continue  # deleted since the matrix was built
+            meta = entry[1]
+            if wanted is not None and meta.get("doc_id") != wanted:
+                continue
+            matches.append({"id": ids[i], "score": float(scores[i]), "metadata": meta if include_metadata else {}})
+            if len(matches) >= top_k:
+                break
+        return {"matches": matches}
+
+    def fetch(self, ids: List[str]) -> Dict[str, Any]:
+        with self._lock:
+            return {"vectors": {i: {"id": i, "values": self._vectors[i][0]} for i in ids if i in self._vectors}}
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False):
+        with self._lock:
+            if delete_all:
+                self._vectors.clear()
+            for i in ids or []:
+                self._vectors.pop(i, None)
+            self._matrix = None
+        return {}
+
+
+# -------------------- Upstream API fixtures -------------------- #
+# host -> (fixture folder, query parameter that selects the fixture)
+_UPSTREAMS = {
+    "newsapi.org": ("newsapi", "q"),
+    "www.alphavantage.co": ("alphavantage", "symbol"),
+    "www.googleapis.com": ("google", "q"),
+}
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", value.lower()).strip("-") or "default"
+
+
+def fixture_path(url: str, params: Dict[str, Any]) -> Optional[Path]:
+    upstream = _UPSTREAMS.get(urlsplit(url).netloc)
+    if upstream is None:
+        return None
+    folder, key = upstream
+    return FIXTURES_DIR / folder / f"{_slug(str(params.get(key, '')))}.json"
+
+
+def load_fixture(url: str, params: Dict[str, Any]) -> Optional[dict]:
+    """Recorded response for this request, else the upstream's default.json, else None."""
+    path = fixture_path(url, params)
+    if path is None:
+        return None
+    for candidate in (path, path.with_name("default.json")):
+        if candidate.is_file():
+            return json.loads(candidate.read_text(encoding="utf-8"))
+    return None
+
+
+def record_fixture(url: str, params: Dict[str, Any], data: dict):
+    """Save a live response (PROVIDER_MODE=record) so offline runs can replay it."""
+    path = fixture_path(url, params)
+    if path is None:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        logger.info(f"📼 Recorded fixture {path}")
+    except OSError as e:
+        logger.warning(f"⚠️ Could not record fixture {path}: {e}")
+
+
+def fixture_transport() -> httpx.MockTransport:
+    """httpx transport answering upstream API requests from fixtures (404 when none is recorded)."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        data = load_fixture(str(request.url.copy_with(query=None)), dict(request.url.params))
+        if data is None:
+            return httpx.Response(404, json={"error": f"No offline fixture for {request.url.host}"})
+        return httpx.Response(200, json=data)
+
+    return httpx.MockTransport(handler)
+
+
+# -------------------- Stand-in instances -------------------- #
+offline_embedder = HashEmbeddings(settings.OFFLINE_EMBED_DIM)
+offline_llm = OfflineLLM(
+    settings.OFFLINE_LLM_LATENCY_MS,
+    settings.OFFLINE_LLM_TOKENS_PER_SECOND,
+    settings.OFFLINE_LLM_OUTPUT_TOKENS,
+    settings.OFFLINE_LLM_JITTER,
+)
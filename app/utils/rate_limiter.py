@@ -0,0 +1,145 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60.0
+DAY = 86400.0
+
+
+# ---- Token bucket ---- #
+
+class TokenBucket:
+    """`capacity` calls per `period` seconds, refilled continuously."""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = float(capacity)
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float, amount: float = 1) -> float:
+        """Seconds until `amount` tokens have accrued (0 if available now); beyond capacity, at the refill rate."""
+        self._refill(now)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float = 1):
+        self.tokens -= min(amount, self.capacity)
+
+
+class QuotaPacer:
+    """
+    Paces calls to one provider so that every configured window
+    (e.g. per-minute and per-day) is respected. Waiters queue FIFO within
+    two classes and interactive ones are served before background ones;
+    a single timer hands each slot to the head of the queue the moment the
+    quotas allow, so calls go out back to back at the fastest permitted
+    rate and nobody sleeps while holding up the others.
+    """
+
+    def __init__(self, name: str, limits: List[Tuple[int, float]]):
+        self.name = name
+        self.buckets = [TokenBucket(capacity, period) for capacity, period in limits if capacity > 0]
+        self._interactive: deque = deque()
+        self._background: deque = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _wait_time(self, now: float, amount: float = 1) -> float:
+        return max((b.wait_time(now, amount) for b in self.buckets), default=0.0)
+
+    def _dispatch(self):
+        """Grant free slots to waiting callers (interactive first), then arm the timer for the next one."""
+        self._timer = None
+        while True:
+            queue = self._interactive if self._interactive else self._background
+            while queue and queue[0].done():
+                queue.popleft()  # timed out or cancelled
+            if not queue:
+                if queue is self._interactive and self._background:
+                    continue
+                return
+            wait = self._wait_time(time.monotonic())
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            for b in self.buckets:
+                b.consume()
+            queue.popleft().set_result(None)
+
+    async def acquire(self, max_wait: Optional[float] = None, interactive: bool = False) -> bool:
+        """
+        Wait for a call slot. Returns False, without waiting, if the slot is
+        expected to take longer than `max_wait` seconds given the callers
+        ahead, or once `max_wait` has passed.
+        """
+        queues = (self._interactive,) if interactive else (self._interactive, self._background)
+        ahead = sum(not f.done() for queue in queues for f in queue)
+        expected = self._wait_time(time.monotonic(), ahead + 1)
+        if max_wait is not None and expected > max_wait:
+            logger.warning(f"⚠️ {self.name} quota exhausted; next slot in {expected:.0f}s")
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        (self._interactive if interactive else self._background).append(future)
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await asyncio.wait_for(future, max_wait)
+        except asyncio.TimeoutError:
+            # The slot may have been granted in the same loop iteration the deadline fired
+            if future.done() and not future.cancelled():
+                return True
+            logger.warning(f"⚠️ {self.name} quota: no slot within {max_wait:.0f}s")
+            return False
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                for b in self.buckets:
+                    b.tokens = min(b.capacity, b.tokens + 1)  # granted but never used: give it back
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._dispatch()
+            raise
+        return True
+
+    def next_slot_in(self) -> float:
+        """Seconds until a call slot is free (0 if one is free now)."""
+        return self._wait_time(time.monotonic())
+
+
+# ---- Provider pacers ---- #
+
+PROVIDER_PACERS: Dict[str, QuotaPacer] = {
+    "alphavantage": QuotaPacer(
+        "alphavantage",
+        [(settings.ALPHAVANTAGE_PER_MINUTE, MINUTE), (settings.ALPHAVANTAGE_PER_DAY, DAY)],
+    ),
+    "newsapi": QuotaPacer("newsapi", [(settings.NEWSAPI_PER_DAY, DAY)]),
+    "google": QuotaPacer("google", [(settings.GOOGLE_PER_DAY, DAY)]),
+}
+
+
+async def acquire_quota(provider: str, max_wait: Optional[float] = None, interactive: bool = False) -> bool:
+    """Wait for a call slot, at most `max_wait` seconds (default QUOTA_MAX_WAIT_SECONDS)."""
+    pacer = PROVIDER_PACERS.get(provider)
+    if pacer is None:
+        return True
+    return await pacer.acquire(
+        max_wait=settings.QUOTA_MAX_WAIT_SECONDS if max_wait is None else max_wait,
+        interactive=interactive,
+    )
+
+
+def quota_retry_after(provider: str) -> float:
+    pacer = PROVIDER_PACERS.get(provider)
+    return pacer.next_slot_in() if pacer else 0.0
@@ -121,31 +121,52 @@
 #     return index.delete(delete_all=True)
 
 import os
+import time
 from typing import List, Dict, Any
 from pinecone import Pinecone, ServerlessSpec
 
+from .offline import OFFLINE, InMemoryIndex
+from ..metrics import observe_upstream
+
 # ---- Pinecone Initialization ---- #
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY", "your-fallback-key")
 HF_INDEX_NAME = os.getenv("HF_INDEX_NAME", "huggingface-index")
 DIMENSION = 1536  # adjust for your embedding model
 
-# Initialize Pinecone client
-pc = Pinecone(api_key=PINECONE_API_KEY)
+if OFFLINE:
+    # Same calls, served from process memory (PROVIDER_MODE=offline)
+    index = InMemoryIndex()
+else:
+    # Initialize Pinecone client
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+
+    # Ensure index exists (serverless example)
+    if HF_INDEX_NAME not in [i["name"] for i in pc.list_indexes()]:
+        pc.create_index(
+            name=HF_INDEX_NAME,
+            dimension=DIMENSION,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region="us-east-1")
+        )
 
-# Ensure index exists (serverless example)
-if HF_INDEX_NAME not in [i["name"] for i in pc.list_indexes()]:
-    pc.create_index(
-        name=HF_INDEX_NAME,
-        dimension=DIMENSION,
-        metric="cosine",
-        spec=ServerlessSpec(cloud="aws", region="us-east-1")
-    )
+    # Get index object
+    index = pc.Index(HF_INDEX_NAME)
 
-# Get index object
-index = pc.Index(HF_INDEX_NAME)
+VECTOR_PROVIDER = "memory" if OFFLINE else "pinecone"
 
 # ---- Utility functions ---- #
 
+def _timed(operation: str, call, **kwargs):
+    """Run one index call, recording its latency and failures for /metrics."""
+    started = time.perf_counter()
+    try:
+        result = call(**kwargs)
+    except Exception as e:
+        observe_upstream(VECTOR_PROVIDER, operation, time.perf_counter() - started, e)
+        raise
+    observe_upstream(VECTOR_PROVIDER, operation, time.perf_counter() - started)
+    return result
+
 def format_vector(
     doc_id: str,
     chunk_id: str,
@@ -178,7 +199,7 @@ def upsert_embeddings(docs: List[Dict[str, Any]], provider: str = "unknown"):
         )
         for doc in docs
     ]
-    return index.upsert(vectors=vectors)
+    return _timed("upsert", index.upsert, vectors=vectors)
 
 def search_in_pinecone(vector: List[float], top_k: int = 5, doc_id: str = None) -> List[Dict[str, Any]]:
     query_kwargs = {
@@ -189,7 +210,7 @@ def search_in_pinecone(vector: List[float], top_k: int = 5, doc_id: str = None)
     if doc_id:
         query_kwargs["filter"] = {"doc_id": {"$eq": doc_id}}
 
-    results = index.query(**query_kwargs)
+    results = _timed("query", index.query, **query_kwargs)
     cleaned = []
     for match in results["matches"]:
         meta = match.get("metadata", {})
@@ -204,8 +225,17 @@ def search_in_pinecone(vector: List[float], top_k: int = 5, doc_id: str = None)
         })
     return cleaned
 
+def fetch_existing_ids(ids: List[str], batch_size: int = 1000) -> set:
+    """Return the subset of vector IDs that are already in the index."""
+    found = set()
+    for i in range(0, len(ids), batch_size):
+        res = _timed("fetch", index.fetch, ids=ids[i:i + batch_size])
+        vectors = res.vectors if hasattr(res, "vectors") else res.get("vectors", {})
+        found.update(vectors.keys())
+    return found
+
 def delete_embeddings(ids: List[str]):
-    return index.delete(ids=ids)
+    return _timed("delete", index.delete, ids=ids)
 
 def clear_index():
-    return index.delete(delete_all=True)
+    return _timed("delete", index.delete, delete_all=True)
@@ -0,0 +1,41 @@
+# apps/backend/app/watchlist.py
+import logging
+from sqlmodel import select
+
+from .config import settings
+from .db import async_session
+from .models import WatchlistItem
+
+logger = logging.getLogger(__name__)
+
+WATCHLIST_KINDS = {"stock", "news"}
+
+_DEFAULTS = {
+    "stock": settings.DEFAULT_STOCK_WATCHLIST,
+    "news": settings.DEFAULT_NEWS_WATCHLIST,
+}
+
+
+def normalize_entity(kind: str, entity: str) -> str:
+    entity = entity.strip()
+    return entity.upper() if kind == "stock" else entity
+
+
+async def load_watchlist(kind: str) -> list[str]:
+    """
+    Enabled entities for a watchlist kind, de-duplicated in insertion order.
+    Falls back to the DEFAULT_*_WATCHLIST setting when the table has none.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(WatchlistItem.entity)
+            .where(WatchlistItem.kind == kind)
+            .where(WatchlistItem.enabled == True)  # noqa: E712
+            .order_by(WatchlistItem.created_at.asc())
+        )
+        entities = [normalize_entity(kind, e) for e in result.scalars().all()]
+
+    if not entities:
+        entities = [normalize_entity(kind, e) for e in _DEFAULTS.get(kind, "").split(",") if e.strip()]
+
+    return list(dict.fromkeys(entities))
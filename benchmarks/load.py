@@ -0,0 +1,465 @@
+"""
+End-to-end load benchmark for the API, run against the offline stand-in
+providers (PROVIDER_MODE=offline, see app/utils/offline.py) so results
+don't depend on keys, network or upstream quotas.
+
+    # in-process (ASGI transport, no sockets)
+    python -m benchmarks.load run --workload ask=4,upload=2,logs=4,insights=4,reports=4 --duration 30 --out bench.json
+
+    # real server: uvicorn subprocess on a free port
+    python -m benchmarks.load run --server uvicorn --duration 60 --out bench.json --baseline benchmarks/baseline.json
+
+    # compare two result files (exit code 1 on regression)
+    python -m benchmarks.load compare bench.json benchmarks/baseline.json
+
+Each endpoint in the workload gets N closed-loop workers (send, wait,
+repeat) for the measured duration, after a warmup whose samples are
+dropped. The database, upload store and vector index start empty in a
+temporary directory; reports/runs are seeded and a few documents are
+ingested first so retrieval has something to find. Any setting can be
+overridden through the environment (e.g. OFFLINE_LLM_LATENCY_MS).
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_WORKLOAD = "ask=4,upload=2,logs=4,insights=4,reports=4"
+
+ASK_QUERIES = [
+    "What is the latest news about semiconductors?",
+    "How did AAPL stock do this week?",
+    "Summarize what the uploaded documents say about data centre power use.",
+    "What are the trends in GPU pricing?",
+    "Explain the central bank's latest decision.",
+]
+
+_VOCAB = (
+    "market revenue growth model inference latency capacity demand supply chip battery cloud "
+    "policy rate guidance forecast quarter shipment customer platform network storage energy"
+).split()
+
+# Offline providers, no quota pacing, throwaway storage; anything already in the environment wins
+BENCH_ENV = {
+    "PROVIDER_MODE": "offline",
+    "ALPHAVANTAGE_PER_MINUTE": "0",
+    "ALPHAVANTAGE_PER_DAY": "0",
+    "NEWSAPI_PER_DAY": "0",
+    "GOOGLE_PER_DAY": "0",
+    "WATCH_DIR": "",
+}
+
+
+# -------------------- Workload -------------------- #
+def _document(seq: int, kb: int, rng: random.Random) -> bytes:
+    words, size, lines = [], 0, [f"Benchmark document {seq} {rng.getrandbits(64):x}"]
+    while size < kb * 1024:
+        sentence = " ".join(rng.choice(_VOCAB) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        words.append(sentence)
+        size += len(sentence) + 1
+        if len(words) >= rng.randint(4, 8):
+            lines.append(" ".join(words))
+            words = []
+    lines.append(" ".join(words))
+    return "\n\n".join(lines).encode("utf-8")
+
+
+def _ask(seq: int, rng: random.Random, args) -> Dict[str, Any]:
+    return {"method": "POST", "url": "/rag/ask", "json": {"query": ASK_QUERIES[seq % len(ASK_QUERIES)]}}
+
+
+def _upload(seq: int, rng: random.Random, args) -> Dict[str, Any]:
+    # Unique content every time, so each request is a real ingestion rather than a duplicate hit
+    files = {"file": (f"bench-{seq}.txt", _document(seq, args.upload_kb, rng), "text/plain")}
+    return {"method": "POST", "url": "/upload/upload", "files": files}
+
+
+def _get(path: str, params: Optional[Dict[str, Any]] = None) -> Callable:
+    def build(seq: int, rng: random.Random, args) -> Dict[str, Any]:
+        return {"method": "GET", "url": path, "params": params or {}}
+    return build
+
+
+ENDPOINTS: Dict[str, Callable] = {
+    "ask": _ask,
+    "upload": _upload,
+    "logs": _get("/dashboard/logs", {"limit": 20}),
+    "insights": _get("/dashboard/insights", {"page_size": 10}),
+    "reports": _get("/reports"),
+}
+
+
+def parse_workload(spec: str) -> Dict[str, int]:
+    workload = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, workers = part.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        workload[name] = int(workers or 1)
+    return workload
+
+
+# -------------------- Measurement -------------------- #
+def percentile(ordered: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.errors = 0
+
+    def add(self, seconds: float, status: str, ok: bool):
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def merge(self, other: "Recorder"):
+        self.latencies.extend(other.latencies)
+        for status, n in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + n
+        self.errors += other.errors
+
+    def summary(self, duration: float) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "throughput_rps": round((count - self.errors) / duration, 3) if duration else None,
+            "p50_ms": ms(percentile(ordered, 0.50)),
+            "p95_ms": ms(percentile(ordered, 0.95)),
+            "p99_ms": ms(percentile(ordered, 0.99)),
+            "mean_ms": ms(sum(ordered) / count) if count else None,
+            "max_ms": ms(ordered[-1]) if ordered else None,
+            "statuses": self.statuses,
+        }
+
+
+async def _wait_for_job(client: httpx.AsyncClient, job_id: str, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        resp = await client.get(f"/upload/status/{job_id}")
+        if resp.status_code == 200 and resp.json().get("status") in ("completed", "failed"):
+            return resp.json()["status"] == "completed"
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def _call(client: httpx.AsyncClient, name: str, seq: int, rng: random.Random, args) -> tuple:
+    """One request (plus, for uploads with --upload-wait, polling until ingested). Returns (ok, status)."""
+    try:
+        resp = await client.request(**ENDPOINTS[name](seq, rng, args))
+    except Exception as e:
+        return False, type(e).__name__
+    ok = resp.status_code < 400
+    if ok and name == "upload" and args.upload_wait:
+        job_id = resp.json().get("job_id")
+        if job_id and not await _wait_for_job(client, job_id, args.request_timeout):
+            return False, "ingest_failed"
+    return ok, str(resp.status_code)
+
+
+async def _worker(client, name: str, worker: int, stop_at: float, measure_from: float,
+                  recorder: Recorder, args):
+    rng = random.Random(f"{args.seed}:{name}:{worker}")
+    seq = worker
+    while (now := time.monotonic()) < stop_at:
+        ok, status = await _call(client, name, seq, rng, args)
+        if now >= measure_from:
+            recorder.add(time.monotonic() - now, status, ok)
+        seq += 1_000_003  # distinct per worker
+
+
+async def drive(client: httpx.AsyncClient, workload: Dict[str, int], args) -> Dict[str, Recorder]:
+    start = time.monotonic()
+    measure_from = start + args.warmup
+    stop_at = measure_from + args.duration
+    recorders = {name: Recorder() for name in workload}
+    await asyncio.gather(*(
+        _worker(client, name, i, stop_at, measure_from, recorders[name], args)
+        for name, workers in workload.items()
+        for i in range(workers)
+    ))
+    return recorders
+
+
+async def preload_documents(client: httpx.AsyncClient, args):
+    """Ingest a few documents (waiting for completion) so /rag/ask retrieves real chunks."""
+    rng = random.Random(f"{args.seed}:preload")
+    for seq in range(args.preload_docs):
+        resp = await client.request(**_upload(-1 - seq, rng, args))
+        resp.raise_for_status()
+        job_id = resp.json().get("job_id")
+        if job_id:
+            await _wait_for_job(client, job_id, args.request_timeout)
+
+
+# -------------------- Environment -------------------- #
+def configure_env(workdir: Path):
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{workdir / 'bench.db'}")
+    os.environ.setdefault("UPLOAD_STORE_DIR", str(workdir / "objects"))
+
+
+async def seed_database(reports: int):
+    """Create the schema and insert reports/runs spread over the last 90 days for the dashboard endpoints."""
+    from app.db import async_init_db, async_session, async_engine
+    from app.models import Report, Run
+
+    await async_init_db()
+    rng = random.Random(reports)
+    now = datetime.now(timezone.utc)
+    async with async_session() as session:
+        for i in range(reports):
+            created = now - timedelta(days=rng.randint(0, 90), minutes=rng.randint(0, 1440))
+            kind = rng.choice(["news", "stock", "trends"])
+            session.add(Report(kind=kind, content=f"{kind} report {i}: " + " ".join(rng.choices(_VOCAB, k=60)), created_at=created))
+            session.add(Run(status="completed", job_type=kind, started_at=created, finished_at=created))
+        await session.commit()
+    # Pooled connections belong to this event loop; the run uses another
+    await async_engine.dispose()
+
+
+def peak_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """High-water RSS of a process (this one by default), from /proc, else getrusage for ourselves."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if pid is None:
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return None
+
+
+async def run_inprocess(workload: Dict[str, int], args) -> tuple:
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.request_timeout) as client:
+            await preload_documents(client, args)
+            recorders = await drive(client, workload, args)
+    # Includes the harness itself, which is small next to the app and its models
+    return recorders, peak_rss_mb()
+
+
+async def run_uvicorn(workload: Dict[str, int], args) -> tuple:
+    import socket
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning"]
+    server = subprocess.Popen(cmd, cwd=ROOT, env=os.environ.copy())
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout,
+                                     limits=httpx.Limits(max_connections=None)) as client:
+            deadline = time.monotonic() + args.startup_timeout
+            while True:
+                if server.poll() is not None:
+                    raise SystemExit(f"uvicorn exited with code {server.returncode}")
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise SystemExit("uvicorn did not become healthy in time")
+                await asyncio.sleep(0.2)
+            await preload_documents(client, args)
+            recorders = await drive(client, workload, args)
+            return recorders, peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(args) -> Dict[str, Any]:
+    workload = parse_workload(args.workload)
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        configure_env(Path(tmp))
+        asyncio.run(seed_database(args.seed_reports))
+        runner = run_inprocess if args.server == "inprocess" else run_uvicorn
+        recorders, rss = asyncio.run(runner(workload, args))
+
+    total = Recorder()
+    for recorder in recorders.values():
+        total.merge(recorder)
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "server": args.server,
+            "workload": workload,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "upload_kb": args.upload_kb,
+            "upload_wait": args.upload_wait,
+            "provider_mode": os.environ.get("PROVIDER_MODE"),
+        },
+        "endpoints": {name: r.summary(args.duration) for name, r in recorders.items()},
+        "total": total.summary(args.duration),
+        "peak_rss_mb": rss,
+    }
+
+
+# -------------------- Baseline comparison -------------------- #
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], latency_tolerance: float,
+            throughput_tolerance: float, error_tolerance: float, rss_tolerance: float) -> List[str]:
+    """
+    Regressions of `current` against `baseline`: p95/p99 latency or peak RSS
+    up by more than their relative tolerance, throughput down by more than
+    its tolerance, or error rate up by more than an absolute amount.
+    """
+    regressions = []
+
+    def relative(name: str, metric: str, now, before, tolerance: float, higher_is_worse: bool = True):
+        if now is None or not before:
+            return
+        change = (now - before) / before
+        if (change if higher_is_worse else -change) > tolerance:
+            regressions.append(f"{name}.{metric}: {before} -> {now} ({change:+.1%})")
+
+    for name, before in baseline.get("endpoints", {}).items():
+        now = current.get("endpoints", {}).get(name)
+        if now is None:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            relative(name, metric, now[metric], before[metric], latency_tolerance)
+        relative(name, "throughput_rps", now["throughput_rps"], before["throughput_rps"], throughput_tolerance, False)
+        if now["error_rate"] - before["error_rate"] > error_tolerance:
+            regressions.append(f"{name}.error_rate: {before['error_rate']} -> {now['error_rate']}")
+    relative("process", "peak_rss_mb", current.get("peak_rss_mb"), baseline.get("peak_rss_mb"), rss_tolerance)
+    return regressions
+
+
+def print_report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    header = f"{'endpoint':<10} {'reqs':>7} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'err%':>6}"
+    print(header)
+    print("-" * len(header))
+    rows = dict(result["endpoints"], total=result["total"])
+    for name, s in rows.items():
+        line = (f"{name:<10} {s['requests']:>7} {s['throughput_rps'] or 0:>8.2f} {s['p50_ms'] or 0:>9.1f} "
+                f"{s['p95_ms'] or 0:>9.1f} {s['p99_ms'] or 0:>9.1f} {s['error_rate'] * 100:>6.2f}")
+        before = (baseline or {}).get("endpoints", {}).get(name) if name != "total" else (baseline or {}).get("total")
+        if before and before.get("p95_ms") and s["p95_ms"] is not None:
+            line += f"   p95 {(s['p95_ms'] - before['p95_ms']) / before['p95_ms']:+.1%} vs baseline"
+        print(line)
+    print(f"peak RSS: {result.get('peak_rss_mb')} MB")
+
+
+def _check(result: Dict[str, Any], baseline_path: str, args) -> int:
+    baseline = json.loads(Path(baseline_path).read_text())
+    for key in ("server", "workload", "upload_kb", "upload_wait"):
+        if result["meta"].get(key) != baseline.get("meta", {}).get(key):
+            print(f"warning: {key} differs from the baseline "
+                  f"({result['meta'].get(key)!r} vs {baseline.get('meta', {}).get(key)!r})")
+    print_report(result, baseline)
+    regressions = compare(result, baseline, args.latency_tolerance, args.throughput_tolerance,
+                          args.error_tolerance, args.rss_tolerance)
+    if regressions:
+        print(f"\nREGRESSIONS against {baseline_path}:")
+        for r in regressions:
+            print(f"  {r}")
+        return 1
+    print(f"\nNo regressions against {baseline_path}")
+    return 0
+
+
+def _add_tolerances(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-tolerance", type=float, default=0.15, help="allowed relative p95/p99 increase")
+    parser.add_argument("--throughput-tolerance", type=float, default=0.15, help="allowed relative throughput drop")
+    parser.add_argument("--error-tolerance", type=float, default=0.01, help="allowed absolute error-rate increase")
+    parser.add_argument("--rss-tolerance", type=float, default=0.20, help="allowed relative peak RSS increase")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="run a load benchmark")
+    p.add_argument("--server", choices=["inprocess", "uvicorn"], default="inprocess")
+    p.add_argument("--workload", default=DEFAULT_WORKLOAD,
+                   help=f"endpoint=workers,... from {', '.join(ENDPOINTS)} (default: {DEFAULT_WORKLOAD})")
+    p.add_argument("--duration", type=float, default=30, help="measured seconds")
+    p.add_argument("--warmup", type=float, default=5, help="seconds of load before measuring")
+    p.add_argument("--upload-kb", type=int, default=64, help="size of each uploaded document")
+    p.add_argument("--upload-wait", action="store_true", help="time uploads until ingestion completes")
+    p.add_argument("--preload-docs", type=int, default=5, help="documents ingested before the run")
+    p.add_argument("--seed-reports", type=int, default=500, help="reports/runs inserted before the run")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--request-timeout", type=float, default=120)
+    p.add_argument("--startup-timeout", type=float, default=120)
+    p.add_argument("--out", help="write results JSON here")
+    p.add_argument("--baseline", help="compare against this results JSON; exit 1 on regression")
+    _add_tolerances(p)
+
+    c = sub.add_parser("compare", help="compare a results JSON against a baseline")
+    c.add_argument("current")
+    c.add_argument("baseline")
+    _add_tolerances(c)
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return _check(json.loads(Path(args.current).read_text()), args.baseline, args)
+
+    result = run(args)
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, indent=2))
+        print(f"Results written to {args.out}")
+    if args.baseline:
+        return _check(result, args.baseline, args)
+    print_report(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Regenerate the checked-in sample documents used by the micro-benchmarks
+(benchmarks/data/sample-{small,medium,large}.{txt,pdf,docx}).
+
+    python -m benchmarks.make_fixtures
+
+Stdlib only: the PDF is written by hand (Helvetica, Flate-compressed page
+streams) and the DOCX is a minimal WordprocessingML package, so the files
+are identical on every machine and need no PDF/Office tooling. Text is
+seeded pseudo-prose; every format of a size carries the same text.
+"""
+import random
+import zipfile
+import zlib
+from pathlib import Path
+from typing import List
+from xml.sax.saxutils import escape
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+# Approximate text size of each sample, in KB
+SIZES = {"small": 4, "medium": 32, "large": 128}
+
+_VOCAB = (
+    "market revenue growth model inference latency capacity demand supply chip battery cloud "
+    "policy rate guidance forecast quarter shipment customer platform network storage energy "
+    "analyst report board margin pricing contract region launch research customer hardware"
+).split()
+
+LINE_CHARS = 90
+LINES_PER_PAGE = 60
+
+
+def sample_paragraphs(kb: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    paragraphs, size = [], 0
+    while size < kb * 1024:
+        sentences = [
+            " ".join(rng.choice(_VOCAB) for _ in range(rng.randint(8, 20))).capitalize() + "."
+            for _ in range(rng.randint(3, 7))
+        ]
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return paragraphs
+
+
+def _wrap(paragraph: str) -> List[str]:
+    lines, line = [], ""
+    for word in paragraph.split():
+        if line and len(line) + 1 + len(word) > LINE_CHARS:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    lines.append(line)
+    return lines
+
+
+# -------------------- Writers -------------------- #
+def write_txt(path: Path, paragraphs: List[str]):
+    path.write_text("\n\n".join(paragraphs) + "\n", encoding="utf-8")
+
+
+def _pdf_string(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, paragraphs: List[str]):
+    lines: List[str] = []
+    for paragraph in paragraphs:
+        lines.extend(_wrap(paragraph))
+        lines.append("")
+    pages = [lines[i : i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)]
+
+    # 1 catalog, 2 page tree, 3 font, then a page and its content stream per page
+    objects: List[bytes] = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in pages:
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 780 Td"] + [f"({_pdf_string(line)}) Tj T*" for line in page] + ["ET"]
+        stream = zlib.compress("\n".join(ops).encode("latin-1"))
+        page_num, content_num = len(objects) + 1, len(objects) + 2
+        kids.append(f"{page_num} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_num} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+</Types>"""
+
+_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+
+def write_docx(path: Path, paragraphs: List[str]):
+    body = "".join(f"<w:p><w:r><w:t>{escape(p)}</w:t></w:r></w:p>" for p in paragraphs)
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{body}</w:body></w:document>"
+    )
+    # Fixed timestamps keep the archive byte-identical between runs
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in (("[Content_Types].xml", _CONTENT_TYPES), ("_rels/.rels", _RELS),
+                           ("word/document.xml", document)):
+            zf.writestr(zipfile.ZipInfo(name, date_time=(2024, 1, 1, 0, 0, 0)), data, zipfile.ZIP_DEFLATED)
+
+
+def main():
+    DATA_DIR.mkdir(exist_ok=True)
+    for seed, (label, kb) in enumerate(SIZES.items()):
+        paragraphs = sample_paragraphs(kb, seed)
+        for suffix, writer in ((".txt", write_txt), (".pdf", write_pdf), (".docx", write_docx)):
+            path = DATA_DIR / f"sample-{label}{suffix}"
+            writer(path, paragraphs)
+            print(f"{path.relative_to(DATA_DIR.parent.parent)}: {path.stat().st_size / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+"""
+Micro-benchmarks for the CPU-heavy functions that show up in profiles:
+document extraction, chunking, single vs batched embedding, vector
+payload building, context-memory JSON round trips and query cleanup.
+Runs offline (PROVIDER_MODE=offline, throwaway database and index) on
+the checked-in sample documents in benchmarks/data (regenerate with
+`python -m benchmarks.make_fixtures`).
+
+    python -m benchmarks.micro list
+    python -m benchmarks.micro run --out micro.json --history benchmarks/micro-history.jsonl
+    python -m benchmarks.micro run --filter chunk_text --filter embed --baseline micro-main.json
+
+    # compare two result files (exit code 1 on a significant slowdown)
+    python -m benchmarks.micro compare micro.json micro-main.json
+
+    # median of each benchmark across recorded runs
+    python -m benchmarks.micro history benchmarks/micro-history.jsonl
+
+Each benchmark is calibrated to a number of loops taking at least
+--min-time, then timed for --rounds rounds (GC off during a round, as
+timeit does). Comparisons use a two-sided Mann-Whitney U test on the
+per-round times: a benchmark is slower or faster only if p < --alpha and
+its median moved by more than --min-change, so noise alone doesn't fail
+a run. Embedding uses MiniLM when it is in the local model cache (never
+downloaded), else the offline hash embedder; the provider is part of the
+benchmark name so the two are never compared.
+"""
+import gc
+import os
+import sys
+import json
+import math
+import time
+import fnmatch
+import argparse
+import platform
+import statistics
+import tempfile
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from .load import configure_env, _git_revision
+from .make_fixtures import DATA_DIR, SIZES
+
+FORMATS = ("txt", "pdf", "docx")
+CONTEXT_SIZES = (10, 100, 1000)
+EMBED_TEXTS = 32
+VECTOR_DOCS = 100
+
+
+class Skip(Exception):
+    """A suite can't run here (e.g. its fixtures are missing)."""
+
+
+# -------------------- Suites -------------------- #
+# Each suite imports what it measures, prepares inputs once and returns
+# {benchmark name: zero-argument callable}.
+
+def _sample(label: str, fmt: str) -> Path:
+    path = DATA_DIR / f"sample-{label}.{fmt}"
+    if not path.is_file():
+        raise Skip(f"missing {path}; run python -m benchmarks.make_fixtures")
+    return path
+
+
+def suite_extract() -> Dict[str, Callable]:
+    from app.upload_api import extract_text
+
+    return {
+        f"extract_text[{fmt}-{label}]": (lambda p=_sample(label, fmt): extract_text(p))
+        for fmt in FORMATS for label in SIZES
+    }
+
+
+def suite_chunk() -> Dict[str, Callable]:
+    from app.upload_api import chunk_text
+
+    return {
+        f"chunk_text[{label}]": (lambda t=_sample(label, "txt").read_text(encoding="utf-8"): chunk_text(t))
+        for label in SIZES
+    }
+
+
+def _embedder():
+    """MiniLM from the local cache if it's there, else the offline hash embedder; (name, embedder)."""
+    from app.config import settings
+    from app.utils.offline import offline_embedder
+
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")  # never download during a benchmark
+    try:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return "minilm", HuggingFaceEmbeddings(model_name=settings.HF_EMBED_MODEL)
+    except Exception:
+        return "offline-hash", offline_embedder
+
+
+def suite_embed() -> Dict[str, Callable]:
+    from app.upload_api import chunk_text
+
+    texts = chunk_text(_sample("large", "txt").read_text(encoding="utf-8"))[:EMBED_TEXTS]
+    name, embedder = _embedder()
+
+    def single():
+        for text in texts:
+            embedder.embed_query(text)
+
+    return {
+        f"embed_single[{name}-{len(texts)}]": single,
+        f"embed_batch[{name}-{len(texts)}]": lambda: embedder.embed_documents(texts),
+    }
+
+
+def suite_vectors() -> Dict[str, Callable]:
+    import random
+    from app.config import settings
+    from app.utils.vector_db import format_vector, upsert_embeddings
+
+    rng = random.Random(0)
+    text = _sample("small", "txt").read_text(encoding="utf-8")[:1000]
+    docs = [
+        {"doc_id": "bench", "chunk_id": f"{i:04d}", "text": text, "source": "sample-small.txt",
+         "embedding": [rng.uniform(-1, 1) for _ in range(settings.OFFLINE_EMBED_DIM)]}
+        for i in range(VECTOR_DOCS)
+    ]
+
+    def payloads():
+        return [format_vector(d["doc_id"], d["chunk_id"], d["embedding"], d["text"], d["source"]) for d in docs]
+
+    return {
+        f"format_vector[{VECTOR_DOCS}]": payloads,
+        # Offline mode: payload building plus the in-memory index write
+        f"upsert_embeddings[{VECTOR_DOCS}]": lambda: upsert_embeddings(docs, provider="bench"),
+    }
+
+
+def suite_context() -> Dict[str, Callable]:
+    from sqlmodel import SQLModel, Session
+    from app.db import engine
+    from app.models import ContextMemory  # noqa: F401 - registers the table
+    from app.context_memory import save_context, get_context
+
+    SQLModel.metadata.create_all(engine)
+    session = Session(engine)
+    answer = _sample("small", "txt").read_text(encoding="utf-8")[:400]
+    benches: Dict[str, Callable] = {}
+    for n in CONTEXT_SIZES:
+        data = {f"Question {i} about the market outlook?": answer for i in range(n)}
+        save_context(f"bench-{n}", data, session)
+        benches[f"context_json[{n}]"] = lambda d=data: json.loads(json.dumps(d))
+        benches[f"context_save[{n}]"] = lambda d=data, sid=f"bench-save-{n}": save_context(sid, d, session)
+        benches[f"context_load[{n}]"] = lambda sid=f"bench-{n}": get_context(sid, session)
+    return benches
+
+
+def suite_text() -> Dict[str, Callable]:
+    from app.rag_api import filter_query, safe_decode
+
+    short = "  What's the latest   news on NVDA?! "
+    long = (short + _sample("small", "txt").read_text(encoding="utf-8"))[:4000]
+    chunks = [_sample("small", "txt").read_bytes()[i : i + 200] for i in range(0, 10000, 200)]
+    return {
+        "filter_query[short]": lambda: filter_query(short),
+        "filter_query[4k]": lambda: filter_query(long),
+        "safe_decode[bytes]": lambda: safe_decode(chunks[0]),
+        f"safe_decode[list-{len(chunks)}]": lambda: safe_decode(chunks),
+    }
+
+
+# suite -> (builder, names of the functions it benchmarks)
+SUITES = {
+    "extract": (suite_extract, ("extract_text",)),
+    "chunk": (suite_chunk, ("chunk_text",)),
+    "embed": (suite_embed, ("embed_single", "embed_batch")),
+    "vectors": (suite_vectors, ("format_vector", "upsert_embeddings")),
+    "context": (suite_context, ("context_json", "context_save", "context_load")),
+    "text": (suite_text, ("filter_query", "safe_decode")),
+}
+
+
+def _matches(name: str, patterns: List[str]) -> bool:
+    return not patterns or any(p in name or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def collect(patterns: List[str]) -> Dict[str, Callable]:
+    """
+    Build the benchmarks matching `patterns` (substring or glob of a
+    benchmark or suite name; all if empty). Suites with nothing selected
+    aren't built, so their imports and setup are skipped too.
+    """
+    benches: Dict[str, Callable] = {}
+    for suite, (build, functions) in SUITES.items():
+        suite_wanted = _matches(suite, patterns)
+        if not suite_wanted and not any(_matches(f, [p.split("[")[0]]) for f in functions for p in patterns):
+            continue
+        try:
+            built = build()
+        except Skip as e:
+            print(f"skipping {suite}: {e}")
+            continue
+        benches.update({name: fn for name, fn in built.items() if suite_wanted or _matches(name, patterns)})
+    return benches
+
+
+# -------------------- Measurement -------------------- #
+def _timed(fn: Callable, loops: int) -> float:
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter() - started
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def calibrate(fn: Callable, min_time: float) -> int:
+    """Smallest loop count (roughly) whose total time reaches `min_time`."""
+    loops = 1
+    while True:
+        elapsed = _timed(fn, loops)
+        if elapsed >= min_time or loops >= 1_000_000:
+            return loops
+        loops = min(loops * 100, max(loops * 2, math.ceil(loops * min_time * 1.2 / max(elapsed, 1e-9))))
+
+
+def describe(samples: List[float]) -> Dict[str, float]:
+    q1, _, q3 = statistics.quantiles(samples, n=4) if len(samples) > 1 else (samples[0], None, samples[0])
+    return {
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "iqr": q3 - q1,
+        "min": min(samples),
+        "max": max(samples),
+    }
+
+
+def measure(fn: Callable, rounds: int, min_time: float, warmup: int) -> Dict[str, Any]:
+    """Seconds per call for each of `rounds` rounds, plus summary statistics."""
+    fn()  # lazy imports, caches, pool start-up
+    loops = calibrate(fn, min_time)
+    for _ in range(warmup):
+        _timed(fn, loops)
+    samples = [_timed(fn, loops) / loops for _ in range(rounds)]
+    return {"loops": loops, "rounds": rounds, **describe(samples), "samples": samples}
+
+
+# -------------------- Statistics -------------------- #
+def mann_whitney_p(a: List[float], b: List[float]) -> float:
+    """Two-sided p-value of the Mann-Whitney U test (normal approximation with tie correction)."""
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return 1.0
+    combined = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    n = n1 + n2
+    rank_sum_a, ties, i = 0.0, 0.0, 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        average_rank = (i + j) / 2 + 1
+        rank_sum_a += average_rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 0)
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+    u = rank_sum_a - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (abs(u - mean) - 0.5) / math.sqrt(variance)  # continuity correction
+    return min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2)))
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], alpha: float, min_change: float) -> List[Dict[str, Any]]:
+    """Per benchmark: median change vs the baseline, p-value and verdict (slower/faster/same/new)."""
+    rows = []
+    for name, now in current["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if before is None:
+            rows.append({"name": name, "verdict": "new"})
+            continue
+        change = (now["median"] - before["median"]) / before["median"] if before["median"] else 0.0
+        p = mann_whitney_p(now["samples"], before["samples"])
+        verdict = "same"
+        if p < alpha and abs(change) > min_change:
+            verdict = "slower" if change > 0 else "faster"
+        rows.append({"name": name, "change": change, "p": p, "verdict": verdict})
+    return rows
+
+
+# -------------------- Run -------------------- #
+def run(args) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="microbench-") as tmp:
+        configure_env(Path(tmp))
+        benches = collect(args.filter)
+        results = {}
+        for name, fn in benches.items():
+            print(f"  {name} ...", end="", flush=True)
+            results[name] = measure(fn, args.rounds, args.min_time, args.warmup)
+            print(f" {_fmt(results[name]['median'])}")
+        try:
+            from app.extraction import shutdown_extraction_pool
+            shutdown_extraction_pool()
+        except Exception:
+            pass
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "provider_mode": os.environ.get("PROVIDER_MODE"),
+            "rounds": args.rounds,
+            "min_time": args.min_time,
+        },
+        "benchmarks": results,
+    }
+
+
+def _fmt(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def print_report(result: Dict[str, Any], rows: Optional[List[Dict[str, Any]]] = None):
+    by_name = {r["name"]: r for r in rows or []}
+    header = f"{'benchmark':<34} {'median':>10} {'iqr':>10} {'rounds x loops':>15}"
+    if rows is not None:
+        header += f" {'change':>9} {'p':>8}  verdict"
+    print(header)
+    print("-" * len(header))
+    for name, s in result["benchmarks"].items():
+        line = f"{name:<34} {_fmt(s['median']):>10} {_fmt(s['iqr']):>10} {s['rounds']:>7} x {s['loops']:<6}"
+        row = by_name.get(name)
+        if row is not None:
+            if row["verdict"] == "new":
+                line += f" {'':>9} {'':>8}  new"
+            else:
+                line += f" {row['change']:>+9.1%} {row['p']:>8.3g}  {row['verdict']}"
+        print(line)
+
+
+def _check(result: Dict[str, Any], baseline_path: str, args) -> int:
+    baseline = json.loads(Path(baseline_path).read_text())
+    for key in ("python", "cpus", "provider_mode"):
+        if result["meta"].get(key) != baseline.get("meta", {}).get(key):
+            print(f"warning: {key} differs from the baseline "
+                  f"({result['meta'].get(key)!r} vs {baseline.get('meta', {}).get(key)!r})")
+    rows = compare(result, baseline, args.alpha, args.min_change)
+    print_report(result, rows)
+    slower = [r["name"] for r in rows if r["verdict"] == "slower"]
+    if slower:
+        print(f"\nSignificantly slower than {baseline_path}: {', '.join(slower)}")
+        return 1
+    print(f"\nNo significant slowdowns against {baseline_path}")
+    return 0
+
+
+def append_history(result: Dict[str, Any], path: str):
+    """One line per run: metadata and each benchmark's median and IQR (samples stay in --out)."""
+    entry = {
+        "meta": result["meta"],
+        "benchmarks": {n: {"median": s["median"], "iqr": s["iqr"]} for n, s in result["benchmarks"].items()},
+    }
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def print_history(path: str, patterns: List[str], last: int):
+    entries = [json.loads(line) for line in Path(path).read_text().splitlines() if line.strip()][-last:]
+    names = sorted({n for e in entries for n in e["benchmarks"] if _matches(n, patterns)})
+    for name in names:
+        print(name)
+        previous = None
+        for e in entries:
+            s = e["benchmarks"].get(name)
+            if s is None:
+                continue
+            delta = f"{(s['median'] - previous) / previous:+.1%}" if previous else ""
+            print(f"  {e['meta']['timestamp'][:19]}  {e['meta'].get('revision') or '-':<9} "
+                  f"{_fmt(s['median']):>10} ± {_fmt(s['iqr'] / 2):<10} {delta}")
+            previous = s["median"]
+
+
+def _add_thresholds(parser: argparse.ArgumentParser):
+    parser.add_argument("--alpha", type=float, default=0.01, help="significance level of the U test")
+    parser.add_argument("--min-change", type=float, default=0.05,
+                        help="smallest relative median change reported as slower/faster")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.micro", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="list suites and the sample documents")
+
+    r = sub.add_parser("run", help="run micro-benchmarks")
+    r.add_argument("--filter", action="append", default=[],
+                   help="benchmark or suite name, substring or glob (repeatable; default: all)")
+    r.add_argument("--rounds", type=int, default=20)
+    r.add_argument("--warmup", type=int, default=3, help="untimed rounds after calibration")
+    r.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per round")
+    r.add_argument("--out", help="write results JSON (with per-round samples) here")
+    r.add_argument("--history", help="append a summary line to this JSONL file")
+    r.add_argument("--baseline", help="compare against this results JSON; exit 1 if significantly slower")
+    _add_thresholds(r)
+
+    c = sub.add_parser("compare", help="compare a results JSON against a baseline")
+    c.add_argument("current")
+    c.add_argument("baseline")
+    _add_thresholds(c)
+
+    h = sub.add_parser("history", help="show medians across runs recorded with --history")
+    h.add_argument("path")
+    h.add_argument("--filter", action="append", default=[])
+    h.add_argument("--last", type=int, default=20, help="number of most recent runs")
+
+    args = parser.parse_args(argv)
+    if args.command == "list":
+        for suite in SUITES:
+            print(suite)
+        print(f"\nsamples in {DATA_DIR}:")
+        for path in sorted(DATA_DIR.glob("sample-*")):
+            print(f"  {path.name} ({path.stat().st_size / 1024:.1f} KB)")
+        return 0
+    if args.command == "history":
+        print_history(args.path, args.filter, args.last)
+        return 0
+    if args.command == "compare":
+        return _check(json.loads(Path(args.current).read_text()), args.baseline, args)
+
+    result = run(args)
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, indent=2))
+        print(f"Results written to {args.out}")
+    if args.history:
+        append_history(result, args.history)
+    if args.baseline:
+        return _check(result, args.baseline, args)
+    print_report(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())